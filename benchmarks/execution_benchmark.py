@@ -0,0 +1,73 @@
+"""
+
+Execution benchmark
+
+Executes day by day loop over given number of years and prints best time of several runs
+
+"""
+import argparse
+import contextlib
+import io
+import timeit
+
+from timoninterpreter import closure_compilation
+from timoninterpreter import python_compilation
+from timoninterpreter import virtual_machine
+from timoninterpreter.execution import Environment
+from timoninterpreter.lexical_analysis import tokenize
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.syntax_nodes import Program
+
+SCRIPT = """
+fun workday(n) {{ return n < 5; }};
+var weekday = 0;  # 01.01.1900 was monday #
+var workdays = 0;
+var firsts = 0;
+from 01.01.1900 to 31.12.{end_year} by days as d {{
+    var next = weekday + 1;
+    if workday(weekday) {{ workdays = workdays + 1; }};
+    if next == 7 {{ next = 0; }};
+    weekday = next;
+    if d.days == 1 {{ firsts = firsts + 1; }};
+}};
+print workdays;
+print firsts;
+"""
+
+
+engines = {
+    "bytecode": virtual_machine.execute,
+    "closures": closure_compilation.execute,
+    "python": python_compilation.execute,
+    "tree": Program.execute,
+}
+
+
+def generate_script(years):
+    return SCRIPT.format(end_year=1900 + years - 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark of execution")
+    parser.add_argument('-years', type=int, default=100, help='number of years iterated day by day')
+    parser.add_argument('-engine', choices=list(engines), default='closures')
+    parser.add_argument('-repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with BufferReader("<benchmark>", generate_script(args.years)) as reader:
+        token_buffer = tokenize(reader)
+
+    output = io.StringIO()
+
+    def execute():
+        output.seek(0)
+        with contextlib.redirect_stdout(output):
+            engines[args.engine](Program(token_buffer.view()), Environment())
+
+    best = min(timeit.repeat(execute, number=1, repeat=args.repeat))
+    print("{} years day by day ({}): executed in {:.3f} s, printed {}".format(args.years, args.engine, best,
+                                                                       output.getvalue().split()))
+
+
+if __name__ == '__main__':
+    main()
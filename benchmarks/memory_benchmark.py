@@ -0,0 +1,37 @@
+"""
+
+Memory benchmark
+
+Parses generated script and prints memory taken by its syntax tree per 1000 lines of source
+
+"""
+import argparse
+import tracemalloc
+
+from benchmarks.parser_benchmark import generate_script
+from timoninterpreter.lexical_analysis import tokenize
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.syntax_nodes import Program
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark of memory taken by syntax tree")
+    parser.add_argument('-size', type=int, default=2000, help='number of generated statement groups')
+    args = parser.parse_args()
+
+    script = generate_script(args.size)
+    lines = script.count("\n") + 1
+    with BufferReader("<benchmark>", script) as reader:
+        token_buffer = tokenize(reader)
+
+    tracemalloc.start()
+    program = Program(token_buffer.view())
+    tree_size, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("{} lines, {} statements: syntax tree takes {:.1f} KiB per 1000 lines (peak while parsing {:.1f} KiB)".format(
+        lines, len(program.statements), tree_size / 1024 / lines * 1000, peak_size / 1024 / lines * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+
+Parser benchmark
+
+Parses generated expression-heavy script and prints best time of several runs
+
+"""
+import argparse
+import timeit
+
+from timoninterpreter.lexical_analysis import tokenize
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.syntax_nodes import Program
+
+STATEMENTS = [
+    "var a{0} = ({0} + 2) * 3 - 4 / 5;",
+    "var b{0} = a{0} > 10 & a{0} <= 100 | !(a{0} == 7);",
+    "print 12.05.2020 + '1D 2h' - '{0}m';",
+    "fun f{0}(x, y) {{ if x > y {{ return x - y; }} else {{ return -(y - x); }}; }};",
+    "print f{0}(a{0}, 12).days + 10:00:00.hours * 2;",
+]
+
+
+def generate_script(size):
+    return "\n".join(statement.format(i) for i in range(size) for statement in STATEMENTS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark of the parser")
+    parser.add_argument('-size', type=int, default=2000, help='number of generated statement groups')
+    parser.add_argument('-repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    script = generate_script(args.size)
+    with BufferReader("<benchmark>", script) as reader:
+        token_buffer = tokenize(reader)
+
+    best = min(timeit.repeat(lambda: Program(token_buffer.view()), number=1, repeat=args.repeat))
+    print("{} characters, {} tokens: parsed in {:.3f} s".format(len(script), len(token_buffer), best))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@ import unittest
 import unittest.mock as mock
 import os
 
+from timoninterpreter import closure_compilation
 from timoninterpreter.execution import Environment
 from timoninterpreter.source_readers import FileReader
 from timoninterpreter.lexical_analysis import Lexer
@@ -516,3 +517,9 @@ class ScriptsExecutionTestCase(unittest.TestCase):
     @mock.patch('builtins.print')
     def test_script4(self, mocked_print):
         self.assert_printed(mocked_print, "scripts/script4.tim", ["hours between 15:57:23 and 20:45:00 : 4"])
+
+
+class ScriptsCompiledExecutionTestCase(ScriptsExecutionTestCase):
+    def assert_printed(self, mocked_print, path, expected_print_calls):
+        closure_compilation.execute(get_program(get_path(path)), Environment())
+        self.assertEqual(mocked_print.mock_calls, [mock.call(s) for s in expected_print_calls])
@@ -0,0 +1,97 @@
+import contextlib
+import io
+import unittest
+
+from timoninterpreter import error_handling
+from timoninterpreter import optimization
+from timoninterpreter.execution import Environment
+from timoninterpreter.lexical_analysis import Lexer
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.syntax_nodes import LazyProgram
+from timoninterpreter.syntax_nodes import Program
+
+
+def parse(text, program_class=Program):
+    with BufferReader("whatever", text) as br:
+        return program_class(Lexer(br))
+
+
+def run_program(program, engine):
+    """
+    Returns:
+        printed lines and returned value or position and message of execution error
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            result = engine(program, Environment())
+        except error_handling.ExecutionError as e:
+            result = e.token.get_file_pos().get_absolute_pos(), e.message
+    return output.getvalue().splitlines(), result
+
+
+class EngineTestCase(unittest.TestCase):
+    """
+    Tests that execution engine gives the same results as execution of the nodes, subclasses set the engine
+    """
+
+    engine = None
+
+    def run_program(self, text, engine=None, program_class=Program):
+        return run_program(parse(text, program_class), engine or self.engine)
+
+    def assert_same_as_tree(self, text, program_class=Program):
+        expected = self.run_program(text, Program.execute, program_class)
+        self.assertEqual(expected, self.run_program(text, program_class=program_class))
+        return expected
+
+    def test_return_value(self):
+        self.assertEqual(([], 5), self.assert_same_as_tree("var a = 2; return a * 2 + 1;"))
+        self.assertEqual(([], 0), self.assert_same_as_tree("return;"))
+        self.assertEqual(([], None), self.assert_same_as_tree("var a = 2;"))
+
+    def test_functions(self):
+        self.assert_same_as_tree("fun fib(m) { if m < 2 { return m; }; var x = m - 1; var y = m - 2;"
+                                 "return fib(x) + fib(y); }; print fib(10);")
+        self.assert_same_as_tree("fun f() { }; fun g() { return; }; print f(); print g();")
+        self.assert_same_as_tree("fun f() { return g; }; var g = 5; print f(); if 1 { var g = 7; print f(); };")
+
+    def test_loops(self):
+        self.assert_same_as_tree("var s = 0; from 01.01.2020 to 10.01.2020 by days as d {"
+                                 "    var k = d.days; if k > 5 { var q = k; s = s + q; } else { s = s - 1; };"
+                                 "}; print s;")
+        self.assert_same_as_tree("fun f() { from 01.01.2020 to 03.01.2020 by days as d {"
+                                 "    if d.days == 2 { return d; }; }; }; print f(); print f();")
+
+    def test_operators(self):
+        self.assert_same_as_tree("print !1 == 0 | 1 & 0; print -(12.05.2020 - 10.05.2020).days;"
+                                 "print '1D 2h'.hours * 2 / 3; print \"a\" + 1 + 2; print 12:00:00 > 10:00:00;")
+
+    def test_errors(self):
+        self.assert_same_as_tree('print 1; print 1 + "a" - 2;')
+        self.assert_same_as_tree("print 1.years;")
+        self.assert_same_as_tree("var x; print x;")
+        self.assert_same_as_tree("d = 1;")
+        self.assert_same_as_tree("print nope(1);")
+        self.assert_same_as_tree("from 01.01.2020 to 1 by days as d { };")
+
+    def test_errors_in_arguments(self):
+        self.assert_same_as_tree("fun f(a) { return a; }; var a = 5; print f(a);")
+        self.assert_same_as_tree("fun f(a) { return a; }; print f(f(1, 2));")
+        self.assert_same_as_tree("fun f(a) { return a; }; var b = f(1, 2);")
+
+    def test_bad_arguments_count(self):
+        with self.assertRaisesRegex(ValueError, "TODO"):
+            self.run_program("fun f(a) { return a; }; print f(1, 2);")
+
+    def test_deeply_nested_expression(self):
+        self.assertEqual(([], 5001), self.assert_same_as_tree("return " + "(" * 5000 + "1" + " + 1)" * 5000 + ";"))
+
+    def test_deeply_nested_optimized_expression(self):
+        program = parse("var a = 2;" + ("print " + "-(" * 1200 + "a" + ")" * 1200 + ";") * 2)
+        optimization.optimize(program)
+        self.assertEqual((["2", "2"], None), run_program(program, self.engine))
+
+    def test_lazy_program(self):
+        self.assert_same_as_tree("fun f(x) { if x > 1 { return x * 2; }; return 0; }; fun g() { print ; };"
+                                 "return f(3);", LazyProgram)
@@ -0,0 +1,6 @@
+from timoninterpreter import closure_compilation
+from tests.unit import engine_testing
+
+
+class ClosureCompilationTestCase(engine_testing.EngineTestCase):
+    engine = staticmethod(closure_compilation.execute)
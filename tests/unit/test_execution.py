@@ -4,9 +4,12 @@ import unittest.mock as mock
 
 from timoninterpreter import error_handling
 from timoninterpreter.lexical_analysis import Lexer
+from timoninterpreter.source_readers import BufferReader
 from timoninterpreter.source_readers import FileReader
+from timoninterpreter.syntax_nodes import LazyProgram
 from timoninterpreter.syntax_nodes import Program
 from timoninterpreter.execution import Environment
+from timoninterpreter.execution import FrameLayout
 
 
 class BaseExecutionTestCase(unittest.TestCase):
@@ -336,3 +339,157 @@ class ExecutionTimeAccessTestCase(BaseExecutionTestCase):
     @mock.patch('builtins.open', return_value=io.StringIO("return 1.seconds;"))
     def test_seconds_bad_type(self, mock_open):
         self.assert_raises(error_handling.ExecutionError)
+
+
+# noinspection PyUnusedLocal
+class ExecutionNestingTestCase(BaseExecutionTestCase):
+    @mock.patch('builtins.open', return_value=io.StringIO("return " + "(" * 5000 + "1" + " + 1)" * 5000 + ";"))
+    def test_deeply_nested_expression(self, mock_open):
+        self.assert_return_value(5001)
+
+    @mock.patch('builtins.open', return_value=io.StringIO("fun f(a) { return a + 1; };"
+                                                          "return " + "f(" * 5000 + "0" + ")" * 5000 + ";"))
+    def test_deeply_nested_calls(self, mock_open):
+        self.assert_return_value(5000)
+
+    @mock.patch('builtins.open', return_value=io.StringIO("fun f(a, b) { return a - b; };"
+                                                          "return f(f(5, 2), 1);"))
+    def test_arguments_order(self, mock_open):
+        self.assert_return_value(2)
+
+    @mock.patch('builtins.open', return_value=io.StringIO("fun f(a) { return a; };"
+                                                          "return f(f(1, 2));"))
+    def test_bad_arguments_count_in_argument(self, mock_open):
+        self.assert_raises(error_handling.ExecutionError)
+
+
+class ExecutionStreamedTestCase(unittest.TestCase):
+    def execute_streamed(self, text, environment):
+        with BufferReader("whatever", text) as br:
+            return Program.execute_streamed(Lexer(br), environment)
+
+    def test_return_value(self):
+        text = "fun f(x) { return x * 2; }; var a = 5; a = f(a); return a + 1;"
+        self.assertEqual(11, self.execute_streamed(text, Environment()))
+
+    def test_statements_after_return_not_parsed(self):
+        self.assertEqual(1, self.execute_streamed("return 1; print ;", Environment()))
+
+    def test_executed_before_syntactic_error(self):
+        text = "fun f() { return 2; };\nvar a = f();\nprint ;"
+        environment = Environment()
+        with self.assertRaises(error_handling.SyntacticError) as cm:
+            self.execute_streamed(text, environment)
+
+        self.assertEqual(2, environment.get_var("a"))
+        self.assertEqual(3, cm.exception.token.get_file_pos().get_line_num())
+        self.assertEqual(6, cm.exception.token.get_file_pos().get_line_pos())
+
+
+class ExecutionLazyTestCase(unittest.TestCase):
+    def execute(self, text):
+        with BufferReader("whatever", text) as br:
+            return LazyProgram(Lexer(br)).execute(Environment())
+
+    def test_called_function(self):
+        self.assertEqual(6, self.execute("fun f(x) { if x > 1 { return x * 2; }; return 0; }; return f(3);"))
+
+    def test_error_in_uncalled_function_ignored(self):
+        self.assertEqual(1, self.execute("fun f() { print ; }; return 1;"))
+
+    def test_error_in_called_function(self):
+        with self.assertRaises(error_handling.SyntacticError) as cm:
+            self.execute("fun f() {\nprint ; }; return f();")
+        self.assertEqual(2, cm.exception.token.get_file_pos().get_line_num())
+
+
+class ExecutionResolutionTestCase(unittest.TestCase):
+    @staticmethod
+    def parse(text):
+        with BufferReader("whatever", text) as br:
+            return Program(Lexer(br))
+
+    def execute(self, text):
+        return self.parse(text).execute(Environment())
+
+    def assert_execution_error(self, text, message):
+        with self.assertRaises(error_handling.ExecutionError) as cm:
+            self.execute(text)
+        self.assertEqual(message, cm.exception.message)
+
+    def test_bindings(self):
+        program = self.parse("var a = 1; from 01.01.2000 to 02.01.2000 by days as d { var b = d; a = b; };")
+        program.resolve()
+        from_statement = program.statements[1]
+        definition, assignment = from_statement.body.statements
+        self.assertEqual((0, 0), program.statements[0].identifier.binding)
+        self.assertEqual((0, 0), from_statement.identifier.binding)
+        self.assertEqual((0, 1), definition.identifier.binding)
+        self.assertEqual((0, 0), definition.assignment.expression.binding)
+        self.assertEqual((1, 0), assignment.identifier.binding)
+
+    def test_scope_without_declarations_elided(self):
+        program = self.parse("var a = 1; if a { a = 2; } else { var b = 3; };")
+        program.resolve()
+        if_statement = program.statements[1]
+        self.assertIsNone(if_statement.body.layout)
+        self.assertEqual(1, if_statement.else_body.layout.get_size())
+        self.assertEqual((0, 0), if_statement.body.statements[0].identifier.binding)
+
+    def test_shadowing(self):
+        self.assertEqual(1, self.execute("var a = 1; if 1 { var a = 2; a = 3; }; return a;"))
+
+    def test_declared_in_inner_scope(self):
+        self.assert_execution_error("if 1 { var a = 2; }; return a;", "Variable a undeclared")
+
+    def test_used_before_declaration_in_loop(self):
+        self.assert_execution_error("from 01.01.2000 to 02.01.2000 by days as d { print x; var x = 1; };",
+                                    "Variable x undeclared")
+
+    def test_callers_variables_visible_in_function(self):
+        self.assertEqual(7, self.execute("fun f() { return g; }; var g = 5; if 1 { var g = 7; return f(); };"))
+
+    def test_arguments_see_parameters(self):
+        self.assert_execution_error("fun f(a) { return a; }; var a = 5; return f(a);", "Variable a uninitialized")
+
+    def test_nested_loops_release_frames(self):
+        environment = Environment()
+        self.parse("from 01.01.2000 to 03.01.2000 by days as d {"
+                   "    from 01.01.2000 to 03.01.2000 by days as e { var x = e; };"
+                   "};").execute(environment)
+        self.assertRaises(OverflowError, environment.pop_frame)
+
+    def test_static_errors(self):
+        program = self.parse("print 1;\n"
+                             "if 0 { print x; };\n"
+                             "fun f(a) { return g(a) + y; };\n"
+                             "print f(1, 2);")
+        errors = program.resolve()
+        self.assertEqual([(2, "Variable x undeclared"), (3, "Function g undeclared"),
+                          (4, "Function f called with 2 arguments")],
+                         [(error.token.get_file_pos().get_line_num(), error.message) for error in errors])
+
+    def test_static_errors_not_raised_in_dead_code(self):
+        self.assertEqual(1, self.execute("if 0 { print x; }; return 1;"))
+
+
+class EnvironmentFramesTestCase(unittest.TestCase):
+    def test_declared_on_entry(self):
+        layout = FrameLayout()
+        layout.declare("a", on_entry=True)
+        layout.declare("b")
+        environment = Environment()
+        environment.push_frame(layout)
+        self.assertRaisesRegex(ValueError, "Variable a uninitialized", environment.get_var, "a")
+        self.assertRaisesRegex(ValueError, "Variable b undeclared", environment.get_var, "b")
+
+    def test_reset_frame(self):
+        layout = FrameLayout(["a", "b"])
+        environment = Environment()
+        environment.push_frame(layout)
+        environment.declare(1)
+        environment.set_slot(0, 1, 5)
+        environment.reset_frame()
+        self.assertRaisesRegex(ValueError, "Variable b undeclared", environment.get_var, "b")
+        environment.pop_frame()
+        self.assertRaises(OverflowError, environment.pop_frame)
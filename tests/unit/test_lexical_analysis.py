@@ -6,7 +6,12 @@ from timoninterpreter import error_handling
 from timoninterpreter import lexical_analysis
 from timoninterpreter import tokens
 from timoninterpreter.lexical_analysis import Lexer
+from timoninterpreter.lexical_analysis import TableLexer
+from timoninterpreter.lexical_analysis import retokenize
+from timoninterpreter.lexical_analysis import tokenize
+from timoninterpreter.source_readers import BufferReader
 from timoninterpreter.source_readers import FileReader
+from timoninterpreter.source_readers import StreamReader
 
 
 class BaseLexerTestCase(unittest.TestCase):
@@ -510,3 +515,266 @@ class LexerPeekTestCase(BaseLexerTestCase):
             token = lex.peek()
             self.assertEqual(tokens.TokenType.IDENTIFIER, token.get_type())
             self.assertEqual('a', token.get_value())
+
+
+    @mock.patch('builtins.open', return_value=io.StringIO(" a b c "))
+    def test_peek_further(self, mock_open):
+        with FileReader("whatever") as fr:
+            lex = Lexer(fr)
+            self.assertEqual('c', lex.peek(3).get_value())
+            self.assertEqual('a', lex.peek().get_value())
+            self.assertEqual(tokens.TokenType.END, lex.peek(5).get_type())
+            self.assertEqual('a', lex.get().get_value())
+            self.assertEqual('b', lex.get().get_value())
+            self.assertEqual('c', lex.peek().get_value())
+
+    @mock.patch('builtins.open', return_value=io.StringIO(" a b c "))
+    def test_peek_does_not_rewind_reader(self, mock_open):
+        with FileReader("whatever") as fr:
+            lex = Lexer(fr)
+            with mock.patch.object(fr, 'rewind_backward') as rewind_backward, \
+                    mock.patch.object(fr, 'rewind_forward') as rewind_forward:
+                lex.peek(2)
+                lex.get()
+                lex.get()
+            rewind_backward.assert_not_called()
+            rewind_forward.assert_not_called()
+
+    def test_peek_further_all_engines(self):
+        for make_lexer in [Lexer, TableLexer, lambda br: tokenize(br).view()]:
+            with BufferReader("whatever", "a + 12 c") as br:
+                lex = make_lexer(br)
+                self.assertEqual(12, lex.peek(3).get_value())
+                self.assertEqual('c', lex.peek(4).get_value())
+                self.assertEqual(tokens.TokenType.END, lex.peek(6).get_type())
+                self.assertEqual('a', lex.get().get_value())
+                self.assertEqual(tokens.TokenType.PLUS, lex.get().get_type())
+                self.assertEqual('c', lex.peek(2).get_value())
+                self.assertEqual(12, lex.get().get_value())
+                self.assertEqual('c', lex.get().get_value())
+
+class LexerStreamReaderTestCase(unittest.TestCase):
+    def test_peek_and_get_from_stream(self):
+        statements = 'var abc = "text \\" text"; # comment # print 12.05.2020~10:00:00;\n' * 500
+
+        with StreamReader(io.StringIO(statements), chunk_size=16) as sr:
+            lex = Lexer(sr)
+            read_tokens = []
+            while lex.peek().get_type() != tokens.TokenType.END:
+                read_tokens.append(lex.get())
+
+        self.assertEqual(8 * 500, len(read_tokens))
+        self.assertEqual('text " text', read_tokens[-5].get_value())
+        self.assertEqual(tokens.DateTimeValue(12, 5, 2020, 10, 0, 0), read_tokens[-2].get_value())
+        self.assertEqual(500, read_tokens[-1].get_file_pos().get_line_num())
+
+
+class TableLexerTestCase(unittest.TestCase):
+    SOURCES = [
+        "fun main() { var x = 5; print x + 2.5; }",
+        "abc_12 ZZ _x\tif else from to by return print",
+        "12.05.2020 12.05.2020~10:00:00 10:00:00 'P1Y 2M 3D' '1Y 2M 3W 4D 5h 6m 7s' ''",
+        "== != <= >= < > = ! | & + - * / , . ; ( ) { }",
+        '"text \\" text" "" "\\n"',
+        "# comment # x # unclosed",
+        "0 0.5 00 1.2.2020 12.13.2020 25:00:00 '1X' \"unclosed",
+        "ąę $ @ 123abc",
+        "",
+    ]
+
+    @staticmethod
+    def read_all(lexer_class, source):
+        result = []
+        with BufferReader("whatever", source) as br:
+            lex = lexer_class(br)
+            while True:
+                try:
+                    token = lex.get()
+                except error_handling.LexicalError as e:
+                    result.append((e.file_pos.get_absolute_pos(), e.message))
+                    break
+                pos = token.get_file_pos()
+                result.append((token.get_type(), token.get_value(), pos.get_line_num(), pos.get_line_pos()))
+                if token.get_type() == tokens.TokenType.END:
+                    break
+        return result
+
+    def assert_same_as_classic(self, source):
+        with mock.patch('timoninterpreter.error_handling.report_lexical_warning') as classic_warnings:
+            expected = self.read_all(Lexer, source)
+        with mock.patch('timoninterpreter.error_handling.report_lexical_warning') as table_warnings:
+            actual = self.read_all(TableLexer, source)
+        self.assertEqual(expected, actual)
+        self.assertEqual(classic_warnings.call_args_list, table_warnings.call_args_list)
+
+    def test_same_tokens_as_classic(self):
+        for source in self.SOURCES:
+            with self.subTest(source=source):
+                self.assert_same_as_classic(source)
+
+    def test_same_tokens_as_classic_on_limits(self):
+        for source in ["a" * lexical_analysis.IdentifierSubLexer.MAX_IDENTIFIER_LENGTH, "a" * (lexical_analysis.IdentifierSubLexer.MAX_IDENTIFIER_LENGTH + 1),
+                       "1" * lexical_analysis.NumberLiteralSubLexer.MAX_NUMBER_LITERAL_LENGTH, "1" * (lexical_analysis.NumberLiteralSubLexer.MAX_NUMBER_LITERAL_LENGTH + 1),
+                       " " * Lexer.MAX_SKIPPABLE_CHARACTERS_LENGTH + "x",
+                       " " * (Lexer.MAX_SKIPPABLE_CHARACTERS_LENGTH + 1) + "x"]:
+            with self.subTest(length=len(source)):
+                self.assert_same_as_classic(source)
+
+    def test_same_tokens_as_classic_on_scripts(self):
+        import pathlib
+        for path in sorted(pathlib.Path(__file__).parents[1].joinpath("acceptance", "scripts").glob("*.tim")):
+            with self.subTest(script=path.name):
+                self.assert_same_as_classic(path.read_text())
+
+
+class TokenBufferTestCase(unittest.TestCase):
+    SOURCE = 'fun f(a) { return a + 1; } # comment # print f(2) "text" 12.05.2020 \'1D\' abc;'
+
+    @staticmethod
+    def read_all(lexer):
+        result = []
+        while not (result and result[-1][0] == tokens.TokenType.END):
+            token = lexer.get()
+            result.append((token.get_type(), token.get_value(), token.get_file_pos().get_absolute_pos()))
+        return result
+
+    def test_view_same_as_lexer(self):
+        for lexer_class in [Lexer, TableLexer]:
+            with self.subTest(lexer=lexer_class.__name__):
+                with BufferReader("whatever", self.SOURCE) as br:
+                    expected = self.read_all(lexer_class(br))
+                with BufferReader("whatever", self.SOURCE) as br:
+                    actual = self.read_all(tokenize(br, lexer_class).view())
+                self.assertEqual(expected, actual)
+
+    def test_random_access(self):
+        with BufferReader("whatever", self.SOURCE) as br:
+            token_buffer = tokenize(br)
+
+        self.assertEqual(23, len(token_buffer))
+        self.assertEqual(tokens.TokenType.FUN, token_buffer.get_type(0))
+        self.assertEqual("f", token_buffer.get_value(1))
+        self.assertIsNone(token_buffer.get_value(2))
+        self.assertEqual(tokens.DateValue(12, 5, 2020), token_buffer.get_value(18))
+        self.assertEqual(self.SOURCE.index("abc"), token_buffer.get_absolute_pos(20))
+        self.assertEqual("abc", token_buffer.get_token(20).get_value())
+
+    def test_view_returns_end_after_end(self):
+        with BufferReader("whatever", "a") as br:
+            view = tokenize(br).view()
+
+        self.assertEqual(tokens.TokenType.IDENTIFIER, view.get().get_type())
+        self.assertEqual(tokens.TokenType.END, view.get().get_type())
+        self.assertEqual(tokens.TokenType.END, view.peek().get_type())
+        self.assertEqual(tokens.TokenType.END, view.get().get_type())
+
+    def test_error_raised_when_reached(self):
+        with BufferReader("whatever", "a b $ c") as br:
+            view = tokenize(br).view()
+
+        self.assertEqual("a", view.get().get_value())
+        self.assertEqual("b", view.get().get_value())
+        with self.assertRaises(error_handling.LexicalError) as cm:
+            view.peek()
+        self.assertEqual(4, cm.exception.file_pos.get_absolute_pos())
+
+    def test_take_bracketed(self):
+        text = 'a { "x" { 1 } b; } c'
+        with BufferReader("whatever", text) as br:
+            view = tokenize(br).view()
+        view.get()
+
+        body_tokens = self.read_all(view.take_bracketed().view())
+        with BufferReader("whatever", text[2:18]) as br:
+            expected = [(token_type, value, pos + 2) for token_type, value, pos in self.read_all(Lexer(br))]
+        self.assertEqual(expected[:-1], body_tokens[:-1])
+        self.assertEqual(tokens.TokenType.END, body_tokens[-1][0])
+        self.assertEqual("c", view.get().get_value())
+
+    def test_recorder(self):
+        with BufferReader("whatever", self.SOURCE) as br:
+            expected = self.read_all(Lexer(br))
+        with BufferReader("whatever", self.SOURCE) as br:
+            recorder = lexical_analysis.TokenRecorder(Lexer(br), lexical_analysis.TokenBuffer(None))
+            for _ in range(5):
+                recorder.peek(2)
+                recorder.get()
+            self.assertEqual(expected[5][1], recorder.peek().get_value())
+
+        recorded = self.read_all(recorder.finish().view())
+        self.assertEqual(expected[:5], recorded[:-1])
+        self.assertEqual((tokens.TokenType.END, None, expected[4][2] + 1), recorded[-1])
+
+    def test_take_bracketed_not_closed(self):
+        for text, first_type in [("a", tokens.TokenType.IDENTIFIER),
+                                 ("{ a { }", tokens.TokenType.LEFT_BRACKET),
+                                 ("{ a $ }", tokens.TokenType.LEFT_BRACKET)]:
+            with self.subTest(text=text):
+                with BufferReader("whatever", text) as br:
+                    view = tokenize(br).view()
+                self.assertIsNone(view.take_bracketed())
+                self.assertEqual(first_type, view.peek().get_type())
+
+
+class RetokenizeTestCase(unittest.TestCase):
+    @staticmethod
+    def dump(token_buffer):
+        error = token_buffer.get_error()
+        return ([(token_buffer.get_type(i), token_buffer.get_absolute_pos(i), token_buffer.get_value(i))
+                 for i in range(len(token_buffer))],
+                (error.file_pos.get_absolute_pos(), error.message) if error is not None else None)
+
+    def assert_same_as_tokenize(self, text, absolute_pos, removed_length, inserted_text):
+        with BufferReader("whatever", text) as br:
+            old_buffer = tokenize(br)
+        new_buffer = retokenize(old_buffer, absolute_pos, removed_length, inserted_text)
+
+        new_text = text[:absolute_pos] + inserted_text + text[absolute_pos + removed_length:]
+        with BufferReader("whatever", new_text) as br:
+            expected_buffer = tokenize(br)
+        self.assertEqual(new_text, new_buffer.get_text())
+        self.assertEqual(self.dump(expected_buffer), self.dump(new_buffer))
+
+    @mock.patch('timoninterpreter.error_handling.report_lexical_warning')
+    def test_edits(self, mock_warning):
+        text = 'var a = 12; print "x y"; # c # b = \'1D 2h\' + a; fun f() { return 10:00:00; }'
+        for absolute_pos, removed_length, inserted_text in [(4, 1, "abc"),   # identifier
+                                                            (5, 0, "b"),     # extending identifier
+                                                            (8, 2, ""),      # removing number
+                                                            (0, 0, "#"),     # opening comment
+                                                            (25, 1, ""),     # removing comment bound
+                                                            (18, 0, '"'),    # opening string
+                                                            (22, 1, ""),     # removing string bound
+                                                            (36, 0, "'"),    # opening timedelta
+                                                            (41, 1, " '"),   # moving timedelta bound
+                                                            (6, 0, "$"),     # error
+                                                            (len(text), 0, " a"),
+                                                            (0, len(text), "")]:
+            with self.subTest(absolute_pos=absolute_pos, removed_length=removed_length, inserted_text=inserted_text):
+                self.assert_same_as_tokenize(text, absolute_pos, removed_length, inserted_text)
+
+    def test_edits_around_error(self):
+        text = "a b $ c d"
+        for absolute_pos, removed_length, inserted_text in [(0, 1, "xyz"), (4, 1, ""), (8, 1, "e")]:
+            with self.subTest(absolute_pos=absolute_pos, removed_length=removed_length, inserted_text=inserted_text):
+                self.assert_same_as_tokenize(text, absolute_pos, removed_length, inserted_text)
+
+    def test_only_edited_part_lexed(self):
+        text = "var a = 1;\n" * 1000
+        with BufferReader("whatever", text) as br:
+            old_buffer = tokenize(br)
+
+        with mock.patch.object(TableLexer, 'get', autospec=True, side_effect=TableLexer.get) as mock_get:
+            new_buffer = retokenize(old_buffer, 5000, 1, "bc")
+
+        self.assertLess(mock_get.call_count, 10)
+        self.assertEqual(len(old_buffer), len(new_buffer))
+        self.assertEqual(old_buffer.get_absolute_pos(len(old_buffer) - 1) + 1,
+                         new_buffer.get_absolute_pos(len(new_buffer) - 1))
+
+    def test_edit_outside_text(self):
+        with BufferReader("whatever", "a b") as br:
+            token_buffer = tokenize(br)
+
+        with self.assertRaises(ValueError):
+            retokenize(token_buffer, 2, 2, "")
@@ -0,0 +1,157 @@
+import unittest
+
+from timoninterpreter import closure_compilation
+from timoninterpreter import optimization
+from timoninterpreter import python_compilation
+from timoninterpreter import virtual_machine
+from timoninterpreter.syntax_nodes import Constant
+from timoninterpreter.syntax_nodes import Identifier
+from timoninterpreter.syntax_nodes import IfStatement
+from timoninterpreter.syntax_nodes import LazyProgram
+from timoninterpreter.syntax_nodes import MathExpression
+from timoninterpreter.syntax_nodes import Program
+from timoninterpreter.syntax_nodes import VariableDefinitionStatement
+from tests.unit import engine_testing
+
+ENGINES = [Program.execute, closure_compilation.execute, virtual_machine.execute, python_compilation.execute]
+
+
+class OptimizationTestCase(unittest.TestCase):
+    parse = staticmethod(engine_testing.parse)
+    run_program = staticmethod(engine_testing.run_program)
+
+    def assert_same_as_unoptimized(self, text):
+        expected = self.run_program(self.parse(text), Program.execute)
+        for engine in ENGINES:
+            program = self.parse(text)
+            optimization.optimize(program)
+            self.assertEqual(expected, self.run_program(program, engine))
+        return expected
+
+    def test_folded_values(self):
+        program = self.parse("print 01.01.2020 + '1M'; print '1W' * 4; print 15.11.2021 - 28.05.2020;"
+                             "print -(2 + 3) * 4; print !(1 == 1);")
+        optimization.optimize(program)
+        for statement in program.statements:
+            self.assertIsInstance(statement.expression, Constant)
+        self.assertEqual(([], 5), self.assert_same_as_unoptimized("var a = 2 * 3; return a - 1;"))
+        self.assert_same_as_unoptimized("print 01.01.2020 + '1M'; print '1W' * 4; print 15.11.2021 - 28.05.2020;"
+                                        "print -(2 + 3) * 4; print !(1 == 1); print (12.05.2020 - 10.05.2020).days;"
+                                        "print \"a\" + 1 + 2; print 12:00:00 > 10:00:00 & 1;")
+
+    def test_partial_folding(self):
+        program = self.parse("var a = 1; print 1 + 2 + a + 3;")
+        optimization.optimize(program)
+        expression = program.statements[1].expression
+        self.assertIsInstance(expression, MathExpression)
+        self.assertEqual(3, expression.first_expression.get_value())
+        self.assertEqual(2, len(expression.operations))
+        self.assert_same_as_unoptimized("var a = 1; print 1 + 2 + a + 3; print a + 2 * 3;"
+                                        "from 01.01.2020 to 01.01.2020 + '2D' by days as d { print d - '1D'; };")
+
+    def test_errors(self):
+        self.assert_same_as_unoptimized('print 1; print 1 + "a" - 2;')
+        self.assert_same_as_unoptimized("print 1.years;")
+        self.assert_same_as_unoptimized("print 2 * 3; var a = -(1 + 2).days;")
+        self.assert_same_as_unoptimized('from 01.01.2020 to 1 + 2 by days as d { print d; };')
+
+    @staticmethod
+    def hidden_definitions(program):
+        return [statement for statement in optimization.iterate_statements(program)
+                if isinstance(statement, VariableDefinitionStatement)
+                and statement.identifier.get_value().startswith("$")]
+
+    def assert_shared(self, text, count):
+        program = self.parse(text)
+        optimization.optimize(program)
+        self.assertEqual(count, len(self.hidden_definitions(program)))
+        return self.assert_same_as_unoptimized(text)
+
+    def test_common_subexpressions(self):
+        self.assertEqual((["17"], None), self.assert_shared(
+            "fun getMonthDiff(d1, d2) { return (d1 - d2).months + 12 * (d1 - d2).years; };"
+            "print getMonthDiff(15.11.2021, 28.05.2020);", 1))
+        self.assert_shared("var a = 5; var b = 3; print (a - b) * (a - b); print (a - b) + 1; a = 1;"
+                           "print (a - b) * (a - b);", 2)
+        self.assert_shared("var a = 2; print ((a * a) - 1) * ((a * a) - 1) + (a * a);", 2)
+        self.assert_shared("var a = 5; if a + 1 > 2 { print a + 1; a = 3; }; print (a + 1) + (a + 1);", 1)
+        self.assert_shared("var a = 1; print (a * 2) + (a * 2); return a * 2; print (a * 2) + (a * 2);", 1)
+
+    def test_impure_subexpressions(self):
+        self.assert_shared("fun f() { a = 10; return 0; }; var a = 5; print (a - 1) + f() + (a - 1);", 0)
+        self.assert_shared("fun f() { a = 10; return 0; }; var a = 5; print a - 1; f(); print a - 1;", 0)
+        self.assert_shared("fun f(a) { return a; }; var a = 5; print f(a - 1) + f(a - 1);", 0)
+        self.assert_shared("var a = 5; var b = (a - 1) * 2; var a = a - 1;", 0)
+
+    def test_errors_of_common_subexpressions(self):
+        self.assert_shared("var a = 5; print x + (a - 1) + (a - 1);", 0)
+        self.assert_shared('var a = 5; print (a - "x") + x + (a - "x");', 1)
+        self.assert_shared("var a = 5; print x; print (a - 1) + (a - 1);", 1)
+        self.assert_shared('var a = 5; print 01.01.2020 + 5 + (a - "x") + (a - "x");', 0)
+
+    def assert_moved(self, text, count):
+        program = self.parse(text)
+        optimization.move_loop_invariants(program)
+        guards = [statement for statement in optimization.iterate_statements(program)
+                  if isinstance(statement, IfStatement) and isinstance(statement.expression, Identifier)
+                  and statement.expression.get_value().startswith("$")]
+        self.assertEqual(count, len(guards))
+        return self.assert_same_as_unoptimized(text)
+
+    def test_loop_invariants(self):
+        self.assertEqual((["20"], None), self.assert_moved(
+            "var a = 01.01.2020; var s = 0; from 01.01.2020 to 05.01.2020 by days as d {"
+            "s = s + (a + '1M').days + d.days; }; print s;", 1))
+        self.assert_moved("var a = 01.01.2020; from 01.01.2020 to 03.01.2020 by days as d {"
+                          "from d to a + '1M' by months as m { print m; }; };", 1)
+        self.assert_moved("var a = 01.01.2020; from 01.01.2020 to 03.01.2020 by days as d {"
+                          "from (a + '1D') to a + '3D' by days as m { print m - (a + '1M'); }; };", 2)
+        self.assert_moved("fun f(x) { return g(x) + 1; }; fun g(y) { return y * 2; }; var a = 2;"
+                          "from 01.01.2020 to 03.01.2020 by days as d { print f(a) + d.days; };", 1)
+        self.assert_moved("fun h(n) { var k = n * 2; from 01.01.2020 to 03.01.2020 by days as d {"
+                          "print k + n * 3; }; return k; }; print h(2); print h(3);", 1)
+
+    def test_nested_loop_invariants(self):
+        program = self.parse("var a = 01.01.2020; from 01.01.2020 to 03.01.2020 by days as d {"
+                             "from 01.01.2020 to 02.01.2020 by days as e { print e - (a + '1M'); }; };")
+        optimization.move_loop_invariants(program)
+        self.assertEqual(2, len(self.hidden_definitions(program)))
+        self.assertEqual(2, len([statement for statement in self.hidden_definitions(program)
+                                 if statement in program.statements]))
+        self.assert_moved("var a = 01.01.2020; from 01.01.2020 to 03.01.2020 by days as d {"
+                          "from d to d + '1D' by days as e { print e - (a + '1M') + (d - '1D'); }; };", 1)
+
+    def test_impure_loops(self):
+        self.assert_moved("var a = 5; from 01.01.2020 to 03.01.2020 by days as d { print a * 2 * 3; a = a + 1; };",
+                          0)
+        self.assert_moved("fun f(x) { print x; return x * 2; }; var a = 5;"
+                          "from 01.01.2020 to 03.01.2020 by days as d { print f(a) + d.days; };", 0)
+        self.assert_moved("fun f(x) { return x * y; }; var y = 2; var a = 5;"
+                          "from 01.01.2020 to 03.01.2020 by days as d { var y = d.days; print f(a); };", 0)
+        self.assert_moved("fun g() { a = a + 1; return 0; }; var a = 5;"
+                          "from 01.01.2020 to 03.01.2020 by days as d { print a * 2 * 3; g(); };", 0)
+        self.assert_moved("fun f() { return 7; }; fun f() { return 8; };"
+                          "from 01.01.2020 to 03.01.2020 by days as d { print f() * 2; };", 0)
+
+    def test_errors_of_loop_invariants(self):
+        self.assert_moved("var a = 5; from 01.01.2020 to 01.01.2019 by days as d { print a + '1D'; };", 1)
+        self.assert_moved("var a = 5; from 01.01.2020 to 03.01.2020 by days as d {"
+                          "if d.days == 2 { print a + '1D'; }; };", 1)
+        self.assert_moved("var a = 5; from 01.01.2020 to 03.01.2020 by days as d { print d.days + (a + '1D'); };", 0)
+        self.assert_moved("var a = 5; from 01.01.2020 to 03.01.2020 by days as d { print (a + '1D') + x; };", 1)
+        self.assert_moved("var a; from 01.01.2020 to 03.01.2020 by days as d { print 1; print a + '1D'; };", 1)
+        self.assert_moved("fun f(x) { return x * 2; }; var a = 5;"
+                          "from 01.01.2020 to 03.01.2020 by days as d { print f(a, 1) * 2; };", 0)
+        self.assert_moved("var a = 5; from 01.01.2020 to 03.01.2020 by days as d {"
+                          "from a + '1D' to 2 by days as e { print e; }; };", 1)
+        self.assertEqual(([], (73, "Can't get weeks from DateValue")), self.assert_moved(
+            "from 01.01.2020 to 01.01.2020 + '1D' by days as j { print -((26.07.2020).weeks); };", 0))
+
+    def test_lazy_bodies(self):
+        program = self.parse("fun f() { return 2 * 3; }; print f();", LazyProgram)
+        optimization.optimize(program)
+        self.assertEqual((["6"], None), self.run_program(program, closure_compilation.execute))
+
+
+if __name__ == '__main__':
+    unittest.main()
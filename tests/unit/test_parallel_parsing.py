@@ -0,0 +1,110 @@
+import unittest
+
+from timoninterpreter import error_handling
+from timoninterpreter import syntax_nodes
+from timoninterpreter.lexical_analysis import Lexer
+from timoninterpreter.lexical_analysis import tokenize
+from timoninterpreter.parallel_parsing import find_split_points
+from timoninterpreter.parallel_parsing import parse_parallel
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.table_parsing import parse
+
+
+class FindSplitPointsTestCase(unittest.TestCase):
+    def test_top_level_semicolons(self):
+        text = "var a = 1; print a; a = 2;"
+        self.assertEqual([10, 19, 26], find_split_points(text, 1))
+
+    def test_chunk_length(self):
+        text = "var a = 1; print a; a = 2;"
+        self.assertEqual([19], find_split_points(text, 15))
+
+    def test_nested_semicolons_skipped(self):
+        text = 'fun f() { print 1; }; if a { b = (2); } else { b = 3; }; print f();'
+        self.assertEqual([21, 56, 67], find_split_points(text, 1))
+
+    def test_literals_and_comments_skipped(self):
+        text = 'print ";"; # ; ( # print "\\";{"; print \'1D\';'
+        self.assertEqual([10, 32, 44], find_split_points(text, 1))
+
+    def test_stops_at_unclosed_bound(self):
+        self.assertEqual([8], find_split_points('print 1; print "a; print 2;', 1))
+        self.assertEqual([8], find_split_points('print 1; # a; print 2;', 1))
+        self.assertEqual([8], find_split_points('print 1; print "a\\"; print 2;', 1))
+
+    def test_stops_at_unbalanced_bracket(self):
+        self.assertEqual([8], find_split_points('print 1; }; print 2;', 1))
+
+
+class ParseParallelTestCase(unittest.TestCase):
+    TEXT = '''
+        fun f(a, b) {
+            if a > b { return a; } else { return b; };
+        };
+        var x = 12.05.2020~10:00:00; # comment; #
+        from 01.01.2020 to 05.01.2020 by days as d { print d; };
+        print "a; \\" b";
+        x = x + '1D';
+        print f(1, 2);
+    ''' * 5
+
+    @staticmethod
+    def describe(node):
+        if isinstance(node, syntax_nodes.LeafNode):
+            file_pos = node.token.get_file_pos()
+            return (type(node).__name__, node.token.get_type(), node.token.get_value(),
+                    file_pos.get_absolute_pos(), file_pos.get_line_num(), file_pos.get_line_pos())
+        return type(node).__name__, [ParseParallelTestCase.describe(child) for child in node.get_children()]
+
+    def parse_sequential(self, text):
+        with BufferReader("whatever", text) as br:
+            return syntax_nodes.Program(Lexer(br))
+
+    def parse_parallel(self, text):
+        with BufferReader("whatever", text) as br:
+            return parse_parallel(br, max_workers=2, chunk_length=1)
+
+    def test_same_as_sequential(self):
+        self.assertEqual(self.describe(self.parse_sequential(self.TEXT)),
+                         self.describe(self.parse_parallel(self.TEXT)))
+
+    def test_single_worker(self):
+        with BufferReader("whatever", self.TEXT) as br:
+            program = parse_parallel(br, max_workers=1)
+        self.assertEqual(self.describe(self.parse_sequential(self.TEXT)), self.describe(program))
+
+    def test_table_parser(self):
+        with BufferReader("whatever", self.TEXT) as br:
+            program = parse_parallel(br, max_workers=2, chunk_length=1, parser=parse)
+        self.assertEqual(self.describe(self.parse_sequential(self.TEXT)), self.describe(program))
+
+    def test_first_syntactic_error(self):
+        text = self.TEXT + "print ;\n" + self.TEXT + "var ;\n"
+        with self.assertRaises(error_handling.SyntacticError) as cm:
+            self.parse_parallel(text)
+
+        file_pos = cm.exception.token.get_file_pos()
+        self.assertEqual(text.index("print ;") + 6, file_pos.get_absolute_pos())
+        self.assertEqual(text.count("\n", 0, file_pos.get_absolute_pos()) + 1, file_pos.get_line_num())
+
+    def test_lexical_error(self):
+        text = self.TEXT + "print $;\n" + self.TEXT
+        with self.assertRaises(error_handling.LexicalError) as cm:
+            self.parse_parallel(text)
+
+        self.assertEqual(text.index("$"), cm.exception.file_pos.get_absolute_pos())
+
+    def test_error_in_last_chunk(self):
+        text = self.TEXT + 'print "unclosed;'
+        with self.assertRaises(error_handling.SyntacticError) as cm:
+            self.parse_parallel(text)
+
+        self.assertEqual(len(text), cm.exception.token.get_file_pos().get_absolute_pos())
+
+    def test_continues_from_reader_position(self):
+        text = "print 1;" + self.TEXT
+        with BufferReader("whatever", text) as br:
+            tokenize(br)  # whole text is consumed
+            br.seek(8)
+            program = parse_parallel(br, max_workers=2, chunk_length=1)
+        self.assertEqual(self.describe(self.parse_sequential(text))[1][1:], self.describe(program)[1])
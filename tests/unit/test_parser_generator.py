@@ -0,0 +1,71 @@
+import os
+import unittest
+
+from timoninterpreter.parser_generator import Grammar
+from timoninterpreter.parser_generator import GrammarError
+from timoninterpreter.parser_generator import generate_tables_module
+from timoninterpreter.parser_generator import read_grammar
+
+
+def get_path(path):
+    return os.path.join(os.path.dirname(__file__), '..', '..', path)
+
+
+class ReadGrammarTestCase(unittest.TestCase):
+    def test_expressions(self):
+        rules = read_grammar('a = "var", [ b ], { "," | c } ;\n'
+                             'b = ( "(" , c ) | \')\' ;\n'
+                             'c = ? any ? - "x", 2 * d ;')
+        self.assertEqual(["a", "b", "c"], list(rules))
+        self.assertEqual(("sequence", [("terminal", "var"),
+                                       ("option", ("rule", "b")),
+                                       ("repetition", ("choice", [("terminal", ","), ("rule", "c")]))]), rules["a"])
+        self.assertEqual(("choice", [("sequence", [("terminal", "("), ("rule", "c")]), ("terminal", ")")]), rules["b"])
+        self.assertEqual(("sequence", [("exception", ("special", "any"), ("terminal", "x")),
+                                       ("times", 2, ("rule", "d"))]), rules["c"])
+
+    def test_missing_semicolon(self):
+        self.assertRaises(GrammarError, read_grammar, 'a = "var" b = "fun" ;')
+
+    def test_unexpected_character(self):
+        self.assertRaises(GrammarError, read_grammar, 'a = "var" $ ;')
+
+
+class GrammarTestCase(unittest.TestCase):
+    def test_helpers_and_table(self):
+        grammar = Grammar(read_grammar('program = { "print", [ identifier ], ";" } ;'))
+        self.assertEqual(["program"], grammar.rules)
+        self.assertEqual(["program", "program.1", "program.2"], grammar.nonterminals())
+        self.assertEqual([("program.2", ("IDENTIFIER",)),
+                          ("program.2", ()),
+                          ("program.1", ("PRINT", "program.2", "SEMICOLON", "program.1")),
+                          ("program.1", ()),
+                          ("program", ("program.1",))], grammar.productions)
+        self.assertEqual({"PRINT": 2}, grammar.table["program.1"])
+        self.assertEqual({"IDENTIFIER": 0}, grammar.table["program.2"])
+        self.assertEqual({"program": 4, "program.1": 3, "program.2": 1}, grammar.defaults)
+
+    def test_unreachable_lexical_rules_ignored(self):
+        grammar = Grammar(read_grammar('program = { "print", numberLiteral, ";" } ;\n'
+                                       'numberLiteral = "0" | ( nonZeroDigit, { digit } ) ;\n'
+                                       'comment = "#", ? all ? - "#", "#" ;'))
+        self.assertEqual(["program"], grammar.rules)
+
+    def test_first_first_conflict(self):
+        self.assertRaises(GrammarError, Grammar, read_grammar('program = { a | b } ; a = "print" ; b = "print" ;'))
+
+    def test_first_follow_conflict(self):
+        self.assertRaises(GrammarError, Grammar, read_grammar('program = { "print", [ ";" ], ";" } ;'))
+
+    def test_undefined_rule(self):
+        self.assertRaises(GrammarError, Grammar, read_grammar('program = { statement } ;'))
+
+    def test_unknown_terminal(self):
+        self.assertRaises(GrammarError, Grammar, read_grammar('program = { "$" } ;'))
+
+    def test_tables_up_to_date(self):
+        with open(get_path('docs/grammar.ebnf'), encoding="utf-8") as f:
+            grammar = Grammar(read_grammar(f.read()))
+        with open(get_path('timoninterpreter/parse_tables.py'), encoding="utf-8") as f:
+            self.assertEqual(generate_tables_module(grammar), f.read(),
+                             msg="Parse tables are outdated, run python3 -m timoninterpreter.parser_generator")
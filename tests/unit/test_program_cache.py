@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+
+from timoninterpreter import syntax_nodes
+from timoninterpreter.lexical_analysis import Lexer
+from timoninterpreter.program_cache import ENTRY_SUFFIX
+from timoninterpreter.program_cache import ProgramCache
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.table_parsing import parse
+
+
+class ProgramCacheTestCase(unittest.TestCase):
+    TEXT = "var a = 1;\nfun f(x) { return x * 2; };\nprint f(a) + '1D'.days;\n"
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ProgramCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @staticmethod
+    def describe(node):
+        if isinstance(node, syntax_nodes.LeafNode):
+            file_pos = node.token.get_file_pos()
+            return type(node).__name__, node.get_value(), file_pos.get_absolute_pos(), file_pos.get_line_num()
+        return type(node).__name__, [ProgramCacheTestCase.describe(child) for child in node.get_children()]
+
+    def load_or_parse(self, text, cache=None):
+        cache = cache or self.cache
+        with BufferReader("whatever", text) as br:
+            key = cache.make_key(br, syntax_nodes.Program)
+            program = cache.load(key, br.get_file_pos().get_source())
+            if program is None:
+                program = syntax_nodes.Program(Lexer(br))
+                cache.store(key, program)
+                return program, False
+            return program, True
+
+    def entry_path(self, text):
+        with BufferReader("whatever", text) as br:
+            return os.path.join(self.directory.name, self.cache.make_key(br, syntax_nodes.Program) + ENTRY_SUFFIX)
+
+    def entry_paths(self):
+        return sorted(os.path.join(self.directory.name, name) for name in os.listdir(self.directory.name)
+                      if name.endswith(ENTRY_SUFFIX))
+
+    def test_hit_after_miss(self):
+        parsed, hit = self.load_or_parse(self.TEXT)
+        self.assertFalse(hit)
+        loaded, hit = self.load_or_parse(self.TEXT)
+        self.assertTrue(hit)
+        self.assertEqual(self.describe(parsed), self.describe(loaded))
+
+    def test_different_text_misses(self):
+        self.load_or_parse(self.TEXT)
+        self.assertFalse(self.load_or_parse(self.TEXT + "print a;")[1])
+        self.assertEqual(2, len(self.entry_paths()))
+
+    def test_different_parser_misses(self):
+        with BufferReader("whatever", self.TEXT) as br:
+            self.assertNotEqual(self.cache.make_key(br, syntax_nodes.Program), self.cache.make_key(br, parse))
+
+    def test_corrupt_entry_is_dropped(self):
+        self.load_or_parse(self.TEXT)
+        path, = self.entry_paths()
+        with open(path, "r+b") as file:
+            file.seek(-5, os.SEEK_END)
+            file.write(b"xxxxx")
+
+        self.assertFalse(self.load_or_parse(self.TEXT)[1])
+        self.assertTrue(self.load_or_parse(self.TEXT)[1])
+
+    def test_truncated_entry_is_dropped(self):
+        self.load_or_parse(self.TEXT)
+        path, = self.entry_paths()
+        with open(path, "r+b") as file:
+            file.truncate(10)
+
+        self.assertFalse(self.load_or_parse(self.TEXT)[1])
+
+    def test_least_recently_used_evicted(self):
+        first, second, third = (self.TEXT.replace("1", str(n)) for n in range(1, 4))
+        self.load_or_parse(first)
+        self.load_or_parse(second)
+        first_path, second_path = self.entry_path(first), self.entry_path(second)
+        os.utime(first_path, (1, 1))
+        os.utime(second_path, (2, 2))
+        cache = ProgramCache(self.directory.name, max_size=int(os.path.getsize(first_path) * 2.5))
+
+        self.assertTrue(self.load_or_parse(first, cache)[1])  # first is now the most recently used
+        self.load_or_parse(third, cache)
+
+        self.assertEqual(2, len(self.entry_paths()))
+        self.assertTrue(self.load_or_parse(first, cache)[1])
+        self.assertTrue(self.load_or_parse(third, cache)[1])
+        self.assertFalse(self.load_or_parse(second, cache)[1])
+
+    def test_unwritable_directory_ignored(self):
+        path = os.path.join(self.directory.name, "file")
+        open(path, "w").close()
+        cache = ProgramCache(os.path.join(path, "cache"))
+        self.assertFalse(self.load_or_parse(self.TEXT, cache)[1])
+        self.assertFalse(self.load_or_parse(self.TEXT, cache)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
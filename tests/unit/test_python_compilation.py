@@ -0,0 +1,49 @@
+import contextlib
+import io
+import os
+import tempfile
+
+from timoninterpreter import error_handling
+from timoninterpreter import python_compilation
+from timoninterpreter.execution import Environment
+from timoninterpreter.lexical_analysis import Lexer
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.syntax_nodes import LazyProgram
+from timoninterpreter.syntax_nodes import Program
+from tests.unit import engine_testing
+
+
+class PythonCompilationTestCase(engine_testing.EngineTestCase):
+    engine = staticmethod(python_compilation.execute)
+
+    def test_lazy_program(self):  # whole program is translated before execution, uncalled bodies too
+        self.assert_same_as_tree("fun f(x) { if x > 1 { return x * 2; }; return 0; }; fun g() { print 1; };"
+                                 "return f(3);", LazyProgram)
+
+    def test_marshalled_program(self):
+        text = "fun f(d) { return d + '1M'; }; var x = f(31.01.2020); print x; print x.days; print x - 1;"
+        with BufferReader("whatever", text) as br:
+            source = br.get_file_pos().get_source()
+            program = Program(Lexer(br))
+        compiled = python_compilation.CompiledProgram.from_program(program)
+        loaded = python_compilation.CompiledProgram.loads(compiled.dumps())
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(error_handling.ExecutionError) as context:
+            loaded.execute(Environment(), source)
+        self.assertEqual(["29.02.2020~00:00:00", "29"], output.getvalue().splitlines())
+        self.assertEqual(text.rindex("-"), context.exception.token.get_file_pos().get_absolute_pos())
+
+    def test_cache_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "script.tim")
+            with BufferReader("whatever", "print 1;") as br:
+                key = python_compilation.make_key(br)
+                compiled = python_compilation.CompiledProgram.from_program(Program(Lexer(br)))
+            self.assertIsNone(python_compilation.load(python_compilation.cache_path(path), key))
+
+            python_compilation.store(python_compilation.cache_path(path), key, compiled)
+            self.assertIsNotNone(python_compilation.load(python_compilation.cache_path(path), key))
+            with BufferReader("whatever", "print 2;") as br:
+                self.assertIsNone(python_compilation.load(python_compilation.cache_path(path),
+                                                          python_compilation.make_key(br)))
@@ -2,7 +2,13 @@ import unittest
 import unittest.mock as mock
 import io
 
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.source_readers import FilePosition
+from timoninterpreter.source_readers import Source
+from timoninterpreter.source_readers import SourceCache
+from timoninterpreter.source_readers import source_cache
 from timoninterpreter.source_readers import FileReader
+from timoninterpreter.source_readers import StreamReader
 
 
 def make_mock_open(test_case, data):
@@ -227,3 +233,367 @@ class FileReaderWithTestCase(unittest.TestCase):
             fr.get()
 
         self.assertFalse(fr.opened())
+
+
+class BufferReaderGetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mock_open = make_mock_open(self, 'ab')
+
+        self.buffer_reader = BufferReader("whatever")
+        self.buffer_reader.open()
+
+    def test_get_consume(self):
+        self.assertEqual('a', self.buffer_reader.get())
+        self.assertEqual('b', self.buffer_reader.get())
+
+    def test_get_end(self):
+        self.buffer_reader.get(2)
+        self.assertEqual('', self.buffer_reader.get())
+
+    def test_get_more_than_available(self):
+        self.assertEqual('ab', self.buffer_reader.get(10))
+        self.assertEqual('', self.buffer_reader.get())
+
+    def test_get_negative(self):
+        self.assertRaises(ValueError, self.buffer_reader.get, -10)
+
+    def tearDown(self):
+        self.buffer_reader.close()
+
+
+class BufferReaderPeekTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mock_open = make_mock_open(self, 'ab')
+
+        self.buffer_reader = BufferReader("whatever")
+        self.buffer_reader.open()
+
+    def test_peek_not_consume(self):
+        self.assertEqual('a', self.buffer_reader.peek())
+        self.assertEqual('a', self.buffer_reader.get())
+
+    def test_peek_end(self):
+        self.buffer_reader.get(2)
+        self.assertEqual('', self.buffer_reader.peek())
+
+    def test_peek_more_than_available(self):
+        self.assertEqual('ab', self.buffer_reader.peek(10))
+
+    def test_peek_negative(self):
+        self.buffer_reader.get(1)
+        self.assertEqual('a', self.buffer_reader.peek(-1))
+
+    def test_peek_negative_more_than_available(self):
+        self.buffer_reader.get(2)
+        self.assertEqual('ab', self.buffer_reader.peek(-10))
+
+    def test_peek_with_start_position(self):
+        self.assertEqual('b', self.buffer_reader.peek(1, 1))
+
+    def test_peek_with_start_position_negative(self):
+        self.assertRaises(ValueError, self.buffer_reader.peek, 1, -10)
+
+    def test_peek_with_start_position_after_end(self):
+        self.assertRaises(ValueError, self.buffer_reader.peek, -1, 10)
+
+    def tearDown(self):
+        self.buffer_reader.close()
+
+
+class BufferReaderEndedTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mock_open = make_mock_open(self, 'a')
+
+        self.buffer_reader = BufferReader("whatever")
+        self.buffer_reader.open()
+
+    def test_ended_not_on_end(self):
+        self.assertFalse(self.buffer_reader.ended())
+
+    def test_ended_on_end(self):
+        self.buffer_reader.get()
+        self.assertTrue(self.buffer_reader.ended())
+
+    def tearDown(self):
+        self.buffer_reader.close()
+
+
+class BufferReaderPositionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mock_open = make_mock_open(self, 'a\na\na\nfourth line')
+
+        self.buffer_reader = BufferReader("whatever")
+        self.buffer_reader.open()
+
+    def test_positions_in_line(self):
+        self.buffer_reader.get(11)
+        self.assertEqual(4, self.buffer_reader.get_file_pos().get_line_num())
+        self.assertEqual(5, self.buffer_reader.get_file_pos().get_line_pos())
+        self.assertEqual(11, self.buffer_reader.get_file_pos().get_absolute_pos())
+
+    def test_positions_character_by_character(self):
+        for _ in range(11):
+            self.buffer_reader.get()
+        self.assertEqual(4, self.buffer_reader.get_file_pos().get_line_num())
+        self.assertEqual(5, self.buffer_reader.get_file_pos().get_line_pos())
+        self.assertEqual(11, self.buffer_reader.get_file_pos().get_absolute_pos())
+
+    def test_positions_not_advance_at_end(self):
+        self.buffer_reader.get(17)
+        self.buffer_reader.get()
+
+        self.assertEqual(4, self.buffer_reader.get_file_pos().get_line_num())
+        self.assertEqual(11, self.buffer_reader.get_file_pos().get_line_pos())
+        self.assertEqual(17, self.buffer_reader.get_file_pos().get_absolute_pos())
+
+    def tearDown(self):
+        self.buffer_reader.close()
+
+
+class BufferReaderRewindTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mock_open = make_mock_open(self, 'abcdefgh')
+
+        self.buffer_reader = BufferReader("whatever")
+        self.buffer_reader.open()
+
+    def test_rewind_backward(self):
+        self.buffer_reader.get()
+        self.buffer_reader.checkpoint()
+        self.buffer_reader.get(3)
+        self.buffer_reader.rewind_backward()
+
+        self.assertEqual(1, self.buffer_reader.get_file_pos().get_absolute_pos())
+        self.assertEqual('b', self.buffer_reader.peek())
+
+    def test_rewind_forward(self):
+        self.buffer_reader.get()
+        self.buffer_reader.checkpoint()
+        self.buffer_reader.get(3)
+        self.buffer_reader.rewind_backward()
+        self.buffer_reader.rewind_forward()
+
+        self.assertEqual(4, self.buffer_reader.get_file_pos().get_absolute_pos())
+        self.assertEqual('e', self.buffer_reader.peek())
+
+    def test_rewind_backward_without_checkpoint(self):
+        self.buffer_reader.get()
+        self.buffer_reader.rewind_backward()
+
+        self.assertEqual(1, self.buffer_reader.get_file_pos().get_absolute_pos())
+
+    def tearDown(self):
+        self.buffer_reader.close()
+
+
+class BufferReaderInMemoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mock_open = make_mock_open(self, 'from file')
+
+    def test_source_not_read_from_file(self):
+        with BufferReader("<string>", "in memory") as br:
+            self.assertEqual('in memory', br.get(100))
+        self.mock_open.assert_not_called()
+
+    def test_opened_in_with(self):
+        with BufferReader("<string>", "abc") as br:
+            self.assertTrue(br.opened())
+
+        self.assertFalse(br.opened())
+
+
+class StreamReaderGetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stream_reader = StreamReader(io.StringIO('abcdef'), chunk_size=2)
+        self.stream_reader.open()
+
+    def test_get_consume(self):
+        self.assertEqual('a', self.stream_reader.get())
+        self.assertEqual('b', self.stream_reader.get())
+
+    def test_get_across_chunks(self):
+        self.assertEqual('abcde', self.stream_reader.get(5))
+
+    def test_get_more_than_available(self):
+        self.assertEqual('abcdef', self.stream_reader.get(10))
+        self.assertEqual('', self.stream_reader.get())
+
+    def test_get_negative(self):
+        self.assertRaises(ValueError, self.stream_reader.get, -10)
+
+    def tearDown(self):
+        self.stream_reader.close()
+
+
+class StreamReaderPeekTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stream_reader = StreamReader(io.StringIO('abcdef'), chunk_size=2)
+        self.stream_reader.open()
+
+    def test_peek_not_consume(self):
+        self.assertEqual('abc', self.stream_reader.peek(3))
+        self.assertEqual('a', self.stream_reader.get())
+
+    def test_peek_negative(self):
+        self.stream_reader.get(3)
+        self.assertEqual('bc', self.stream_reader.peek(-2))
+
+    def test_peek_with_start_position(self):
+        self.assertEqual('de', self.stream_reader.peek(2, 3))
+
+    def test_peek_with_start_position_after_end(self):
+        self.assertRaises(ValueError, self.stream_reader.peek, -1, 10)
+
+    def test_ended(self):
+        self.stream_reader.get(5)
+        self.assertFalse(self.stream_reader.ended())
+        self.stream_reader.get()
+        self.assertTrue(self.stream_reader.ended())
+
+    def tearDown(self):
+        self.stream_reader.close()
+
+
+class StreamReaderBoundedBufferTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stream_reader = StreamReader(io.StringIO('a\n' * 10000), chunk_size=64)
+        self.stream_reader.open()
+
+    def test_positions_after_trimming(self):
+        self.stream_reader.get(10001)
+        self.assertEqual(5001, self.stream_reader.get_file_pos().get_line_num())
+        self.assertEqual(1, self.stream_reader.get_file_pos().get_line_pos())
+        self.assertEqual(10001, self.stream_reader.get_file_pos().get_absolute_pos())
+
+    def test_positions_located_before_lines_are_forgotten(self):
+        self.stream_reader.get(3)
+        file_pos = self.stream_reader.get_file_pos()
+        for _ in range(10000):
+            self.stream_reader.get()
+        self.assertEqual((2, 1), (file_pos.get_line_num(), file_pos.get_line_pos()))
+        self.assertEqual((5002, 1), (self.stream_reader.get_file_pos().get_line_num(),
+                                     self.stream_reader.get_file_pos().get_line_pos()))
+        self.assertLess(len(self.stream_reader._source._line_starts), 1000)
+
+    def test_old_characters_dropped(self):
+        for _ in range(10000):
+            self.stream_reader.get()
+        self.assertRaises(ValueError, self.stream_reader.peek, 1, 0)
+
+    def test_snippet_window_kept(self):
+        for _ in range(10000):
+            self.stream_reader.get()
+        self.assertEqual('a\n' * 5, self.stream_reader.peek(-10))
+
+    def test_checkpoint_kept(self):
+        self.stream_reader.get(11)
+        self.stream_reader.checkpoint()
+        for _ in range(5000):
+            self.stream_reader.get()
+        self.stream_reader.rewind_backward()
+        self.assertEqual(11, self.stream_reader.get_file_pos().get_absolute_pos())
+        self.assertEqual('\na', self.stream_reader.get(2))
+
+    def test_checkpoint_released_after_forward_rewind(self):
+        self.stream_reader.checkpoint()
+        self.stream_reader.get()
+        self.stream_reader.rewind_backward()
+        self.stream_reader.rewind_forward()
+        for _ in range(5000):
+            self.stream_reader.get()
+        self.stream_reader.rewind_backward()
+        self.assertEqual(5001, self.stream_reader.get_file_pos().get_absolute_pos())
+
+    def tearDown(self):
+        self.stream_reader.close()
+
+
+class SourceLineIndexTestCase(unittest.TestCase):
+    def assert_location(self, source, absolute_pos, line_num, line_pos):
+        file_pos = FilePosition(source, absolute_pos)
+        self.assertEqual(line_num, file_pos.get_line_num())
+        self.assertEqual(line_pos, file_pos.get_line_pos())
+
+    def test_locate_in_known_text(self):
+        source = Source("whatever", "ab\ncd\n\nef")
+        self.assert_location(source, 0, 1, 0)
+        self.assert_location(source, 2, 1, 2)
+        self.assert_location(source, 3, 2, 0)
+        self.assert_location(source, 6, 3, 0)
+        self.assert_location(source, 8, 4, 1)
+
+    def test_locate_in_fed_text(self):
+        source = Source("whatever")
+        source.feed("ab\nc", 0)
+        source.feed("d\n\nef", 4)
+        self.assert_location(source, 3, 2, 0)
+        self.assert_location(source, 6, 3, 0)
+        self.assert_location(source, 8, 4, 1)
+
+    def test_feed_same_characters_twice(self):
+        source = Source("whatever")
+        source.feed("a\nb\n", 0)
+        source.feed("b\nc\n", 2)
+        self.assert_location(source, 6, 4, 0)
+
+    def test_forget(self):
+        source = Source("whatever")
+        source.feed("ab\ncd\nef\ng", 0)
+        source.forget(7)
+        self.assert_location(source, 7, 3, 1)
+        self.assert_location(source, 9, 4, 0)
+
+    def test_positions_equal(self):
+        self.assertEqual(FilePosition(Source("whatever", "abc"), 1), FilePosition(Source("whatever"), 1))
+        self.assertNotEqual(FilePosition(Source("whatever", "abc"), 1), FilePosition(Source("whatever"), 2))
+
+
+class SourceCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.mock_open = make_mock_open(self, 'from file')
+
+        self.cache = SourceCache(max_entries=2, max_characters=10)
+
+    def test_file_read_once(self):
+        self.assertEqual('fr', self.cache.peek("whatever", 2, 0))
+        self.assertEqual('om', self.cache.peek("whatever", -2, 4))
+        self.assertEqual(1, self.mock_open.call_count)
+
+    def test_put_not_read_from_file(self):
+        self.cache.put("whatever", "put")
+        self.assertEqual('put', self.cache.peek("whatever", 10, 0))
+        self.mock_open.assert_not_called()
+
+    def test_window(self):
+        self.cache.put("whatever", "window", 100)
+        self.assertEqual('nd', self.cache.peek("whatever", 2, 102))
+        self.assertRaises(ValueError, self.cache.peek, "whatever", 1, 10)
+
+    def test_evict_least_recently_used_by_entries(self):
+        self.cache.put("a", "a")
+        self.cache.put("b", "b")
+        self.cache.peek("a", 1, 0)
+        self.cache.put("c", "c")
+        self.assertEqual('a', self.cache.peek("a", 1, 0))
+        self.assertEqual('from file', self.cache.peek("b", 10, 0))
+
+    def test_evict_least_recently_used_by_characters(self):
+        self.cache.put("a", "aaaaaa")
+        self.cache.put("b", "bbbbbb")
+        self.assertEqual('from file', self.cache.peek("a", 10, 0))
+
+    def test_file_not_existing(self):
+        self.mock_open.side_effect = FileNotFoundError()
+        self.assertRaises(FileNotFoundError, self.cache.peek, "whatever", 1, 0)
+
+
+class ReadersSourceCacheTestCase(unittest.TestCase):
+    def test_buffer_reader_puts_source(self):
+        with BufferReader("<cached>", "in memory"):
+            pass
+        self.assertEqual('memory', source_cache.peek("<cached>", 10, 3))
+
+    def test_stream_reader_puts_window(self):
+        with StreamReader(io.StringIO('abcdef'), "<cached stream>", chunk_size=2) as sr:
+            sr.get(3)
+        self.assertEqual('abcd', source_cache.peek("<cached stream>", 10, 0))
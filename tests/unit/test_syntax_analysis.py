@@ -6,6 +6,8 @@ from timoninterpreter import error_handling
 from timoninterpreter import syntax_nodes
 from timoninterpreter import tokens
 from timoninterpreter.lexical_analysis import Lexer
+from timoninterpreter.lexical_analysis import tokenize
+from timoninterpreter.source_readers import BufferReader
 from timoninterpreter.source_readers import FileReader
 
 
@@ -209,6 +211,24 @@ class ParsingLeafNodeTestCase(BaseParsingTestCase):
     def test_timedelta_literal(self, mock_open):
         self.assert_node(syntax_nodes.TimedeltaLiteral, tokens.TokenType.TIMEDELTA_LITERAL)
 
+    def test_token_kept_by_value_and_position(self):
+        with BufferReader("whatever", "\n  abc") as br:
+            node = syntax_nodes.Identifier(Lexer(br))
+            self.assertFalse(hasattr(node, '__dict__'))
+            self.assertEqual("abc", node.get_value())
+            self.assertEqual(tokens.TokenType.IDENTIFIER, node.token.get_type())
+            self.assertEqual("abc", node.token.get_value())
+            self.assertEqual(2, node.token.get_file_pos().get_line_num())
+            self.assertEqual(3, node.token.get_file_pos().get_absolute_pos())
+
+    def test_skip(self):
+        with BufferReader("whatever", "fun f") as br:
+            lexer = Lexer(br)
+            self.assertIsNone(syntax_nodes.FunKeyword.skip(lexer))
+            self.assertEqual(tokens.TokenType.IDENTIFIER, lexer.peek().get_type())
+            with self.assertRaises(error_handling.SyntacticError):
+                syntax_nodes.FunKeyword.skip(lexer)
+
 
 # noinspection PyUnusedLocal
 class ProgramNodeTestCase(BaseParsingTestCase):
@@ -582,12 +602,92 @@ class BodyNodeTestCase(BaseParsingTestCase):
         with FileReader("whatever") as fr:
             self.assertRaises(error_handling.SyntacticError, syntax_nodes.Body, Lexer(fr))
 
+    @mock.patch('builtins.open', return_value=io.StringIO("{ a; }"))
+    def test_body_lone_identifier(self, mock_open):
+        with FileReader("whatever") as fr:
+            self.assertRaises(error_handling.SyntacticError, syntax_nodes.Body, Lexer(fr))
+
     @mock.patch('builtins.open', return_value=io.StringIO("{ return;"))
     def test_body_no_right_bracket(self, mock_open):
         with FileReader("whatever") as fr:
             self.assertRaises(error_handling.SyntacticError, syntax_nodes.Body, Lexer(fr))
 
 
+class LazyBodyNodeTestCase(unittest.TestCase):
+    TEXT = '{ var a = "x"; if a == 12.05.2020 { print -a.days; } else { return f(a, 1); }; } print 1;'
+
+    @staticmethod
+    def describe(node):
+        if isinstance(node, syntax_nodes.LeafNode):
+            return type(node).__name__, node.get_value(), node.token.get_file_pos().get_absolute_pos()
+        return type(node).__name__, [LazyBodyNodeTestCase.describe(child) for child in node.get_children()]
+
+    def test_same_as_body(self):
+        with BufferReader("whatever", self.TEXT) as br:
+            expected = self.describe(syntax_nodes.Body(Lexer(br)))
+
+        for make_lexer in [Lexer, lambda reader: tokenize(reader).view()]:
+            with BufferReader("whatever", self.TEXT) as br:
+                lexer = make_lexer(br)
+                node = syntax_nodes.LazyBody(lexer)
+                self.assertEqual([], node.get_children())
+                self.assertEqual(tokens.TokenType.PRINT, lexer.peek().get_type())
+                self.assertEqual(expected, self.describe(node.get_body()))
+
+    def test_error_reported_when_built(self):
+        with BufferReader("whatever", "{ print ; }") as br:
+            node = syntax_nodes.LazyBody(Lexer(br))
+        with self.assertRaises(error_handling.SyntacticError) as cm:
+            node.get_body()
+        self.assertEqual(8, cm.exception.token.get_file_pos().get_absolute_pos())
+
+    def test_strict(self):
+        with BufferReader("whatever", "{ print ; }") as br:
+            self.assertRaises(error_handling.SyntacticError, syntax_nodes.LazyBody, Lexer(br), strict=True)
+
+    def test_strict_errors_same_as_body(self):
+        for text in ["{\n  print (1;\n  if (1) { print 2; ;\n};\nprint 3;", "{ print 1; { }", "{ print (1; } }",
+                     "{ if a { return; }"]:
+            with self.subTest(text=text):
+                with BufferReader("whatever", text) as br:
+                    with self.assertRaises(error_handling.SyntacticError) as expected:
+                        syntax_nodes.Body(Lexer(br))
+                for make_lexer in [Lexer, lambda reader: tokenize(reader).view()]:
+                    with BufferReader("whatever", text) as br:
+                        with self.assertRaises(error_handling.SyntacticError) as cm:
+                            syntax_nodes.LazyBody(make_lexer(br), strict=True)
+                    self.assertEqual(expected.exception.token.get_file_pos().get_absolute_pos(),
+                                     cm.exception.token.get_file_pos().get_absolute_pos())
+                    self.assertEqual(expected.exception.message, cm.exception.message)
+
+    def test_strict_same_as_body(self):
+        with BufferReader("whatever", self.TEXT) as br:
+            expected = self.describe(syntax_nodes.Body(Lexer(br)))
+
+        for make_lexer in [Lexer, lambda reader: tokenize(reader).view()]:
+            with BufferReader("whatever", self.TEXT) as br:
+                lexer = make_lexer(br)
+                node = syntax_nodes.LazyBody(lexer, strict=True)
+                self.assertEqual([], node.get_children())
+                self.assertEqual(tokens.TokenType.PRINT, lexer.peek().get_type())
+                self.assertEqual(expected, self.describe(node.get_body()))
+
+    def test_no_right_bracket(self):
+        for make_lexer in [Lexer, lambda reader: tokenize(reader).view()]:
+            with BufferReader("whatever", "{ if a { return; }") as br:
+                self.assertRaises(error_handling.SyntacticError, syntax_nodes.LazyBody, make_lexer(br))
+
+    def test_lazy_programs(self):
+        text = "fun f() { print ; }; print 1;"
+        with BufferReader("whatever", text) as br:
+            program = syntax_nodes.LazyProgram(Lexer(br))
+        self.assertEqual([syntax_nodes.LazyFunctionDefinitionStatement, syntax_nodes.PrintStatement],
+                         [type(statement) for statement in program.statements])
+
+        with BufferReader("whatever", text) as br:
+            self.assertRaises(error_handling.SyntacticError, syntax_nodes.StrictLazyProgram, Lexer(br))
+
+
 # noinspection PyUnusedLocal
 class MathExpressionNodeTestCase(BaseParsingTestCase):
     @mock.patch('builtins.open', return_value=io.StringIO("a + b"))
@@ -1012,3 +1112,106 @@ class ParsingMiscellaneousTestCase(BaseParsingTestCase):
     def test_no_assign(self, mock_open):
         with FileReader("whatever") as fr:
             self.assertRaises(error_handling.SyntacticError, syntax_nodes.Program, Lexer(fr))
+
+
+class DispatchTablesTestCase(unittest.TestCase):
+    def test_starting_token_types(self):
+        self.assertEqual({tokens.TokenType.NOT, tokens.TokenType.MINUS, tokens.TokenType.NUMBER_LITERAL,
+                          tokens.TokenType.STRING_LITERAL, tokens.TokenType.DATE_LITERAL,
+                          tokens.TokenType.TIME_LITERAL, tokens.TokenType.DATETIME_LITERAL,
+                          tokens.TokenType.TIMEDELTA_LITERAL, tokens.TokenType.IDENTIFIER,
+                          tokens.TokenType.LEFT_PARENTHESIS},
+                         syntax_nodes.Expression.starting_token_types())
+        self.assertEqual({tokens.TokenType.SEMICOLON}, syntax_nodes.Semicolon.starting_token_types())
+
+    def test_starting_token_types_computed_once(self):
+        self.assertIs(syntax_nodes.Expression.starting_token_types(), syntax_nodes.Expression.starting_token_types())
+        self.assertIsInstance(syntax_nodes.Expression.starting_token_types(), frozenset)
+
+    def test_dispatch_table(self):
+        table = syntax_nodes.NodeDispatchTable({syntax_nodes.PlusOperator, syntax_nodes.MinusOperator})
+        self.assertIs(syntax_nodes.PlusOperator, table.get(tokens.TokenType.PLUS))
+        self.assertIs(syntax_nodes.MinusOperator, table.get(tokens.TokenType.MINUS))
+        self.assertIsNone(table.get(tokens.TokenType.DIVISION))
+        self.assertEqual({tokens.TokenType.PLUS, tokens.TokenType.MINUS}, table.token_types)
+
+    def test_dispatch_table_built_once_for_node_set(self):
+        self.assertIs(syntax_nodes.NodeDispatchTable.of({syntax_nodes.Years, syntax_nodes.Days}),
+                      syntax_nodes.NodeDispatchTable.of({syntax_nodes.Days, syntax_nodes.Years}))
+
+    @mock.patch('builtins.open', return_value=io.StringIO("print ;"))
+    def test_error_lists_expected_token_types(self, mock_open):
+        with FileReader("whatever") as fr:
+            with self.assertRaises(error_handling.SyntacticError) as cm:
+                syntax_nodes.Program(Lexer(fr))
+        expected, got = cm.exception.message[len("Expected one of {"):].split("} but got ")
+        self.assertEqual({"(", "IDENTIFIER", "NUMBER_LITERAL", "STRING_LITERAL", "DATE_LITERAL", "TIME_LITERAL",
+                          "DATETIME_LITERAL", "TIMEDELTA_LITERAL"}, set(expected.split(", ")))
+        self.assertEqual(";", got)
+
+
+class ParseExpressionTestCase(unittest.TestCase):
+    def assert_expression(self, text, expected_type, expected_children_types):
+        with BufferReader("whatever", text) as br:
+            lexer = Lexer(br)
+            node = syntax_nodes.parse_expression(lexer)
+            self.assertEqual(expected_type, type(node))
+            self.assertEqual(expected_children_types, [type(child) for child in node.get_children()])
+            return node, lexer
+
+    def test_single_value(self):
+        self.assert_expression("a", syntax_nodes.Identifier, [])
+
+    def test_parentheses_reduced(self):
+        self.assert_expression("((a))", syntax_nodes.Identifier, [])
+
+    def test_precedence(self):
+        node, _ = self.assert_expression("a * b + c", syntax_nodes.MathExpression,
+                                         [syntax_nodes.MultiplicativeMathExpression, syntax_nodes.PlusOperator,
+                                          syntax_nodes.Identifier])
+        self.assertEqual([syntax_nodes.Identifier, syntax_nodes.MultiplyOperator, syntax_nodes.Identifier],
+                         [type(child) for child in node.first_expression.get_children()])
+
+    def test_operations_of_same_level_kept_together(self):
+        self.assert_expression("a - b + c | d | e", syntax_nodes.Expression,
+                               [syntax_nodes.MathExpression, syntax_nodes.OrOperator, syntax_nodes.Identifier,
+                                syntax_nodes.OrOperator, syntax_nodes.Identifier])
+
+    def test_logic_negation_of_math_expression(self):
+        node, _ = self.assert_expression("!a + b > c", syntax_nodes.LogicRelationalExpression,
+                                         [syntax_nodes.LogicTerm, syntax_nodes.GreaterOperator,
+                                          syntax_nodes.Identifier])
+        self.assertEqual(syntax_nodes.MathExpression, type(node.first_expression.expression))
+
+    def test_math_term(self):
+        self.assert_expression("-f(a).days", syntax_nodes.MathTerm,
+                               [syntax_nodes.MathNegationOperator, syntax_nodes.FunctionCall,
+                                syntax_nodes.TimeInfoAccess])
+
+    def test_single_equality_operation(self):
+        _, lexer = self.assert_expression("a == b == c", syntax_nodes.LogicEqualityExpression,
+                                          [syntax_nodes.Identifier, syntax_nodes.EqualOperator,
+                                           syntax_nodes.Identifier])
+        self.assertEqual(tokens.TokenType.EQUALS, lexer.peek().get_type())
+
+    def test_logic_negation_inside_math_expression(self):
+        with BufferReader("whatever", "a + !b") as br:
+            self.assertRaises(error_handling.SyntacticError, syntax_nodes.parse_expression, Lexer(br))
+
+    def test_deeply_nested(self):
+        self.assert_expression("(" * 5000 + "a + b" + ")" * 5000, syntax_nodes.MathExpression,
+                               [syntax_nodes.Identifier, syntax_nodes.PlusOperator, syntax_nodes.Identifier])
+
+    def test_deeply_nested_calls(self):
+        node, _ = self.assert_expression("f(" * 5000 + ")" * 5000 + ".days", syntax_nodes.MathTerm,
+                                         [syntax_nodes.FunctionCall, syntax_nodes.TimeInfoAccess])
+        self.assertEqual([syntax_nodes.Identifier, syntax_nodes.FunctionCall],
+                         [type(child) for child in node.term.get_children()])
+
+    def test_parenthesised_function_name(self):
+        self.assert_expression("-(f)(a, (b))", syntax_nodes.MathTerm,
+                               [syntax_nodes.MathNegationOperator, syntax_nodes.FunctionCall])
+
+    def test_unclosed_function_call(self):
+        with BufferReader("whatever", "f(a, (b)") as br:
+            self.assertRaises(error_handling.SyntacticError, syntax_nodes.parse_expression, Lexer(br))
@@ -0,0 +1,84 @@
+import glob
+import os
+import unittest
+
+from timoninterpreter import error_handling
+from timoninterpreter import syntax_nodes
+from timoninterpreter.lexical_analysis import Lexer
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.source_readers import FileReader
+from timoninterpreter.table_parsing import parse
+
+
+def describe(node):
+    if isinstance(node, syntax_nodes.LeafNode):
+        return type(node).__name__, node.token.get_type(), node.token.get_value()
+    return type(node).__name__, [describe(child) for child in node.get_children()]
+
+
+class TableParsingTestCase(unittest.TestCase):
+    TEXT = '''
+        fun f(a, b) {
+            if !a > b | a == -b.days & (a + b) * 2 <= 3 { return a; } else { return; };
+            f();
+        };
+        var x;
+        var y = f(1, 2 * x, "s") - 12.05.2020~10:00:00.hours / 10:00:00 + '1D' + 12.05.2020;
+        from 01.01.2020 to 05.01.2020 by days as d { print d; x = d; var z = !x; };
+        print -(x).years;
+    '''
+
+    def parse_both(self, text):
+        with BufferReader("whatever", text) as br:
+            expected = syntax_nodes.Program(Lexer(br))
+        with BufferReader("whatever", text) as br:
+            actual = parse(Lexer(br))
+        return expected, actual
+
+    def test_same_as_descent(self):
+        expected, actual = self.parse_both(self.TEXT)
+        self.assertEqual(describe(expected), describe(actual))
+
+    def test_scripts(self):
+        scripts = glob.glob(os.path.join(os.path.dirname(__file__), '..', 'acceptance', 'scripts', '*.tim'))
+        for path in scripts:
+            if path.endswith("bad_script.tim"):
+                continue
+            with self.subTest(path=path):
+                with FileReader(path) as fr:
+                    expected = syntax_nodes.Program(Lexer(fr))
+                with FileReader(path) as fr:
+                    actual = parse(Lexer(fr))
+                self.assertEqual(describe(expected), describe(actual))
+
+    def test_empty(self):
+        with BufferReader("whatever", "") as br:
+            self.assertEqual(("Program", []), describe(parse(Lexer(br))))
+
+    def test_missing_expression(self):
+        with BufferReader("whatever", "if ;") as br:
+            with self.assertRaises(error_handling.SyntacticError) as cm:
+                parse(Lexer(br))
+        self.assertEqual(3, cm.exception.token.get_file_pos().get_absolute_pos())
+        self.assertIn("!", cm.exception.message.split(" but got ")[0])
+
+    def test_expected_after_optional_parts(self):
+        with BufferReader("whatever", "print a b;") as br:
+            with self.assertRaises(error_handling.SyntacticError) as cm:
+                parse(Lexer(br))
+        self.assertEqual(8, cm.exception.token.get_file_pos().get_absolute_pos())
+        expected = cm.exception.message.split(" but got ")[0]
+        for token_string in (";", "+", "*", "==", "&", "|", "."):
+            self.assertIn(token_string, expected)
+
+    def test_unexpected_statement(self):
+        with BufferReader("whatever", "print 1; }") as br:
+            with self.assertRaises(error_handling.SyntacticError) as cm:
+                parse(Lexer(br))
+        self.assertEqual(9, cm.exception.token.get_file_pos().get_absolute_pos())
+        self.assertIn("END", cm.exception.message)
+
+    def test_deeply_nested(self):
+        with BufferReader("whatever", "print " + "(" * 2000 + "a" + ")" * 2000 + ";") as br:
+            program = parse(Lexer(br))
+        self.assertIsInstance(program.statements[0].expression, syntax_nodes.Identifier)
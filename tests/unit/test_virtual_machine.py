@@ -0,0 +1,39 @@
+from timoninterpreter import bytecode
+from timoninterpreter import virtual_machine
+from timoninterpreter.lexical_analysis import Lexer
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.syntax_nodes import Program
+from tests.unit import engine_testing
+
+
+class VirtualMachineTestCase(engine_testing.EngineTestCase):
+    engine = staticmethod(virtual_machine.execute)
+
+    def test_errors_in_loops(self):
+        self.assert_same_as_tree("fun f(a) { return a; }; from 01.01.2020 to 03.01.2020 by days as d { print f(1, 2); };")
+        self.assert_same_as_tree("from 01.01.2020 + '1D' to 03.01.2020 by days as d { print d - \"x\"; };")
+        self.assert_same_as_tree("fun f(n) { from 01.01.2020 to 05.01.2020 by days as d { var k = n;"
+                                 "    if d.days == k { from 1 to 2 by days as e { return e; }; }; }; return 9; };"
+                                 "print f(2); print f(7); var z = 1; print z;")
+
+    def test_errors_in_callees(self):
+        self.assert_same_as_tree("fun g(a, b) { return a - b; }; fun f(a) { return g(a, \"x\"); }; print f(f(3));")
+        self.assert_same_as_tree("fun g(a) { return g(1, 2); }; fun f(a) { return a; }; print f(g(3));")
+
+    def test_disassembly(self):
+        with BufferReader("whatever", "fun f(a) { return a + 1; }; print f(2);") as br:
+            lines = bytecode.disassemble(Program(Lexer(br)))
+        self.assertEqual(["<program> (1 registers)",
+                          "     0  DEFINE        fun f",
+                          "     2  CALL_ENTER    r0, Identifier@1:34, 1",
+                          "     6  ARGUMENT      r0, 0, 2",
+                          "    10  CALL          r0",
+                          "    12  PRINT         r0",
+                          "    14  HALT",
+                          "  handler 6-6 argument: r0, 0",
+                          "",
+                          "f (1 registers)",
+                          "     0  LOAD_SLOT     r0, -1, 0, Identifier@1:18",
+                          "     5  ADD           r0, r0, 1, PlusOperator@1:20",
+                          "    10  RETURN        r0, 1",
+                          "    13  RETURN        0, 1"], lines)
@@ -5,17 +5,85 @@ Main script
 """
 
 import argparse
+import contextlib
 import sys
 
+from timoninterpreter import bytecode
+from timoninterpreter import closure_compilation
 from timoninterpreter import error_handling
+from timoninterpreter import optimization
+from timoninterpreter import python_compilation
 from timoninterpreter import tokens
-from timoninterpreter.lexical_analysis import Lexer
-from timoninterpreter.source_readers import FileReader
+from timoninterpreter import virtual_machine
+from timoninterpreter.lexical_analysis import TableLexer
+from timoninterpreter.lexical_analysis import lexer_engines
+from timoninterpreter.lexical_analysis import tokenize
+from timoninterpreter.parallel_parsing import parse_parallel
+from timoninterpreter.program_cache import ProgramCache
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.source_readers import StreamReader
+from timoninterpreter.syntax_nodes import LazyProgram
 from timoninterpreter.syntax_nodes import LeafNode
 from timoninterpreter.syntax_nodes import Program
+from timoninterpreter.syntax_nodes import StrictLazyProgram
+from timoninterpreter.table_parsing import parse
 from timoninterpreter.execution import Environment
 
 
+STDIN_PATH = '-'
+
+parser_engines = {
+    "descent": Program,
+    "table": parse,
+}
+
+execution_engines = {
+    "bytecode": virtual_machine.execute,
+    "closures": closure_compilation.execute,
+    "tree": Program.execute,
+}
+
+
+def make_source_reader(path, in_memory):
+    if path == STDIN_PATH:
+        if in_memory:  # whole source is needed at once
+            return BufferReader("<stdin>", sys.stdin.read())
+        return StreamReader(sys.stdin)
+
+    return BufferReader(path)
+
+
+@contextlib.contextmanager
+def open_streamed_source_reader(path, in_memory):
+    """
+    Opens reader that keeps only a window of the source, unless the whole source is needed at once
+    """
+    if in_memory:
+        with make_source_reader(path, in_memory) as reader:
+            yield reader
+    elif path == STDIN_PATH:
+        with StreamReader(sys.stdin) as reader:
+            yield reader
+    else:
+        with open(path, "rt") as stream, StreamReader(stream, path) as reader:
+            yield reader
+
+
+def parse_program(source_reader, lexer_class, parser, jobs, cache=None):
+    if cache is not None:
+        key = cache.make_key(source_reader, parser)
+        program = cache.load(key, source_reader.get_file_pos().get_source())
+        if program is None:
+            program = parse_program(source_reader, lexer_class, parser, jobs)
+            cache.store(key, program)
+        return program
+    if jobs > 1:
+        return parse_parallel(source_reader, lexer_class, jobs, parser=parser)
+    if lexer_class is TableLexer:  # tokenize everything at once into compact buffer
+        return parser(tokenize(source_reader, lexer_class).view())
+    return parser(lexer_class(source_reader))
+
+
 def display_tokens(token_list):
     format_string = "{:<50} | {:<30} | {:<15} | {:<15} | {:<20}"
     print(format_string.format("token", "type", "line number", "line position", "absolute position"))
@@ -29,33 +97,34 @@ def display_tokens(token_list):
 
 
 def display_syntax_tree(root_node):
-    def tree(node, prefix=""):
-        # prefix components:
-        space = '    '
-        branch = '│   '
-        # pointers:
-        tee = '├── '
-        last = '└── '
+    # prefix components:
+    space = '    '
+    branch = '│   '
+    # pointers:
+    tee = '├── '
+    last = '└── '
 
+    def children_lines(node, prefix):
         pointers = [tee] * (len(node.get_children()) - 1) + [last]
-        for pointer, child in zip(pointers, node.get_children()):
-            suffix = " : " + str(child.token) if isinstance(child, LeafNode) else ""
-            yield prefix + pointer + type(child).__name__ + suffix
-            if child.get_children():
-                extension = branch if pointer == tee else space
-                yield from tree(child, prefix=prefix + extension)
+        return [(child, prefix, pointer) for pointer, child in zip(pointers, node.get_children())]
 
     print(type(root_node).__name__)
-    for line in tree(root_node):
-        print(line)
+    pending = children_lines(root_node, "")[::-1]  # explicit stack instead of recursion, next line on top
+    while pending:
+        node, prefix, pointer = pending.pop()
+        suffix = " : " + str(node.token) if isinstance(node, LeafNode) else ""
+        print(prefix + pointer + type(node).__name__ + suffix)
+        if node.get_children():
+            extension = branch if pointer == tee else space
+            pending += children_lines(node, prefix + extension)[::-1]
 
 
-def run_lexer(path):
+def run_lexer(path, lexer_class):
     try:
         read_tokens = []
 
-        with FileReader(path) as fr:
-            lex = Lexer(fr)
+        with make_source_reader(path, lexer_class is TableLexer) as fr:
+            lex = lexer_class(fr)
             while not (read_tokens and read_tokens[-1].get_type() == tokens.TokenType.END):
                 read_tokens.append(lex.get())
 
@@ -70,16 +139,17 @@ def run_lexer(path):
         error_handling.report_syntactic_error(e.token, e.message)
     except error_handling.ExecutionError as e:
         error_handling.report_execution_error(e.token, e.message)
+    except RecursionError:
+        error_handling.report_generic_error("Recursion", "Maximum depth of nested calls or blocks exceeded")
     except Exception as e:
         error_handling.report_generic_error("Unknown", str(e).capitalize())
     return 1
 
 
-def run_parser(path):
+def run_parser(path, lexer_class, parser, jobs):
     try:
-        with FileReader(path) as fr:
-            lex = Lexer(fr)
-            program = Program(lex)
+        with make_source_reader(path, lexer_class is TableLexer or jobs > 1) as fr:
+            program = parse_program(fr, lexer_class, parser, jobs)
 
         display_syntax_tree(program)
         return 0
@@ -92,18 +162,106 @@ def run_parser(path):
         error_handling.report_syntactic_error(e.token, e.message)
     except error_handling.ExecutionError as e:
         error_handling.report_execution_error(e.token, e.message)
+    except RecursionError:
+        error_handling.report_generic_error("Recursion", "Maximum depth of nested calls or blocks exceeded")
     except Exception as e:
         error_handling.report_generic_error("Unknown", str(e).capitalize())
     return 1
 
 
-def run_execution(path):
+def run_disassembler(path, lexer_class, parser, jobs, optimize=False):
     try:
-        with FileReader(path) as fr:
-            lex = Lexer(fr)
-            program = Program(lex)
+        with make_source_reader(path, lexer_class is TableLexer or jobs > 1) as fr:
+            program = parse_program(fr, lexer_class, parser, jobs)
+
+        if optimize:
+            optimization.optimize(program)
+
+        print("\n".join(bytecode.disassemble(program)))
+        return 0
+
+    except IOError as e:
+        error_handling.report_generic_error("IO", str(e).capitalize())
+    except error_handling.LexicalError as e:
+        error_handling.report_lexical_error(e.file_pos, e.message)
+    except error_handling.SyntacticError as e:
+        error_handling.report_syntactic_error(e.token, e.message)
+    except error_handling.ExecutionError as e:
+        error_handling.report_execution_error(e.token, e.message)
+    except RecursionError:
+        error_handling.report_generic_error("Recursion", "Maximum depth of nested calls or blocks exceeded")
+    except Exception as e:
+        error_handling.report_generic_error("Unknown", str(e).capitalize())
+    return 1
+
+
+def run_execution(path, lexer_class, parser, jobs, cache=None, check=False, engine=closure_compilation.execute,
+                  optimize=False):
+    try:
+        with make_source_reader(path, lexer_class is TableLexer or jobs > 1 or cache is not None) as fr:
+            program = parse_program(fr, lexer_class, parser, jobs, cache)
+
+        if optimize:
+            optimization.optimize(program)
+
+        if check:
+            errors = program.resolve()
+            if errors:
+                raise min(errors, key=lambda error: error.token.get_file_pos().get_absolute_pos())
+        return engine(program, Environment())
 
-        return program.execute(Environment())
+    except IOError as e:
+        error_handling.report_generic_error("IO", str(e).capitalize())
+    except error_handling.LexicalError as e:
+        error_handling.report_lexical_error(e.file_pos, e.message)
+    except error_handling.SyntacticError as e:
+        error_handling.report_syntactic_error(e.token, e.message)
+    except error_handling.ExecutionError as e:
+        error_handling.report_execution_error(e.token, e.message)
+    except RecursionError:
+        error_handling.report_generic_error("Recursion", "Maximum depth of nested calls or blocks exceeded")
+    except Exception as e:
+        error_handling.report_generic_error("Unknown", str(e).capitalize())
+    return 1
+
+
+def run_compiled_execution(path, lexer_class, parser, jobs):
+    try:
+        with make_source_reader(path, True) as fr:
+            source = fr.get_file_pos().get_source()
+            key = python_compilation.make_key(fr)
+            cached = path != STDIN_PATH
+            compiled = python_compilation.load(python_compilation.cache_path(path), key) if cached else None
+            if compiled is None:
+                program = parse_program(fr, lexer_class, parser, jobs)
+                try:
+                    compiled = python_compilation.CompiledProgram.from_program(program, path)
+                except SyntaxError:  # too deeply nested for Python
+                    return closure_compilation.execute(program, Environment())
+                if cached:
+                    python_compilation.store(python_compilation.cache_path(path), key, compiled)
+
+        return compiled.execute(Environment(), source)
+
+    except IOError as e:
+        error_handling.report_generic_error("IO", str(e).capitalize())
+    except error_handling.LexicalError as e:
+        error_handling.report_lexical_error(e.file_pos, e.message)
+    except error_handling.SyntacticError as e:
+        error_handling.report_syntactic_error(e.token, e.message)
+    except error_handling.ExecutionError as e:
+        error_handling.report_execution_error(e.token, e.message)
+    except RecursionError:
+        error_handling.report_generic_error("Recursion", "Maximum depth of nested calls or blocks exceeded")
+    except Exception as e:
+        error_handling.report_generic_error("Unknown", str(e).capitalize())
+    return 1
+
+
+def run_streamed_execution(path, lexer_class, program_class):
+    try:
+        with open_streamed_source_reader(path, lexer_class is TableLexer) as fr:
+            return program_class.execute_streamed(lexer_class(fr), Environment())
 
     except IOError as e:
         error_handling.report_generic_error("IO", str(e).capitalize())
@@ -113,6 +271,8 @@ def run_execution(path):
         error_handling.report_syntactic_error(e.token, e.message)
     except error_handling.ExecutionError as e:
         error_handling.report_execution_error(e.token, e.message)
+    except RecursionError:
+        error_handling.report_generic_error("Recursion", "Maximum depth of nested calls or blocks exceeded")
     except Exception as e:
         error_handling.report_generic_error("Unknown", str(e).capitalize())
     return 1
@@ -120,14 +280,56 @@ def run_execution(path):
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="python based interpreter for simple date oriented language")
-    parser.add_argument('path', help='path to script file')
-    parser.add_argument('-stage', choices=['lexer', 'parser', 'execution'], default='execution')
+    parser.add_argument('path', help='path to script file or {} to read from standard input'.format(STDIN_PATH))
+    parser.add_argument('-stage', choices=['lexer', 'parser', 'bytecode', 'execution', 'compile'], default='execution')
+    parser.add_argument('-lexer', choices=list(lexer_engines), default='classic')
+    parser.add_argument('-parser', choices=list(parser_engines), default='descent')
+    parser.add_argument('-engine', choices=list(execution_engines), default='closures')
+    parser.add_argument('-jobs', type=int, default=1, help='number of processes parsing the script')
+    parser.add_argument('-cache', help='directory of parsed scripts reused between runs')
+    parser.add_argument('-cache-size', type=int, default=ProgramCache.MAX_SIZE // (1024 * 1024),
+                        help='maximal size of cache directory in MiB')
+    parser.add_argument('-stream', action='store_true',
+                        help='execute every top-level statement right after parsing it (descent parser only)')
+    parser.add_argument('-lazy', action='store_true',
+                        help='parse function bodies on their first call (descent parser only)')
+    parser.add_argument('-strict', action='store_true',
+                        help='with -lazy, still report syntactic errors in functions that are never called')
+    parser.add_argument('-check', action='store_true',
+                        help='report undeclared variables and functions and wrong numbers of arguments before execution')
+    parser.add_argument('-optimize', action='store_true',
+                        help='fold constant expressions, evaluate repeated subexpressions once and move invariants out of '
+                             'loops before execution')
 
     args = parser.parse_args()
+    lexer = lexer_engines[args.lexer]
+    syntax_parser = parser_engines[args.parser]
+    if args.stream and (args.parser != 'descent' or args.jobs > 1 or args.cache):
+        parser.error("-stream can't be combined with -parser table, -jobs or -cache")
+    if args.lazy and args.parser != 'descent':
+        parser.error("-lazy can't be combined with -parser table")
+    if args.strict and not args.lazy:
+        parser.error("-strict requires -lazy")
+    if args.check and args.stream:
+        parser.error("-check can't be combined with -stream")
+    if args.stage == 'compile' and (args.stream or args.lazy or args.check or args.cache):
+        parser.error("-stage compile can't be combined with -stream, -lazy, -check or -cache")
+    if args.optimize and (args.stream or args.stage == 'compile'):
+        parser.error("-optimize can't be combined with -stream or -stage compile")
+    if args.lazy:
+        syntax_parser = StrictLazyProgram if args.strict else LazyProgram
+    program_cache = ProgramCache(args.cache, args.cache_size * 1024 * 1024) if args.cache else None
 
     if args.stage == 'lexer':
-        sys.exit(run_lexer(args.path))
+        sys.exit(run_lexer(args.path, lexer))
     elif args.stage == 'parser':
-        sys.exit(run_parser(args.path))
+        sys.exit(run_parser(args.path, lexer, syntax_parser, args.jobs))
+    elif args.stage == 'bytecode':
+        sys.exit(run_disassembler(args.path, lexer, syntax_parser, args.jobs, args.optimize))
+    elif args.stage == 'execution' and args.stream:
+        sys.exit(run_streamed_execution(args.path, lexer, syntax_parser))
     elif args.stage == 'execution':
-        sys.exit(run_execution(args.path))
+        sys.exit(run_execution(args.path, lexer, syntax_parser, args.jobs, program_cache, args.check,
+                               execution_engines[args.engine], args.optimize))
+    elif args.stage == 'compile':
+        sys.exit(run_compiled_execution(args.path, lexer, syntax_parser, args.jobs))
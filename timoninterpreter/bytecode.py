@@ -0,0 +1,456 @@
+"""
+
+Bytecode module
+
+Lowers resolved program into register-based bytecode executed by virtual_machine. Instructions of a code object are
+kept in one compact array of integers, opcode followed by its operands. Operands index registers of the executed code,
+its pools of sites (nodes that errors are reported at, defined functions) and frame layouts, or other instructions
+(jump targets). Registers hold temporaries of expressions, followed by the pool of constants (values of literals) in
+reverse order, so negative register -1 - k is constant k and literals are used without loading them
+
+Errors raised by instructions are reported at their sites, errors raised while parts of statements are executed (like
+arguments of calls) are reported by handlers of ranges of instructions, like the try statements of syntax_nodes do
+
+"""
+
+import array
+
+from timoninterpreter.syntax_nodes import *
+from timoninterpreter.syntax_nodes import _ARGUMENT_STEP
+from timoninterpreter.syntax_nodes import _BINARY_STEP
+from timoninterpreter.syntax_nodes import _CALL_STEP
+from timoninterpreter.syntax_nodes import _UNARY_STEP
+
+# Opcodes, operands are given after the name
+LOAD_SLOT = 0  # register, frame index (-1 - depth), slot, site
+MOVE = 1  # register, source register
+STORE_SLOT = 2  # frame index (-1 - depth), slot, register
+BINARY = 3  # register, lhs register, rhs register, operation, site
+ADD = 4  # register, lhs register, rhs register, site
+JUMP_IF_FALSE = 5  # register, target
+JUMP = 6  # target
+LOOP_TEST = 7  # iterator register, end register, exit target
+LOOP_STEP = 8  # iterator register, step register, loop target
+RESET_FRAME = 9  # layout
+CALL_ENTER = 10  # register (gets called function), site, number of arguments
+ARGUMENT = 11  # function register, argument index, register
+CALL = 12  # function register (gets returned value)
+RETURN = 13  # register, number of frames to pop
+UNARY = 14  # register, operand register, operation, site
+ACCESS = 15  # register, operand register, site
+LOAD_NAME = 16  # register, site
+STORE_NAME = 17  # site, register
+DECLARE = 18  # slot
+PUSH_FRAME = 19  # layout
+POP_FRAME = 20
+PRINT = 21  # register
+DEFINE = 22  # site
+HALT = 23
+
+# Kinds of operands, for disassembly
+_REGISTER = "r"
+_NUMBER = "n"
+_SITE = "s"
+_LAYOUT = "l"
+_TARGET = "t"
+_BINARY_OPERATION = "b"
+_UNARY_OPERATION = "u"
+
+# Names and operands by opcode
+OPCODES = {
+    LOAD_SLOT: ("LOAD_SLOT", (_REGISTER, _NUMBER, _NUMBER, _SITE)),
+    MOVE: ("MOVE", (_REGISTER, _REGISTER)),
+    STORE_SLOT: ("STORE_SLOT", (_NUMBER, _NUMBER, _REGISTER)),
+    BINARY: ("BINARY", (_REGISTER, _REGISTER, _REGISTER, _BINARY_OPERATION, _SITE)),
+    ADD: ("ADD", (_REGISTER, _REGISTER, _REGISTER, _SITE)),
+    JUMP_IF_FALSE: ("JUMP_IF_FALSE", (_REGISTER, _TARGET)),
+    JUMP: ("JUMP", (_TARGET,)),
+    LOOP_TEST: ("LOOP_TEST", (_REGISTER, _REGISTER, _TARGET)),
+    LOOP_STEP: ("LOOP_STEP", (_REGISTER, _REGISTER, _TARGET)),
+    RESET_FRAME: ("RESET_FRAME", (_LAYOUT,)),
+    CALL_ENTER: ("CALL_ENTER", (_REGISTER, _SITE, _NUMBER)),
+    ARGUMENT: ("ARGUMENT", (_REGISTER, _NUMBER, _REGISTER)),
+    CALL: ("CALL", (_REGISTER,)),
+    RETURN: ("RETURN", (_REGISTER, _NUMBER)),
+    UNARY: ("UNARY", (_REGISTER, _REGISTER, _UNARY_OPERATION, _SITE)),
+    ACCESS: ("ACCESS", (_REGISTER, _REGISTER, _SITE)),
+    LOAD_NAME: ("LOAD_NAME", (_REGISTER, _SITE)),
+    STORE_NAME: ("STORE_NAME", (_SITE, _REGISTER)),
+    DECLARE: ("DECLARE", (_NUMBER,)),
+    PUSH_FRAME: ("PUSH_FRAME", (_LAYOUT,)),
+    POP_FRAME: ("POP_FRAME", ()),
+    PRINT: ("PRINT", (_REGISTER,)),
+    DEFINE: ("DEFINE", (_SITE,)),
+    HALT: ("HALT", ()),
+}
+
+# Operations of BINARY and UNARY instructions
+BINARY_OPERATIONS = (MinusOperator, MultiplyOperator, DivisionOperator, EqualOperator, NotEqualOperator,
+                     GreaterOperator, GreaterOrEqualOperator, LessOperator, LessOrEqualOperator, OrOperator,
+                     AndOperator)
+UNARY_OPERATIONS = (MathNegationOperator, LogicNegationOperator)
+
+# Kinds of handlers, errors raised in their ranges are reported at
+ARGUMENT_HANDLER = 0  # parameter of the called function (ValueError)
+ASSIGNMENT_HANDLER = 1  # assigned identifier (ValueError)
+LOOP_HANDLER = 2  # start of the loop (ValueError, TypeError, OverflowError)
+
+_HANDLER_NAMES = {ARGUMENT_HANDLER: "argument", ASSIGNMENT_HANDLER: "assignment", LOOP_HANDLER: "loop"}
+
+
+class Code:
+    """
+    Compiled program or function
+    """
+
+    __slots__ = ('name', 'instructions', 'constants', 'sites', 'layouts', 'handlers', 'register_count', 'registers')
+
+    def __init__(self, name, instructions, constants, sites, layouts, handlers, register_count):
+        """
+        Args:
+            name: name of the function, "<program>" for program
+            instructions: array of opcodes and operands
+            constants: pool of values
+            sites: pool of nodes
+            layouts: pool of frame layouts
+            handlers: start, end (exclusive), kind and two operands of handlers, innermost ranges first
+            register_count: number of registers of temporaries used by the code
+        """
+        self.name = name
+        self.instructions = instructions
+        self.constants = constants
+        self.sites = sites
+        self.layouts = layouts
+        self.handlers = handlers
+        self.register_count = register_count
+        self.registers = [None] * register_count + list(reversed(constants))  # registers on entry
+
+
+class Function:
+    """
+    Compiled function definition, with what is needed to call it
+    """
+
+    __slots__ = ('node', 'layout', 'slots', 'code')
+
+    def __init__(self, node, layout, slots, code):
+        self.node = node
+        self.layout = layout
+        self.slots = slots  # slots of parameters in frame of the function
+        self.code = code
+
+
+def compile_program(program):
+    """
+    Args:
+        program: Program, resolved if it wasn't yet
+
+    Returns:
+        Code of the program, functions are compiled on their first call
+    """
+    if program.layout is None:
+        program.resolve()
+    builder = _CodeBuilder("<program>", 0)
+    builder.block(program.statements)
+    builder.emit(HALT)
+    return builder.build()
+
+
+def compile_function(node):
+    """
+    Returns:
+        Function of given function definition, lazily parsed body is parsed when it is compiled
+    """
+    layout = node.get_layout()
+    body = node.body.get_body() if isinstance(node.body, LazyBody) else node.body
+    builder = _CodeBuilder(node.identifier.get_value(), 1)  # frame of the function is pushed by the caller
+    builder.block(body.statements)
+    builder.emit(RETURN, builder.constant(0), 1)
+    return Function(node, layout, [parameter.binding[1] for parameter in node.parameters.parameters], builder.build())
+
+
+def disassemble(program):
+    """
+    Returns:
+        Lines of listing of bytecode of the program and of its functions
+    """
+    lines = _disassemble_code(compile_program(program))
+    for statement in program.statements:
+        if isinstance(statement, FunctionDefinitionStatement):
+            lines += [""] + _disassemble_code(compile_function(statement).code)
+    return lines
+
+
+def _disassemble_code(code):
+    lines = ["{} ({} registers)".format(code.name, code.register_count)]
+    instructions = code.instructions
+    pc = 0
+    while pc < len(instructions):
+        name, operand_kinds = OPCODES[instructions[pc]]
+        operands = instructions[pc + 1:pc + 1 + len(operand_kinds)]
+        lines.append("{:>6}  {:<14}{}".format(pc, name, ", ".join(
+            _format_operand(code, kind, operand) for kind, operand in zip(operand_kinds, operands))).rstrip())
+        pc += 1 + len(operand_kinds)
+    for start, end, kind, first, second in code.handlers:
+        operand = "r{}, {}".format(first, second) if kind == ARGUMENT_HANDLER else _format_site(code.sites[first])
+        lines.append("  handler {}-{} {}: {}".format(start, end, _HANDLER_NAMES[kind], operand))
+    return lines
+
+
+def _format_operand(code, kind, operand):
+    if kind == _REGISTER:
+        if operand >= 0:
+            return "r{}".format(operand)
+        constant = code.constants[-1 - operand]
+        return repr(constant) if isinstance(constant, (int, str)) else str(constant)
+    if kind == _SITE:
+        return _format_site(code.sites[operand])
+    if kind == _LAYOUT:
+        return "[{}]".format(", ".join(code.layouts[operand].names))
+    if kind == _TARGET:
+        return "-> {}".format(operand)
+    if kind == _BINARY_OPERATION:
+        return BINARY_OPERATIONS[operand].__name__
+    if kind == _UNARY_OPERATION:
+        return UNARY_OPERATIONS[operand].__name__
+    return str(operand)
+
+
+def _format_site(node):
+    if isinstance(node, FunctionDefinitionStatement):
+        return "fun {}".format(node.identifier.get_value())
+    if isinstance(node, LeafNode):
+        file_pos = node.token.get_file_pos()
+        return "{}@{}:{}".format(type(node).__name__, file_pos.get_line_num(), file_pos.get_line_pos())
+    return type(node).__name__
+
+
+class _CodeBuilder:
+    def __init__(self, name, level):
+        """
+        Args:
+            name: name of the code
+            level: number of frames pushed on entry, popped by return
+        """
+        self._name = name
+        self._instructions = array.array('i')
+        self._constants = []
+        self._constant_indices = {}
+        self._sites = []
+        self._site_indices = {}
+        self._layouts = []
+        self._handlers = []
+        self._level = level
+        self._base = 0  # first register not held by enclosing statements
+        self._register_count = 0
+
+    def build(self):
+        return Code(self._name, self._instructions, tuple(self._constants), tuple(self._sites), tuple(self._layouts),
+                    tuple(self._handlers), self._register_count)
+
+    def emit(self, opcode, *operands):
+        """
+        Returns:
+            position of the instruction
+        """
+        position = len(self._instructions)
+        self._instructions.append(opcode)
+        self._instructions.extend(operands)
+        return position
+
+    def position(self):
+        return len(self._instructions)
+
+    def patch(self, position, value):
+        self._instructions[position] = value
+
+    def constant(self, value):
+        """
+        Returns:
+            register of the constant
+        """
+        if not isinstance(value, (int, str)):  # values of dates and times aren't hashable
+            self._constants.append(value)
+            return -len(self._constants)
+
+        key = type(value), value
+        index = self._constant_indices.get(key)
+        if index is None:
+            index = self._constant_indices[key] = len(self._constants)
+            self._constants.append(value)
+        return -1 - index
+
+    def site(self, node):
+        index = self._site_indices.get(id(node))
+        if index is None:
+            index = self._site_indices[id(node)] = len(self._sites)
+            self._sites.append(node)
+        return index
+
+    def layout(self, layout):
+        self._layouts.append(layout)
+        return len(self._layouts) - 1
+
+    def handler(self, start, kind, first, second=0):
+        """
+        Adds handler of instructions from start to the current position, handlers have to be added innermost first
+        """
+        self._handlers.append((start, self.position(), kind, first, second))
+
+    def block(self, statements):
+        for statement in statements:
+            self._statement_compilers[type(statement)](self, statement)
+
+    def expression(self, node):
+        """
+        Emits evaluation of expression without recursion, values are evaluated into registers of their positions on
+        the value stack, counted from the first free register
+
+        Returns:
+            register of the value, temporary or constant
+        """
+        values = []  # registers of values and called functions
+        calls = []  # function register, index of the next argument and start of its evaluation of pending calls
+        pending = [node]
+        while pending:
+            item = pending.pop()
+            if isinstance(item, tuple):
+                kind, step_node = item
+                if kind == _BINARY_STEP:
+                    rhs = values.pop()
+                    lhs = values.pop()
+                    values.append(self._temporary(len(values)))
+                    if isinstance(step_node, PlusOperator):
+                        self.emit(ADD, values[-1], lhs, rhs, self.site(step_node))
+                    else:
+                        self.emit(BINARY, values[-1], lhs, rhs, BINARY_OPERATIONS.index(type(step_node)),
+                                  self.site(step_node))
+                elif kind == _UNARY_STEP:
+                    rhs = values.pop()
+                    values.append(self._temporary(len(values)))
+                    if isinstance(step_node, TimeInfoAccess):
+                        self.emit(ACCESS, values[-1], rhs, self.site(step_node.time_unit))
+                    else:
+                        self.emit(UNARY, values[-1], rhs, UNARY_OPERATIONS.index(type(step_node)),
+                                  self.site(step_node))
+                elif kind == _CALL_STEP:
+                    values.append(self._temporary(len(values)))
+                    self.emit(CALL_ENTER, values[-1], self.site(step_node.identifier), len(step_node.parameters))
+                    calls.append([values[-1], 0, self.position()])
+                elif kind == _ARGUMENT_STEP:
+                    call = calls[-1]
+                    self.handler(call[2], ARGUMENT_HANDLER, call[0], call[1])
+                    self.emit(ARGUMENT, call[0], call[1], values.pop())
+                    call[1] += 1
+                    call[2] = self.position()
+                else:
+                    self.emit(CALL, calls.pop()[0])
+            elif isinstance(item, StackEvaluable):
+                pending.extend(reversed(item.evaluation_steps()))
+            elif isinstance(item, Identifier):
+                values.append(self._temporary(len(values)))
+                if item.binding is None:
+                    self.emit(LOAD_NAME, values[-1], self.site(item))
+                else:
+                    self.emit(LOAD_SLOT, values[-1], -1 - item.binding[0], item.binding[1], self.site(item))
+            else:
+                values.append(self.constant(item.get_value()))
+        return values[-1]
+
+    def _temporary(self, position):
+        """
+        Returns:
+            register of value at given position of the value stack
+        """
+        register = self._base + position
+        self._register_count = max(self._register_count, register + 1)
+        return register
+
+    def _function_definition(self, node):
+        self.emit(DEFINE, self.site(node))
+
+    def _variable_definition(self, node):
+        self.emit(DECLARE, node.identifier.binding[1])
+        if node.assignment:
+            self._assignment(node.assignment)
+
+    def _assignment(self, node):
+        start = self.position()
+        value = self.expression(node.expression)
+        identifier = node.identifier
+        if identifier.binding is None:
+            self.emit(STORE_NAME, self.site(identifier), value)
+        else:
+            self.emit(STORE_SLOT, -1 - identifier.binding[0], identifier.binding[1], value)
+        self.handler(start, ASSIGNMENT_HANDLER, self.site(identifier))
+
+    def _if(self, node):
+        condition = self.expression(node.expression)
+        jump = self.emit(JUMP_IF_FALSE, condition, 0)
+        self._scope(node.body)
+        if node.else_body is None:
+            self.patch(jump + 2, self.position())
+            return
+
+        exit_jump = self.emit(JUMP, 0)
+        self.patch(jump + 2, self.position())
+        self._scope(node.else_body)
+        self.patch(exit_jump + 1, self.position())
+
+    def _scope(self, body):
+        if body.layout is None:
+            self.block(body.statements)
+            return
+
+        self.emit(PUSH_FRAME, self.layout(body.layout))
+        self._level += 1
+        self.block(body.statements)
+        self._level -= 1
+        self.emit(POP_FRAME)
+
+    def _from(self, node):
+        iterator = self._temporary(0)  # stepped in place, so it can't be constant
+        first = self.expression(node.start)
+        if first != iterator:
+            self.emit(MOVE, iterator, first)
+        self._base += 1
+        end = self.expression(node.end)
+        self._base += 1
+        step = self.constant(node.time_unit.self_evaluate(None))
+
+        layout = self.layout(node.body.layout)
+        self.emit(PUSH_FRAME, layout)  # one frame for all iterations, reset after each of them
+        self._level += 1
+        test = self.emit(LOOP_TEST, iterator, end, 0)
+        self.emit(STORE_SLOT, -1, node.identifier.binding[1], iterator)
+        self.block(node.body.statements)
+        self.emit(RESET_FRAME, layout)
+        self.emit(LOOP_STEP, iterator, step, test)
+        self.patch(test + 3, self.position())
+        self.handler(test, LOOP_HANDLER, self.site(node.start))
+        self._level -= 1
+        self.emit(POP_FRAME)
+        self._base -= 2
+
+    def _print(self, node):
+        self.emit(PRINT, self.expression(node.expression))
+
+    def _return(self, node):
+        value = self.expression(node.expression) if node.expression else self.constant(0)
+        self.emit(RETURN, value, self._level)
+
+    def _call_statement(self, node):
+        self.expression(node)
+
+    _statement_compilers = {
+        FunctionDefinitionStatement: _function_definition,
+        LazyFunctionDefinitionStatement: _function_definition,
+        StrictLazyFunctionDefinitionStatement: _function_definition,
+        VariableDefinitionStatement: _variable_definition,
+        VariableAssignmentStatement: _assignment,
+        IfStatement: _if,
+        FromStatement: _from,
+        PrintStatement: _print,
+        ReturnStatement: _return,
+        FunctionCall: _call_statement,
+    }
@@ -0,0 +1,459 @@
+"""
+
+Closure compilation module
+
+Compiles resolved program into nested Python closures with operators, constants and slots of variables baked in, so
+execution doesn't dispatch on nodes. Closures raise the same errors at the same positions as execution of the nodes
+
+Compiled statement returns None, or value of the executed return statement (values are never None)
+
+"""
+
+import operator
+
+from timoninterpreter.error_handling import ExecutionError
+from timoninterpreter.execution import UNINITIALIZED
+from timoninterpreter.syntax_nodes import *
+
+MAX_COMPILED_HEIGHT = 200  # higher expressions are left to syntax_nodes.evaluate, which doesn't recurse
+
+_OPERATOR_ERRORS = (ValueError, TypeError, OverflowError)
+_LITERALS = (NumberLiteral, StringLiteral, DateLiteral, TimeLiteral, DateTimeLiteral, TimedeltaLiteral, Constant)
+
+
+def execute(program, environment):
+    """
+    Compiles program and executes it, like Program.execute
+
+    Returns:
+        Value returned by the program, None if it didn't return
+    """
+    return compile_program(program)(environment)
+
+
+def compile_program(program):
+    """
+    Args:
+        program: Program, resolved if it wasn't yet
+
+    Returns:
+        Function executing the program in given environment
+    """
+    if program.layout is None:
+        program.resolve()
+    layout = program.layout
+    body = _Compiler().compile_block(program.statements)
+
+    def execute_program(environment):
+        environment.set_global_layout(layout)
+        return body(environment)
+
+    return execute_program
+
+
+class _Compiler:
+    def __init__(self):
+        self._functions = {}  # compiled functions by definition node, compiled on their first call
+
+    def compile_block(self, statements):
+        compiled = [self._statement_compilers[type(statement)](self, statement) for statement in statements]
+        if not compiled:
+            return _nothing
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def block(environment):
+            for statement in compiled:
+                value = statement(environment)
+                if value is not None:
+                    return value
+            return None
+
+        return block
+
+    def compile_function(self, node):
+        """
+        Returns:
+            layout of frame of the function, slots of its parameters and compiled body
+        """
+        layout = node.get_layout()
+        body = node.body.get_body() if isinstance(node.body, LazyBody) else node.body
+        compiled = layout, [parameter.binding[1] for parameter in node.parameters.parameters], \
+            self.compile_block(body.statements)
+        self._functions[node] = compiled
+        return compiled
+
+    def compile_expression(self, node):
+        if _height(node) > MAX_COMPILED_HEIGHT:
+            return node.self_evaluate
+        return self._expression(node)
+
+    def _expression(self, node):
+        return self._expression_compilers[type(node)](self, node)
+
+    def _function_definition(self, node):
+        name = node.identifier.get_value()
+
+        def define(environment):
+            environment.set_fun(name, node)
+
+        return define
+
+    def _variable_definition(self, node):
+        slot = node.identifier.binding[1]
+        if node.assignment is None:
+            def declare(environment):
+                environment.frames[-1][slot] = UNINITIALIZED
+
+            return declare
+
+        assign = self._assignment(node.assignment)
+
+        def define(environment):
+            environment.frames[-1][slot] = UNINITIALIZED
+            return assign(environment)
+
+        return define
+
+    def _assignment(self, node):
+        expression = self.compile_expression(node.expression)
+        identifier = node.identifier
+        if identifier.binding is None:
+            name = identifier.get_value()
+
+            def assign_by_name(environment):
+                try:
+                    environment.set_var(name, expression(environment))
+                except ValueError as e:
+                    raise ExecutionError(identifier.token, str(e))
+
+            return assign_by_name
+
+        index, slot = -1 - identifier.binding[0], identifier.binding[1]
+
+        def assign(environment):
+            try:
+                environment.frames[index][slot] = expression(environment)
+            except ValueError as e:
+                raise ExecutionError(identifier.token, str(e))
+
+        return assign
+
+    def _if(self, node):
+        condition = self.compile_expression(node.expression)
+        body = self._scope(node.body)
+        if node.else_body is None:
+            def if_statement(environment):
+                if condition(environment):
+                    return body(environment)
+                return None
+
+            return if_statement
+
+        else_body = self._scope(node.else_body)
+
+        def if_else_statement(environment):
+            if condition(environment):
+                return body(environment)
+            return else_body(environment)
+
+        return if_else_statement
+
+    def _scope(self, body):
+        block = self.compile_block(body.statements)
+        layout = body.layout
+        if layout is None:
+            return block
+
+        def scope(environment):
+            environment.push_frame(layout)
+            value = block(environment)
+            environment.pop_frame()
+            return value
+
+        return scope
+
+    def _from(self, node):
+        start_expression = self.compile_expression(node.start)
+        end_expression = self.compile_expression(node.end)
+        time_unit = node.time_unit
+        layout = node.body.layout
+        blank = layout.blank
+        iterator_slot = node.identifier.binding[1]
+        body = self.compile_block(node.body.statements)
+
+        def from_statement(environment):
+            start = start_expression(environment)
+            end = end_expression(environment)
+            step = time_unit.self_evaluate(environment)
+
+            environment.push_frame(layout)  # one frame for all iterations, reset after each of them
+            frame = environment.frames[-1]
+            try:
+                while start <= end:
+                    frame[iterator_slot] = start
+                    value = body(environment)
+                    if value is not None:
+                        environment.pop_frame()
+                        return value
+                    frame[:] = blank
+                    try:
+                        start += step
+                    except _OPERATOR_ERRORS as e:
+                        raise ExecutionError(node.start.token, str(e))
+                environment.pop_frame()
+                return None
+            except _OPERATOR_ERRORS as e:
+                raise ExecutionError(node.start.token, str(e))
+
+        return from_statement
+
+    def _print(self, node):
+        expression = self.compile_expression(node.expression)
+
+        def print_statement(environment):
+            print(str(expression(environment)))
+
+        return print_statement
+
+    def _return(self, node):
+        if node.expression is None:
+            return _return_zero
+        return self.compile_expression(node.expression)
+
+    def _call_statement(self, node):
+        call = self.compile_expression(node)
+
+        def call_statement(environment):
+            call(environment)
+
+        return call_statement
+
+    def _call(self, node):
+        name = node.identifier.get_value()
+        arguments = [self._expression(parameter) for parameter in node.parameters]
+        argument_count = len(arguments)
+        functions = self._functions
+        compile_function = self.compile_function
+
+        def call(environment):
+            try:
+                fun_node = environment.get_fun(name)
+            except ValueError as e:
+                raise ExecutionError(node.identifier.token, str(e))
+            if len(fun_node.parameters.parameters) != argument_count:
+                raise ValueError("TODO")
+            layout, slots, body = functions.get(fun_node) or compile_function(fun_node)
+
+            environment.push_frame(layout)  # arguments are evaluated in frame of the function
+            frame = environment.frames[-1]
+            for index in range(argument_count):
+                try:
+                    frame[slots[index]] = arguments[index](environment)
+                except ValueError as e:
+                    raise ExecutionError(fun_node.parameters.parameters[index].token, str(e))
+            value = body(environment)
+            environment.pop_frame()
+            return 0 if value is None else value
+
+        return call
+
+    def _identifier(self, node):
+        name = node.get_value()
+        if node.binding is None:
+            def read_by_name(environment):
+                try:
+                    return environment.get_var(name)
+                except ValueError as e:
+                    raise ExecutionError(node.token, str(e))
+
+            return read_by_name
+
+        depth, slot = node.binding
+        index = -1 - depth
+
+        def read(environment):
+            value = environment.frames[index][slot]
+            if value is UNINITIALIZED:
+                try:
+                    environment.get_slot(depth, slot, name)
+                except ValueError as e:
+                    raise ExecutionError(node.token, str(e))
+            return value
+
+        return read
+
+    def _literal(self, node):
+        value = node.get_value()
+
+        def constant(environment):
+            return value
+
+        return constant
+
+    def _operations(self, node):
+        compiled = self._expression(node.first_expression)
+        for operator_node, expression in node.operations:
+            compiled = self._binary(operator_node, compiled, expression)
+        return compiled
+
+    def _comparison(self, node):
+        compiled = self._expression(node.first_expression)
+        if node.operator is None:
+            return compiled
+        return self._binary(node.operator, compiled, node.second_expression)
+
+    def _binary(self, operator_node, lhs_expression, rhs_node):
+        if isinstance(rhs_node, _LITERALS) and not isinstance(operator_node, PlusOperator):
+            return _binary_with_constant(operator_node, lhs_expression, rhs_node.get_value())
+        return _binary(operator_node, lhs_expression, self._expression(rhs_node))
+
+    def _logic_term(self, node):
+        compiled = self._expression(node.expression)
+        if node.negation is None:
+            return compiled
+        return _unary(node.negation, compiled)
+
+    def _math_term(self, node):
+        compiled = self._expression(node.term)
+        if node.access:
+            compiled = _unary(node.access, compiled)
+        if node.negation:
+            compiled = _unary(node.negation, compiled)
+        return compiled
+
+    def _parenthesised(self, node):
+        return self._expression(node.expression)
+
+    _statement_compilers = {
+        FunctionDefinitionStatement: _function_definition,
+        LazyFunctionDefinitionStatement: _function_definition,
+        StrictLazyFunctionDefinitionStatement: _function_definition,
+        VariableDefinitionStatement: _variable_definition,
+        VariableAssignmentStatement: _assignment,
+        IfStatement: _if,
+        FromStatement: _from,
+        PrintStatement: _print,
+        ReturnStatement: _return,
+        FunctionCall: _call_statement,
+    }
+
+    _expression_compilers = {
+        Expression: _operations,
+        LogicAndExpression: _operations,
+        MathExpression: _operations,
+        MultiplicativeMathExpression: _operations,
+        LogicEqualityExpression: _comparison,
+        LogicRelationalExpression: _comparison,
+        LogicTerm: _logic_term,
+        MathTerm: _math_term,
+        ParenthesisedExpression: _parenthesised,
+        FunctionCall: _call,
+        Identifier: _identifier,
+        NumberLiteral: _literal,
+        StringLiteral: _literal,
+        DateLiteral: _literal,
+        TimeLiteral: _literal,
+        DateTimeLiteral: _literal,
+        TimedeltaLiteral: _literal,
+        Constant: _literal,
+    }
+
+
+def _nothing(environment):
+    return None
+
+
+def _return_zero(environment):
+    return 0
+
+
+def _height(node):
+    height = 0
+    pending = [(node, 1)]
+    while pending:
+        node, depth = pending.pop()
+        height = max(height, depth)
+        pending += [(child, depth + 1) for child in node.get_children()]
+    return height
+
+
+# Python operations of operators, whose errors are reported at the operator
+_binary_operations = {
+    MinusOperator: operator.sub,
+    MultiplyOperator: operator.mul,
+    DivisionOperator: operator.floordiv,
+    EqualOperator: operator.eq,
+    NotEqualOperator: operator.ne,
+    GreaterOperator: operator.gt,
+    GreaterOrEqualOperator: operator.ge,
+    LessOperator: operator.lt,
+    LessOrEqualOperator: operator.le,
+    OrOperator: lambda lhs, rhs: bool(lhs) or bool(rhs),
+    AndOperator: lambda lhs, rhs: bool(lhs) and bool(rhs),
+}
+
+_unary_operations = {
+    MathNegationOperator: operator.neg,
+    LogicNegationOperator: lambda rhs: not bool(rhs),
+}
+
+
+def _binary(operator_node, lhs_expression, rhs_expression):
+    if isinstance(operator_node, PlusOperator):
+        def plus(environment):
+            lhs = lhs_expression(environment)
+            rhs = rhs_expression(environment)
+            try:
+                if isinstance(lhs, str) or isinstance(rhs, str):
+                    return str(lhs) + str(rhs)
+                return lhs + rhs
+            except _OPERATOR_ERRORS as e:
+                raise ExecutionError(operator_node.token, str(e))
+
+        return plus
+
+    operation = _binary_operations[type(operator_node)]
+
+    def binary(environment):
+        lhs = lhs_expression(environment)
+        rhs = rhs_expression(environment)
+        try:
+            return operation(lhs, rhs)
+        except _OPERATOR_ERRORS as e:
+            raise ExecutionError(operator_node.token, str(e))
+
+    return binary
+
+
+def _binary_with_constant(operator_node, lhs_expression, rhs):
+    operation = _binary_operations[type(operator_node)]
+
+    def binary_with_constant(environment):
+        lhs = lhs_expression(environment)
+        try:
+            return operation(lhs, rhs)
+        except _OPERATOR_ERRORS as e:
+            raise ExecutionError(operator_node.token, str(e))
+
+    return binary_with_constant
+
+
+def _unary(operator_node, rhs_expression):
+    operation = _unary_operations.get(type(operator_node))
+    if operation is None:  # time info access, which reports its errors itself
+        evaluate_access = operator_node.unary_evaluate
+
+        def access(environment):
+            return evaluate_access(rhs_expression(environment), environment)
+
+        return access
+
+    def unary(environment):
+        rhs = rhs_expression(environment)
+        try:
+            return operation(rhs)
+        except _OPERATOR_ERRORS as e:
+            raise ExecutionError(operator_node.token, str(e))
+
+    return unary
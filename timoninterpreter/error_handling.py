@@ -6,7 +6,7 @@ Module for reporting errors
 
 import sys
 
-from timoninterpreter.source_readers import FileReader
+from timoninterpreter.source_readers import source_cache
 
 
 # Exceptions
@@ -58,11 +58,25 @@ def _read_snippet(file_pos):
     left_bound = max(0, file_pos.get_line_pos() - MAX_CHAR_SIDE_PEEK)
     left_chars_num = file_pos.get_line_pos() - left_bound
 
-    with FileReader(file_pos.get_file_path()) as source_reader:
-        left_chars = source_reader.peek(-left_chars_num, file_pos.get_absolute_pos())
-        middle_right_chars = source_reader.peek(1 + MAX_CHAR_SIDE_PEEK, file_pos.get_absolute_pos())
+    try:
+        left_chars = source_cache.peek(file_pos.get_file_path(), -left_chars_num, file_pos.get_absolute_pos())
+        middle_right_chars = source_cache.peek(file_pos.get_file_path(), 1 + MAX_CHAR_SIDE_PEEK,
+                                               file_pos.get_absolute_pos())
+    except (IOError, ValueError):  # source can't be reopened or position is outside of cached window
+        return None, 0
 
-    return (left_chars + middle_right_chars).partition('\n')[0], left_chars_num
+    return (left_chars + middle_right_chars).partition('\n')[0], len(left_chars)
+
+
+def _print_snippet(file_pos, stream):
+    snippet, left_chars_num = _read_snippet(file_pos)
+    if snippet is None:
+        return
+
+    print(snippet, file=stream)
+
+    marker = " " * left_chars_num + "^"
+    print(marker, file=stream)
 
 
 def report_generic_error(error_type, message, stream=sys.stdout):
@@ -75,11 +89,7 @@ def _report_positional_error(error_type, file_pos, message, stream=sys.stdout):
                                           message),
           file=stream)
 
-    snippet, left_chars_num = _read_snippet(file_pos)
-    print(snippet, file=stream)
-
-    marker = " " * left_chars_num + "^"
-    print(marker, file=stream)
+    _print_snippet(file_pos, stream)
 
 
 def _report_positional_warning(warning_type, file_pos, message, action, stream=sys.stdout):
@@ -89,11 +99,7 @@ def _report_positional_warning(warning_type, file_pos, message, action, stream=s
           file=stream)
     print(action, file=stream)
 
-    snippet, left_chars_num = _read_snippet(file_pos)
-    print(snippet, file=stream)
-
-    marker = " " * left_chars_num + "^"
-    print(marker, file=stream)
+    _print_snippet(file_pos, stream)
 
 
 def report_lexical_error(file_pos, message, stream=sys.stdout):
@@ -2,73 +2,121 @@
 Module for code execution
 """
 
+UNDECLARED = object()  # value of slots of variables whose declaration wasn't executed yet
+UNINITIALIZED = None  # value of slots of declared variables that weren't assigned yet
 
-class Environment:
-    def __init__(self):
-        self._scope_stack = [Scope()]
 
-    def push_scope(self):
-        self._scope_stack.append(Scope())
+class FrameLayout:
+    """
+    Variables declared in a scope, by slot in frames of the scope
 
-    def pop_scope(self):
-        if len(self._scope_stack) == 1:
-            raise OverflowError("Can't pop global scope")
+    Made by resolution of the program, variable declared again in the same scope keeps its slot
+    """
 
-        self._scope_stack.pop()
+    __slots__ = ('names', 'blank')
 
-    def add_var(self, identifier):
-        self._scope_stack[-1].set_var(identifier)
-
-    def set_var(self, identifier, value):
-        for scope in reversed(self._scope_stack):
-            if scope.exists_var(identifier):
-                scope.set_var(identifier, value)
-                return
+    def __init__(self, names=()):
+        self.names = {}
+        self.blank = []  # values of new frame, copied when frame is entered
+        for name in names:
+            self.declare(name)
 
-        raise ValueError("Variable {} undeclared".format(identifier))
-
-    def get_var(self, identifier):
-        for scope in reversed(self._scope_stack):
-            if scope.exists_var(identifier):
-                if not scope.is_set_var(identifier):
-                    raise ValueError("Variable {} uninitialized".format(identifier))
-                return scope.get_var(identifier)
+    def declare(self, identifier, on_entry=False):
+        """
+        Args:
+            identifier: name of the variable
+            on_entry: whether variable is declared (uninitialized) as soon as frame is entered, like parameters
 
-        raise ValueError("Variable {} undeclared".format(identifier))
+        Returns:
+            slot of the variable
+        """
+        slot = self.names.setdefault(identifier, len(self.names))
+        if slot == len(self.blank):
+            self.blank.append(UNDECLARED)
+        if on_entry:
+            self.blank[slot] = UNINITIALIZED
+        return slot
 
-    def set_fun(self, identifier, node):
-        self._scope_stack[-1].set_fun(identifier, node)
+    def get_size(self):
+        return len(self.names)
 
-    def get_fun(self, identifier):
-        for scope in reversed(self._scope_stack):
-            if scope.exists_fun(identifier):
-                return scope.get_fun(identifier)
 
-        raise ValueError("Function {} undeclared".format(identifier))
+class Environment:
+    """
+    Stack of frames with values of variables in slots given by frame layouts
 
+    Resolved variables are read by their frame depth (counted from the top) and slot. Variables that can't be resolved
+    statically (dynamic scoping makes variables of callers visible in functions) are looked up by name
+    """
 
-class Scope:
     def __init__(self):
-        self._variables = {}
+        self.frames = [[]]  # lists of values, global frame first, compiled code reads and writes them directly
+        self._layouts = [FrameLayout()]
         self._functions = {}
 
-    def exists_var(self, identifier):
-        return identifier in self._variables
+    def set_global_layout(self, layout):
+        """
+        Sets layout of the global frame, which can grow between executions of top-level statements
+        """
+        self._layouts[0] = layout
+        global_frame = self.frames[0]
+        global_frame.extend(layout.blank[len(global_frame):])
+
+    def push_frame(self, layout):
+        self.frames.append(layout.blank[:])
+        self._layouts.append(layout)
+
+    def reset_frame(self):
+        """
+        Makes the top frame new again, so it can be reused by the next iteration of a loop instead of pushing new one
+        """
+        self.frames[-1][:] = self._layouts[-1].blank
+
+    def pop_frame(self):
+        if len(self.frames) == 1:
+            raise OverflowError("Can't pop global frame")
+
+        self.frames.pop()
+        self._layouts.pop()
+
+    def declare(self, slot):
+        """
+        Declares variable in the top frame, uninitialized
+        """
+        self.frames[-1][slot] = UNINITIALIZED
+
+    def get_slot(self, depth, slot, identifier):
+        value = self.frames[-1 - depth][slot]
+        if value is UNINITIALIZED:
+            raise ValueError("Variable {} uninitialized".format(identifier))
+        return value
+
+    def set_slot(self, depth, slot, value):
+        self.frames[-1 - depth][slot] = value
+
+    def _find(self, identifier):
+        for frame, layout in zip(reversed(self.frames), reversed(self._layouts)):
+            slot = layout.names.get(identifier)
+            if slot is not None and frame[slot] is not UNDECLARED:
+                return frame, slot
 
-    def is_set_var(self, identifier):
-        return self.exists_var(identifier) and self.get_var(identifier) is not None
+        raise ValueError("Variable {} undeclared".format(identifier))
 
-    def set_var(self, identifier, value=None):
-        self._variables[identifier] = value
+    def set_var(self, identifier, value):
+        frame, slot = self._find(identifier)
+        frame[slot] = value
 
     def get_var(self, identifier):
-        return self._variables[identifier]
-
-    def exists_fun(self, identifier):
-        return identifier in self._functions
+        frame, slot = self._find(identifier)
+        if frame[slot] is UNINITIALIZED:
+            raise ValueError("Variable {} uninitialized".format(identifier))
+        return frame[slot]
 
     def set_fun(self, identifier, node):
         self._functions[identifier] = node
 
     def get_fun(self, identifier):
-        return self._functions[identifier]
+        try:
+            return self._functions[identifier]
+        except KeyError:
+            raise ValueError("Function {} undeclared".format(identifier))
@@ -3,10 +3,17 @@
 Lexical analysis module
 
 """
+import re
+import sys
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from collections import deque
 
 from timoninterpreter import error_handling
 from timoninterpreter import tokens
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.source_readers import FilePosition
 
 
 class BaseLexer(ABC):
@@ -33,6 +40,24 @@ class BaseLexer(ABC):
         """
         pass
 
+    def fill(self, token_buffer):
+        """
+        Tokenizes the rest of the input into token buffer
+
+        Lexical error stops tokenization and is stored in the buffer instead of being raised
+
+        Args:
+            token_buffer: TokenBuffer to append tokens to
+        """
+        try:
+            while True:
+                token = self.get()
+                token_buffer.append(token.get_type(), token.get_file_pos().get_absolute_pos(), token.get_value())
+                if token.get_type() == tokens.TokenType.END:
+                    return
+        except error_handling.LexicalError as e:
+            token_buffer.set_error(e)
+
 
 def is_white(character):
     return character.isspace()
@@ -407,25 +432,29 @@ class Lexer(BaseLexer):
 
     def __init__(self, source_reader):
         super().__init__(source_reader)
-        self._cached_token = None
+        self._lookahead = deque()
 
-    def peek(self):
+    def peek(self, k=1):
         """
-        Get next token without consuming it
+        Get k-th next token without consuming it
+
+        Tokens looked ahead are tokenized once and kept until consumed, reader is never rewound
+
+        Args:
+            k: which token to look at, 1 is the next one
 
         Returns:
-            next token
+            k-th next token
 
         Raises:
             LexicalError when input can't be processed into token
         """
-        if self._cached_token is not None:
-            return self._cached_token
+        if k < 1:
+            raise ValueError("Lookahead must be positive")
 
-        self.source_reader.checkpoint()
-        self._cached_token = self.get()
-        self.source_reader.rewind_backward()
-        return self._cached_token
+        while len(self._lookahead) < k:
+            self._lookahead.append(self._next_token())
+        return self._lookahead[k - 1]
 
     def get(self):
         """
@@ -437,11 +466,12 @@ class Lexer(BaseLexer):
         Raises:
             LexicalError when input can't be processed into token
         """
-        if self._cached_token is not None:
-            self.source_reader.rewind_forward()
-            token, self._cached_token = self._cached_token, None
-            return token
+        if self._lookahead:
+            return self._lookahead.popleft()
+
+        return self._next_token()
 
+    def _next_token(self):
         if is_skippable(self.source_reader.peek()):
             self._skip_to_unskippable()
 
@@ -521,3 +551,768 @@ class Lexer(BaseLexer):
         message = "Unexpected character, not recognizable by any rule"
         raise error_handling.LexicalError(self.source_reader.get_file_pos(),
                                           message)
+
+
+# Patterns used by TableLexer, \s matches exactly the characters for which str.isspace is true
+_WHITE_PATTERN = re.compile(r'\s*')
+_ASCII_IDENTIFIER_MIDDLE_PATTERN = re.compile(r'[A-Za-z0-9_]*')
+_ASCII_DIGITS_PATTERN = re.compile(r'[0-9]*')
+_DATE_REST_PATTERN = re.compile(r'\.([0-9]{2})\.([0-9]{4})')
+_DATETIME_TIME_PATTERN = re.compile(r'~([0-9]{2}):([0-9]{2}):([0-9]{2})')
+_TIME_REST_PATTERN = re.compile(r':([0-9]{2}):([0-9]{2})')
+_TIMEDELTA_PATTERN = re.compile(r"'(?:\s*(?:0|[1-9][0-9]*)[YMWDhms])*\s*'")
+_TIMEDELTA_PART_PATTERN = re.compile(r'(0|[1-9][0-9]*)([YMWDhms])')
+# white characters, then ASCII identifier or operator (if any)
+_TOKEN_PATTERN = re.compile(r'(\s*)(?:([A-Za-z_][A-Za-z0-9_]*)|([=!<>]=?|[;(){}.|&+*/,-]))?')
+
+_operator_token_type_map = dict(tokens.unambiguous_singular_token_type_map)
+_operator_token_type_map.update({k: v['first_case_token_type']
+                                 for k, v in tokens.ambiguous_binary_token_type_map.items()})
+_operator_token_type_map.update({k + v['second_character']: v['second_case_token_type']
+                                 for k, v in tokens.ambiguous_binary_token_type_map.items()})
+
+
+class TableLexer(BaseLexer):
+    """
+    Lexer scanning the whole in-memory source with compiled patterns and a character dispatch table
+
+    Produces the same tokens, errors and warnings as Lexer. Rare cases (unterminated or malformed literals, non-ASCII
+    digits) are delegated to Lexer's sub-lexers, so they are reported exactly the same way.
+    Requires reader that exposes its text, like BufferReader
+    """
+
+    def __init__(self, source_reader):
+        super().__init__(source_reader)
+        self._text = source_reader.get_text()
+        self._pos = source_reader.get_pos()
+        self._source = source_reader.get_file_pos().get_source()
+        self._lookahead = deque()
+
+    def peek(self, k=1):
+        """
+        Get k-th next token without consuming it
+
+        Args:
+            k: which token to look at, 1 is the next one
+
+        Returns:
+            k-th next token
+
+        Raises:
+            LexicalError when input can't be processed into token
+        """
+        if k < 1:
+            raise ValueError("Lookahead must be positive")
+
+        while len(self._lookahead) < k:
+            self._lookahead.append(self._next_token())
+        return self._lookahead[k - 1]
+
+    def get(self):
+        """
+        Get next token and consume it
+
+        Returns:
+            next token
+
+        Raises:
+            LexicalError when input can't be processed into token
+        """
+        if self._lookahead:
+            return self._lookahead.popleft()
+
+        return self._next_token()
+
+    def fill(self, token_buffer):
+        """
+        Tokenizes the rest of the input into token buffer
+
+        Identifiers, keywords and operators are stored without creating token objects
+
+        Args:
+            token_buffer: TokenBuffer to append tokens to
+        """
+        while self._lookahead:
+            token = self._lookahead.popleft()
+            token_buffer.append(token.get_type(), token.get_file_pos().get_absolute_pos(), token.get_value())
+            if token.get_type() == tokens.TokenType.END:
+                return
+
+        text = self._text
+        length = len(text)
+        types_append = token_buffer._types.append
+        offsets_append = token_buffer._offsets.append
+        values_append = token_buffer._values.append
+        valued_indices_append = token_buffer._valued_indices.append
+        keyword_codes = {k: v.value for k, v in tokens.keyword_token_type_map.items()}
+        operator_codes = {k: v.value for k, v in _operator_token_type_map.items()}
+        identifier_code = tokens.TokenType.IDENTIFIER.value
+        intern = sys.intern
+
+        try:
+            while True:
+                match = _TOKEN_PATTERN.match(text, self._pos)
+                pos = match.end(1)
+                end = match.end()
+                kind = match.lastindex
+
+                # same fast cases as in _next_token, everything else goes through it
+                if pos - self._pos <= Lexer.MAX_SKIPPABLE_CHARACTERS_LENGTH:
+                    if kind == 2 and end - pos <= IdentifierSubLexer.MAX_IDENTIFIER_LENGTH and \
+                            not (end < length and text[end] >= '\x80'):
+                        self._pos = end
+                        identifier = match.group(2)
+                        code = keyword_codes.get(identifier)
+                        if code is None:
+                            valued_indices_append(len(token_buffer._types))
+                            values_append(intern(identifier))
+                            code = identifier_code
+                        types_append(code)
+                        offsets_append(pos)
+                        continue
+
+                    if kind == 3:
+                        self._pos = end
+                        types_append(operator_codes[match.group(3)])
+                        offsets_append(pos)
+                        continue
+
+                token = self._next_token()
+                token_buffer.append(token.get_type(), token.get_file_pos().get_absolute_pos(), token.get_value())
+                if token.get_type() == tokens.TokenType.END:
+                    return
+        except error_handling.LexicalError as e:
+            token_buffer.set_error(e)
+
+    def _file_pos(self, absolute_pos):
+        return FilePosition(self._source, absolute_pos)
+
+    def _next_token(self):
+        text = self._text
+        match = _TOKEN_PATTERN.match(text, self._pos)
+        pos = match.end(1)
+
+        # long runs of white characters and comments are skipped the slow way, with all the limits checked
+        if pos - self._pos > Lexer.MAX_SKIPPABLE_CHARACTERS_LENGTH or text.startswith(tokens.COMMENT_BOUND, pos):
+            pos = self._skip_to_unskippable(self._pos)
+            match = _TOKEN_PATTERN.match(text, pos)
+
+        kind = match.lastindex
+        if kind == 2 and not (match.end() < len(text) and text[match.end()] >= '\x80'):  # ASCII identifier
+            if match.end() - pos > IdentifierSubLexer.MAX_IDENTIFIER_LENGTH:
+                return self._get_identifier(pos)
+            self._pos = match.end()
+            identifier = match.group(2)
+            if identifier in tokens.keyword_token_type_map:
+                return tokens.Token.unchecked(tokens.keyword_token_type_map[identifier],
+                                              FilePosition(self._source, pos))
+            return tokens.Token.unchecked(tokens.TokenType.IDENTIFIER,
+                                          FilePosition(self._source, pos),
+                                          identifier)
+
+        if kind == 3:
+            self._pos = match.end()
+            return tokens.Token.unchecked(_operator_token_type_map[match.group(3)],
+                                          FilePosition(self._source, pos),
+                                          None)
+
+        if pos >= len(text):
+            self._pos = pos
+            return tokens.Token.unchecked(tokens.TokenType.END,
+                                          FilePosition(self._source, pos))
+
+        handler = self._dispatch_table.get(text[pos], TableLexer._get_other)
+        return handler(self, pos)
+
+    def _skip_to_unskippable(self, pos):
+        start_pos = pos
+        counter = 0
+
+        while True:
+            end = _WHITE_PATTERN.match(self._text, pos).end()
+            if end > pos:
+                if counter + (end - pos) > Lexer.MAX_SKIPPABLE_CHARACTERS_LENGTH:
+                    self._raise_too_many_skippable(start_pos)
+                counter += end - pos
+                pos = end
+
+            if not self._text.startswith(tokens.COMMENT_BOUND, pos):
+                return pos
+
+            if counter >= Lexer.MAX_SKIPPABLE_CHARACTERS_LENGTH:
+                self._raise_too_many_skippable(start_pos)
+            pos, skipped = self._skip_comment(pos)
+            counter += skipped
+
+    def _raise_too_many_skippable(self, start_pos):
+        message = "Too many skippable characters. Maximum size is {} characters".format(
+            Lexer.MAX_SKIPPABLE_CHARACTERS_LENGTH)
+        raise error_handling.LexicalError(self._file_pos(start_pos),
+                                          message)
+
+    def _skip_comment(self, pos):
+        end = self._text.find(tokens.COMMENT_BOUND, pos + 1)
+        inside_length = (end if end != -1 else len(self._text)) - pos - 1
+
+        # unclosed comment counts the end of file as a character
+        if inside_length + (end == -1) > Lexer.MAX_COMMENT_LENGTH:
+            message = "Comment is too long. Maximum size is {} characters (excluding bounds)".format(
+                Lexer.MAX_COMMENT_LENGTH)
+            raise error_handling.LexicalError(self._file_pos(pos),
+                                              message)
+
+        if end == -1:  # comment unclosed before end of file
+            error_handling.report_lexical_warning(self._file_pos(pos),
+                                                  "File ended before end of comment",
+                                                  "Ignoring")
+            return len(self._text), inside_length + 2
+
+        return end + 1, inside_length + 2
+
+    def _delegate(self, sub_lexer_class, pos):
+        self.source_reader.seek(pos)
+        token = sub_lexer_class(self.source_reader).get()
+        self._pos = self.source_reader.get_pos()
+        return token
+
+    def _get_identifier(self, pos):
+        end = _ASCII_IDENTIFIER_MIDDLE_PATTERN.match(self._text, pos + 1).end()
+        while end < len(self._text) and is_identifier_middle(self._text[end]):  # non-ASCII letters
+            end = _ASCII_IDENTIFIER_MIDDLE_PATTERN.match(self._text, end + 1).end()
+
+        if end - pos > IdentifierSubLexer.MAX_IDENTIFIER_LENGTH:
+            raise error_handling.LexicalError(
+                self._file_pos(pos),
+                "Identifier is too long. Maximum size is {} characters".format(IdentifierSubLexer.MAX_IDENTIFIER_LENGTH))
+
+        self._pos = end
+        identifier = self._text[pos:end]
+
+        if is_keyword(identifier):
+            return tokens.Token.unchecked(tokens.keyword_token_type_map[identifier],
+                                          self._file_pos(pos))
+
+        return tokens.Token.unchecked(tokens.TokenType.IDENTIFIER,
+                                      self._file_pos(pos),
+                                      identifier)
+
+    def _get_numerical(self, pos):
+        end = _ASCII_DIGITS_PATTERN.match(self._text, pos).end()
+        if self._text[end:end + 1].isdigit():  # non-ASCII digit
+            return self._delegate(NumericalLiteralSubLexer, pos)
+
+        if self._text[pos] == '0':  # zero is a standalone number or starts two digit date or hour
+            if end - pos > 2:
+                raise error_handling.LexicalError(self._file_pos(pos),
+                                                  "Unexpected digit")
+            number_value = 0
+            first_value = int(self._text[pos + 1:end] or 0)
+            single_digit = end - pos == 1
+        else:
+            if end - pos > NumberLiteralSubLexer.MAX_NUMBER_LITERAL_LENGTH:
+                raise error_handling.LexicalError(
+                    self._file_pos(pos),
+                    "Digit is too long. Maximum size is {} characters".format(
+                        NumberLiteralSubLexer.MAX_NUMBER_LITERAL_LENGTH))
+            number_value = first_value = int(self._text[pos:end])
+            single_digit = number_value < 10
+
+        if not single_digit:
+            if self._text.startswith(tokens.DATE_SEPARATOR, end):
+                return self._get_date_or_datetime(pos, end, first_value)
+            if self._text.startswith(tokens.TIME_SEPARATOR, end):
+                return self._get_time(pos, end, first_value)
+
+        self._pos = end
+        return tokens.Token.unchecked(tokens.TokenType.NUMBER_LITERAL,
+                                      self._file_pos(pos),
+                                      number_value)
+
+    def _make_value_token(self, pos, end, token_type, value_type, *values):
+        try:
+            token = tokens.Token.unchecked(token_type,
+                                           self._file_pos(pos),
+                                           value_type(*values))
+        except ValueError as e:
+            raise error_handling.LexicalError(self._file_pos(pos),
+                                              str(e))
+        self._pos = end
+        return token
+
+    def _get_date_or_datetime(self, pos, end, first_value):
+        date_match = _DATE_REST_PATTERN.match(self._text, end)
+        if date_match is None:
+            return self._delegate(NumericalLiteralSubLexer, pos)
+
+        date_values = (first_value, int(date_match.group(1)), int(date_match.group(2)))
+
+        if not self._text.startswith(tokens.DATETIME_SEPARATOR, date_match.end()):
+            return self._make_value_token(pos, date_match.end(), tokens.TokenType.DATE_LITERAL, tokens.DateValue,
+                                          *date_values)
+
+        time_match = _DATETIME_TIME_PATTERN.match(self._text, date_match.end())
+        if time_match is None:
+            return self._delegate(NumericalLiteralSubLexer, pos)
+
+        return self._make_value_token(pos, time_match.end(), tokens.TokenType.DATETIME_LITERAL, tokens.DateTimeValue,
+                                      *date_values, *(int(v) for v in time_match.groups()))
+
+    def _get_time(self, pos, end, first_value):
+        time_match = _TIME_REST_PATTERN.match(self._text, end)
+        if time_match is None:
+            return self._delegate(NumericalLiteralSubLexer, pos)
+
+        return self._make_value_token(pos, time_match.end(), tokens.TokenType.TIME_LITERAL, tokens.TimeValue,
+                                      first_value, *(int(v) for v in time_match.groups()))
+
+    def _get_string_literal(self, pos):
+        end = self._text.find(tokens.STRING_BOUND, pos + 1)
+        while end != -1 and self._text[end - 1] == tokens.ESCAPE:
+            end = self._text.find(tokens.STRING_BOUND, end + 1)
+
+        if end == -1:  # unclosed string
+            return self._delegate(StringLiteralSubLexer, pos)
+
+        string_value = self._text[pos + 1:end].replace(tokens.ESCAPE + tokens.STRING_BOUND, tokens.STRING_BOUND)
+        if len(string_value) > StringLiteralSubLexer.MAX_STRING_LITERAL_LENGTH:
+            raise error_handling.LexicalError(
+                self._file_pos(pos),
+                "String literal is too long. Maximum size is {} characters (excluding bounds and escapes)".format(
+                    StringLiteralSubLexer.MAX_STRING_LITERAL_LENGTH))
+
+        self._pos = end + 1
+        return tokens.Token.unchecked(tokens.TokenType.STRING_LITERAL,
+                                      self._file_pos(pos),
+                                      string_value)
+
+    def _get_timedelta_literal(self, pos):
+        timedelta_match = _TIMEDELTA_PATTERN.match(self._text, pos)
+        if timedelta_match is None:
+            return self._delegate(TimedeltaLiteralSubLexer, pos)
+
+        values_map = {}
+        parts_length = 0
+        for number, unit in _TIMEDELTA_PART_PATTERN.findall(timedelta_match.group()):
+            if unit in values_map or len(number) > NumberLiteralSubLexer.MAX_NUMBER_LITERAL_LENGTH:
+                return self._delegate(TimedeltaLiteralSubLexer, pos)
+            values_map[unit] = int(number)
+            parts_length += len(number) + 1
+
+        # each white character and each number with its unit is counted once
+        inside_length = timedelta_match.end() - pos - 2
+        if inside_length - parts_length + len(values_map) > TimedeltaLiteralSubLexer.MAX_TIMEDELTA_LITERAL_LENGTH:
+            return self._delegate(TimedeltaLiteralSubLexer, pos)
+
+        self._pos = timedelta_match.end()
+        return tokens.Token.unchecked(tokens.TokenType.TIMEDELTA_LITERAL,
+                                      self._file_pos(pos),
+                                      tokens.TimedeltaValue(values_map.get("Y"),
+                                                            values_map.get("M"),
+                                                            values_map.get("W"),
+                                                            values_map.get("D"),
+                                                            values_map.get("h"),
+                                                            values_map.get("m"),
+                                                            values_map.get("s")))
+
+    def _get_ambiguous_binary(self, pos):
+        token_types = tokens.ambiguous_binary_token_type_map[self._text[pos]]
+
+        if self._text.startswith(token_types['second_character'], pos + 1):
+            self._pos = pos + 2
+            token_type = token_types['second_case_token_type']
+        else:
+            self._pos = pos + 1
+            token_type = token_types['first_case_token_type']
+
+        return tokens.Token.unchecked(token_type,
+                                      self._file_pos(pos),
+                                      None)
+
+    def _get_unambiguous_singular(self, pos):
+        self._pos = pos + 1
+        return tokens.Token.unchecked(tokens.unambiguous_singular_token_type_map[self._text[pos]],
+                                      self._file_pos(pos),
+                                      None)
+
+    def _get_other(self, pos):
+        character = self._text[pos]
+
+        if is_identifier_start(character):
+            return self._get_identifier(pos)
+
+        if is_numeric_start(character):
+            return self._delegate(NumericalLiteralSubLexer, pos)
+
+        message = "Unexpected character, not recognizable by any rule"
+        raise error_handling.LexicalError(self._file_pos(pos),
+                                          message)
+
+    _dispatch_table = {}
+
+
+TableLexer._dispatch_table.update({c: TableLexer._get_identifier
+                                   for c in map(chr, range(128)) if is_identifier_start(c)})
+TableLexer._dispatch_table.update({c: TableLexer._get_numerical for c in '0123456789'})
+TableLexer._dispatch_table.update({tokens.STRING_BOUND: TableLexer._get_string_literal,
+                                   tokens.TIMEDELTA_BOUND: TableLexer._get_timedelta_literal})
+TableLexer._dispatch_table.update({c: TableLexer._get_ambiguous_binary for c in tokens.ambiguous_binary_token_type_map})
+TableLexer._dispatch_table.update({c: TableLexer._get_unambiguous_singular
+                                   for c in tokens.unambiguous_singular_token_type_map})
+
+class TokenBuffer:
+    """
+    Compact, columnar storage of tokens of one source
+
+    Token types are stored as one byte codes, positions as absolute offsets and only tokens that carry a value have
+    an entry in the list of values. Token objects are created only when they are requested.
+    If tokenization stopped at lexical error, the error is kept and raised when the view reaches it.
+    """
+
+    # codes of token types that carry a value
+    _VALUED_CODES = frozenset(token_type.value for token_type in tokens.token_value_valid_types_map)
+
+    def __init__(self, source, text=None):
+        """
+        Args:
+            source: Source the offsets refer to
+            text: whole tokenized text, needed for retokenizing after edits
+        """
+        self._source = source
+        self._text = text
+        self._types = array('B')
+        self._offsets = array('I')
+        self._values = []
+        self._valued_indices = array('I')  # indices of tokens that have entry in values
+        self._error = None
+
+    def __len__(self):
+        return len(self._types)
+
+    def append(self, token_type, absolute_pos, value=None):
+        if token_type.value in self._VALUED_CODES:
+            self._valued_indices.append(len(self._types))
+            self._values.append(value)
+        self._types.append(token_type.value)
+        self._offsets.append(absolute_pos)
+
+    def extend_shifted(self, token_buffer, start_index, shift):
+        """
+        Appends tokens of other buffer with offsets shifted, together with its error
+
+        Args:
+            token_buffer: TokenBuffer to take tokens from
+            start_index: index of the first token to take
+            shift: value added to offsets
+        """
+        index_shift = len(self._types) - start_index
+        start_values = bisect_left(token_buffer._valued_indices, start_index)
+
+        self._types.extend(token_buffer._types[start_index:])
+        self._offsets.extend(array('I', [offset + shift for offset in token_buffer._offsets[start_index:]]))
+        self._values.extend(token_buffer._values[start_values:])
+        self._valued_indices.extend(array('I', [index + index_shift
+                                                for index in token_buffer._valued_indices[start_values:]]))
+
+        error = token_buffer.get_error()
+        if error is not None:
+            self.set_error(error_handling.LexicalError(FilePosition(self._source,
+                                                                    error.file_pos.get_absolute_pos() + shift),
+                                                       error.message))
+
+    def set_error(self, error):
+        self._error = error
+
+    def get_error(self):
+        """
+        Returns:
+            lexical error that stopped tokenization or None
+        """
+        return self._error
+
+    def get_source(self):
+        return self._source
+
+    def get_text(self):
+        return self._text
+
+    def get_type(self, index):
+        return tokens.token_types_by_code[self._types[index]]
+
+    def get_absolute_pos(self, index):
+        return self._offsets[index]
+
+    def get_value(self, index):
+        if self._types[index] not in self._VALUED_CODES:
+            return None
+        return self._values[bisect_left(self._valued_indices, index)]
+
+    def get_token(self, index):
+        """
+        Returns:
+            token object for token at given index
+        """
+        return tokens.Token.unchecked(self.get_type(index),
+                                      FilePosition(self._source, self._offsets[index]),
+                                      self.get_value(index))
+
+    def view(self):
+        """
+        Returns:
+            new TokenBufferView from the first token
+        """
+        return TokenBufferView(self)
+
+    def extract(self, start_index, end_index):
+        """
+        Copies tokens from start_index to end_index (exclusive) into a new buffer ended with END token
+
+        Returns:
+            TokenBuffer with the same source
+        """
+        start_values = bisect_left(self._valued_indices, start_index)
+        end_values = bisect_left(self._valued_indices, end_index, start_values)
+
+        token_buffer = TokenBuffer(self._source)
+        token_buffer._types = self._types[start_index:end_index]
+        token_buffer._offsets = self._offsets[start_index:end_index]
+        token_buffer._values = self._values[start_values:end_values]
+        token_buffer._valued_indices = array('I', [index - start_index
+                                                   for index in self._valued_indices[start_values:end_values]])
+        end_pos = self._offsets[end_index - 1] + 1 if end_index > start_index else 0
+        token_buffer.append(tokens.TokenType.END, end_pos)
+        return token_buffer
+
+
+class TokenBufferView:
+    """
+    Lexer-like, sequential view of a TokenBuffer, consumable by the parser
+
+    Like lexers, keeps returning END token after the end
+    """
+
+    __slots__ = ('_buffer', '_index', '_value_index', '_cached_token')
+
+    def __init__(self, token_buffer):
+        self._buffer = token_buffer
+        self._index = 0
+        self._value_index = 0
+        self._cached_token = None
+
+    def peek(self, k=1):
+        """
+        Get k-th next token without consuming it
+
+        Args:
+            k: which token to look at, 1 is the next one
+
+        Returns:
+            k-th next token
+
+        Raises:
+            LexicalError when tokenization stopped before this token
+        """
+        if k == 1:
+            if self._cached_token is None:
+                self._cached_token = self._make_token(self._index, self._value_index)
+            return self._cached_token
+
+        if k < 1:
+            raise ValueError("Lookahead must be positive")
+
+        types = self._buffer._types
+        index, value_index = self._index, self._value_index
+        for _ in range(k - 1):
+            if index >= len(types) or types[index] == tokens.TokenType.END.value:
+                break
+            if types[index] in TokenBuffer._VALUED_CODES:
+                value_index += 1
+            index += 1
+        return self._make_token(index, value_index)
+
+    def get(self):
+        """
+        Get next token and consume it
+
+        Returns:
+            next token
+
+        Raises:
+            LexicalError when tokenization stopped before this token
+        """
+        token = self.peek()
+        if token.get_type() != tokens.TokenType.END:
+            self._cached_token = None
+            self._index += 1
+            if token.get_value() is not None:
+                self._value_index += 1
+        return token
+
+    def take_bracketed(self):
+        """
+        Consumes next token, which has to be LEFT_BRACKET, and all tokens up to the matching RIGHT_BRACKET
+
+        Brackets are found by scanning token type codes, without creating tokens
+
+        Returns:
+            TokenBuffer (made by TokenBuffer.extract) with consumed tokens or None, with nothing consumed, if next
+            token isn't LEFT_BRACKET or isn't closed
+        """
+        buffer = self._buffer
+        start_index = self._index
+        if start_index >= len(buffer._types) or buffer._types[start_index] != tokens.TokenType.LEFT_BRACKET.value:
+            return None
+
+        depth = 0
+        for match in _BRACKET_CODES_PATTERN.finditer(buffer._types, start_index):
+            code = match.group()[0]
+            if code == tokens.TokenType.END.value:
+                return None
+            depth += 1 if code == tokens.TokenType.LEFT_BRACKET.value else -1
+            if depth == 0:
+                self._index = match.end()
+                self._value_index = bisect_left(buffer._valued_indices, self._index, self._value_index)
+                self._cached_token = None
+                return buffer.extract(start_index, self._index)
+        return None
+
+    def _make_token(self, index, value_index):
+        buffer = self._buffer
+        if index >= len(buffer._types):
+            raise buffer._error
+
+        code = buffer._types[index]
+        return tokens.Token.unchecked(tokens.token_types_by_code[code],
+                                      FilePosition(buffer._source, buffer._offsets[index]),
+                                      buffer._values[value_index] if code in buffer._VALUED_CODES else None)
+
+
+class TokenRecorder:
+    """
+    Lexer-like wrapper of a lexer that appends consumed tokens to a TokenBuffer, so they can be parsed again later
+    """
+
+    __slots__ = ('_lexer', '_buffer')
+
+    def __init__(self, lexer, token_buffer):
+        """
+        Args:
+            lexer: lexer (or view) to read tokens from
+            token_buffer: TokenBuffer to append consumed tokens to
+        """
+        self._lexer = lexer
+        self._buffer = token_buffer
+
+    def peek(self, k=1):
+        return self._lexer.peek(k)
+
+    def get(self):
+        token = self._lexer.get()
+        self._buffer.append(token.get_type(), token.get_file_pos().get_absolute_pos(), token.get_value())
+        return token
+
+    def finish(self):
+        """
+        Ends recorded tokens with END token, placed after the last of them
+
+        Returns:
+            TokenBuffer with recorded tokens
+        """
+        buffer = self._buffer
+        buffer.append(tokens.TokenType.END, buffer.get_absolute_pos(len(buffer) - 1) + 1 if len(buffer) else 0)
+        return buffer
+
+
+# Matches codes of brackets and END in TokenBuffer types
+_BRACKET_CODES_PATTERN = re.compile(b'[' + re.escape(bytes([tokens.TokenType.LEFT_BRACKET.value,
+                                                            tokens.TokenType.RIGHT_BRACKET.value,
+                                                            tokens.TokenType.END.value])) + b']')
+
+
+def tokenize(source_reader, lexer_class=None):
+    """
+    Tokenizes the whole input at once
+
+    Args:
+        source_reader: opened source reader
+        lexer_class: lexer to use, TableLexer for readers that expose their text, Lexer otherwise
+
+    Returns:
+        TokenBuffer with all tokens of the input
+    """
+    if lexer_class is None:
+        lexer_class = TableLexer if hasattr(source_reader, "get_text") else Lexer
+
+    text = source_reader.get_text() if hasattr(source_reader, "get_text") else None
+    token_buffer = TokenBuffer(source_reader.get_file_pos().get_source(), text)
+    lexer_class(source_reader).fill(token_buffer)
+    return token_buffer
+
+
+def retokenize(token_buffer, absolute_pos, removed_length, inserted_text):
+    """
+    Tokenizes text after an edit, reusing tokens of the text before it
+
+    Lexing restarts at the last token starting before the edit and stops as soon as a new token starts where an old
+    token started after the edited part. From there on both texts are the same, so the rest of the old tokens (or
+    the old error) is copied with shifted offsets. Lexer keeps no state between tokens, so this gives the same result
+    as tokenizing the edited text from scratch, whatever literal or comment bounds the edit adds or removes.
+
+    Args:
+        token_buffer: TokenBuffer of the text before the edit, with text kept
+        absolute_pos: where the edit starts in the text before the edit
+        removed_length: how many characters were removed from there
+        inserted_text: text inserted in place of the removed characters
+
+    Returns:
+        new TokenBuffer of the edited text
+    """
+    old_text = token_buffer.get_text()
+    if old_text is None:
+        raise ValueError("Token buffer has no text to edit")
+    if absolute_pos < 0 or removed_length < 0 or absolute_pos + removed_length > len(old_text):
+        raise ValueError("Edit outside of text. Only possible range is [0, {}]".format(len(old_text)))
+
+    text = old_text[:absolute_pos] + inserted_text + old_text[absolute_pos + removed_length:]
+    shift = len(inserted_text) - removed_length
+    edit_end = absolute_pos + len(inserted_text)  # in the edited text
+
+    old_types, old_offsets = token_buffer._types, token_buffer._offsets
+    restart_index = max(bisect_left(old_offsets, absolute_pos) - 1, 0)
+    restart_pos = old_offsets[restart_index] if old_offsets and old_offsets[restart_index] < absolute_pos else 0
+    restart_values = bisect_left(token_buffer._valued_indices, restart_index)
+
+    with BufferReader(token_buffer.get_source().get_file_path(), text) as reader:
+        new_buffer = TokenBuffer(reader.get_file_pos().get_source(), text)
+        new_buffer._types = old_types[:restart_index]
+        new_buffer._offsets = old_offsets[:restart_index]
+        new_buffer._values = token_buffer._values[:restart_values]
+        new_buffer._valued_indices = token_buffer._valued_indices[:restart_values]
+
+        reader.seek(restart_pos)
+        lexer = TableLexer(reader)
+
+        old_index = restart_index
+        while True:
+            try:
+                token = lexer.get()
+            except error_handling.LexicalError as e:
+                new_buffer.set_error(e)
+                return new_buffer
+
+            token_pos = token.get_file_pos().get_absolute_pos()
+            if token_pos >= edit_end:
+                old_index = bisect_left(old_offsets, token_pos - shift, old_index)
+                if old_index < len(old_offsets) and old_offsets[old_index] == token_pos - shift:
+                    new_buffer.extend_shifted(token_buffer, old_index, shift)
+                    return new_buffer
+
+            new_buffer.append(token.get_type(), token_pos, token.get_value())
+            if token.get_type() == tokens.TokenType.END:
+                return new_buffer
+
+
+# Lexer implementations selectable by name
+lexer_engines = {
+    "classic": Lexer,
+    "table": TableLexer
+}
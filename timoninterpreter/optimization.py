@@ -0,0 +1,851 @@
+"""
+
+Optimization module
+
+Passes transforming parsed program before its resolution and execution, so that it executes faster with the same
+output and the same errors, raised when execution gets to them. Bodies of lazily parsed functions that weren't parsed
+yet are left as they are
+
+"""
+
+import itertools
+
+from timoninterpreter import tokens
+from timoninterpreter.syntax_nodes import *
+
+_LITERALS = (NumberLiteral, StringLiteral, DateLiteral, TimeLiteral, DateTimeLiteral, TimedeltaLiteral, Constant)
+_CHAINS = (Expression, LogicAndExpression, MathExpression, MultiplicativeMathExpression)
+_COMPARISONS = (LogicEqualityExpression, LogicRelationalExpression)
+
+# Weights of evaluations, subexpressions lighter than guard of their first evaluation aren't moved from loops
+_CALL_WEIGHT = 2
+_CALENDAR_WEIGHT = 2  # date, time or timedelta operand, or access of time info
+_MIN_MOVED_WEIGHT = 2
+
+# Attributes of statements holding their expressions
+_expression_attributes = {
+    VariableAssignmentStatement: ('expression',),
+    IfStatement: ('expression',),
+    FromStatement: ('start', 'end'),
+    PrintStatement: ('expression',),
+    ReturnStatement: ('expression',),
+}
+
+
+def optimize(program):
+    """
+    Applies all passes to the program, which can't be resolved or executed yet
+    """
+    fold_constants(program)
+    move_loop_invariants(program)
+    eliminate_common_subexpressions(program)
+
+
+def fold_constants(program):
+    """
+    Replaces expressions computed only from literals with their values, expressions whose evaluation fails are kept
+    """
+    transform_expressions(program, _fold_statement_expression)
+
+
+def eliminate_common_subexpressions(program):
+    """
+    Evaluates subexpressions without calls repeated in a statement or in following statements of a block once, into
+    hidden variables defined before the statement
+
+    Calls (which can assign variables of callers), assignments and nested bodies end reuse of values they can change.
+    A subexpression is moved only in front of evaluations that can't fail, or if it was already evaluated by a previous
+    statement, so the same errors are raised
+    """
+    names = _hidden_names(program)
+    blocks = [program.statements] + [body.get_children() for statement in iterate_statements(program)
+                                     for body in _bodies(statement)]
+    for block in blocks:
+        while _share_repeated(block, names):
+            pass
+
+
+def move_loop_invariants(program):
+    """
+    Evaluates subexpressions of bodies of from loops that are the same in every iteration only once, into hidden
+    variables defined before the outermost loop they don't change in
+
+    Moved subexpressions don't read variables assigned or declared in the loop and only call pure functions (defined
+    once, with the right number of arguments, using only their own variables, not printing and calling only pure
+    functions), any other call in the loop can change variables, so nothing is moved from it. Only subexpressions
+    heavier than the guard (with calls, calendar arithmetic or several operators) are moved.
+
+    The first evaluation is kept in place, guarded by a hidden flag, so subexpressions that aren't reached aren't
+    evaluated and errors are raised at the same positions. Subexpressions are only moved in front of evaluations that
+    can't fail (literals and reads of variables that are surely initialized)
+    """
+    _LoopInvariants(_pure_functions(program), _hidden_names(program)).move(program.statements, set(), [])
+
+
+def transform_expressions(program, transform):
+    """
+    Replaces every expression of statements of the program with what transform returns for the expression and its
+    statement
+    """
+    for statement in iterate_statements(program):
+        transform_statement_expressions(statement, transform)
+
+
+def transform_statement_expressions(statement, transform):
+    """
+    Replaces expressions of the statement (not of its bodies) with what transform returns for the expression and the
+    statement
+    """
+    if isinstance(statement, VariableDefinitionStatement):
+        statement = statement.assignment
+    if isinstance(statement, FunctionCall):
+        transform(statement, statement)  # call is kept, as nothing can replace it
+    for name in _expression_attributes.get(type(statement), ()):
+        expression = getattr(statement, name)
+        if expression is not None:
+            setattr(statement, name, transform(expression, statement))
+
+
+def iterate_statements(program):
+    """
+    Yields:
+        statements of the program and of its bodies, in order of the source
+    """
+    pending = list(reversed(program.statements))
+    while pending:
+        statement = pending.pop()
+        yield statement
+        pending += reversed([nested for body in _bodies(statement) for nested in body.get_children()])
+
+
+def _bodies(statement):
+    if isinstance(statement, FunctionDefinitionStatement):
+        return [statement.body]
+    if isinstance(statement, IfStatement):
+        return [statement.body, statement.else_body] if statement.else_body else [statement.body]
+    if isinstance(statement, FromStatement):
+        return [statement.body]
+    return []
+
+
+def get_operands(node):
+    """
+    Returns:
+        subexpressions of expression node in evaluation order, None for values
+    """
+    if isinstance(node, _CHAINS):
+        return [node.first_expression] + [expression for _, expression in node.operations]
+    if isinstance(node, _COMPARISONS):
+        return [node.first_expression] if node.operator is None else [node.first_expression, node.second_expression]
+    if isinstance(node, LogicTerm):
+        return [node.expression]
+    if isinstance(node, MathTerm):
+        return [node.term]
+    if isinstance(node, ParenthesisedExpression):
+        return [node.expression]
+    if isinstance(node, FunctionCall):
+        return list(node.parameters)
+    return None
+
+
+def transform_bottom_up(expression, transform_node):
+    """
+    Transforms expression without recursion, transform_node is given node and its transformed operands (it can change
+    the node) and returns what replaces it
+
+    Returns:
+        transformed expression
+    """
+    results = []
+    pending = [(expression, False)]
+    while pending:
+        node, visited = pending.pop()
+        operands = get_operands(node)
+        if operands is None:
+            results.append(transform_node(node, None))
+        elif not visited:
+            pending.append((node, True))
+            pending += [(operand, False) for operand in reversed(operands)]
+        else:
+            transformed = results[len(results) - len(operands):]
+            del results[len(results) - len(operands):]
+            results.append(transform_node(node, transformed))
+    return results[0]
+
+
+def set_operands(node, operands):
+    """
+    Replaces subexpressions of expression node, in the order of get_operands
+    """
+    if isinstance(node, _CHAINS):
+        node.first_expression = operands[0]
+        node.operations = [(operator, operand) for (operator, _), operand in zip(node.operations, operands[1:])]
+    elif isinstance(node, _COMPARISONS):
+        node.first_expression = operands[0]
+        if node.operator is not None:
+            node.second_expression = operands[1]
+    elif isinstance(node, LogicTerm):
+        node.expression = operands[0]
+    elif isinstance(node, MathTerm):
+        node.term = operands[0]
+    elif isinstance(node, ParenthesisedExpression):
+        node.expression = operands[0]
+    elif isinstance(node, FunctionCall):
+        node.parameters = operands
+
+
+def _fold_statement_expression(expression, statement):
+    folded = transform_bottom_up(expression, _fold_node)
+    if isinstance(statement, FromStatement) and expression is statement.start and folded is not expression:
+        return _hold(expression, folded)  # errors of the loop are reported at its start, if it's a token
+    return folded
+
+
+def _hold(node, value):
+    """
+    Returns:
+        node made to evaluate to value node, it has no operators left
+    """
+    if isinstance(node, _CHAINS):
+        node.first_expression, node.operations = value, []
+    elif isinstance(node, _COMPARISONS):
+        node.first_expression, node.operator = value, None
+    elif isinstance(node, LogicTerm):
+        node.negation, node.expression = None, value
+    elif isinstance(node, MathTerm):
+        node.negation, node.term, node.access = None, value, None
+    else:
+        node.expression = value
+    return node
+
+
+def _fold_node(node, operands):
+    """
+    Returns:
+        Constant replacing node if its operands are values and it evaluates without error, node otherwise
+    """
+    if operands is None:
+        return node
+    set_operands(node, operands)
+    if isinstance(node, _CHAINS):
+        return _fold_chain(node)
+    if not all(isinstance(operand, _LITERALS) for operand in operands) or isinstance(node, FunctionCall):
+        return node
+    if isinstance(node, MathTerm):
+        return _fold_math_term(node)
+
+    # errors are raised by execution, where the node is kept
+    try:
+        if isinstance(node, _COMPARISONS):
+            return Constant(node.operator.binary_evaluate(operands[0].get_value(), operands[1].get_value(), None))
+        if isinstance(node, LogicTerm):
+            return Constant(node.negation.unary_evaluate(operands[0].get_value(), None))
+        return Constant(operands[0].get_value())  # parenthesised
+    except Exception:
+        return node
+
+
+def _fold_chain(node):
+    """
+    Folds leading operations of operations evaluated from left to right
+    """
+    first = node.first_expression
+    operations = node.operations
+    while operations and isinstance(first, _LITERALS) and isinstance(operations[0][1], _LITERALS):
+        operator, operand = operations[0]
+        try:
+            first = Constant(operator.binary_evaluate(first.get_value(), operand.get_value(), None))
+        except Exception:
+            break
+        operations = operations[1:]
+
+    if not operations:
+        return first
+    node.first_expression = first
+    node.operations = operations
+    return node
+
+
+def _fold_math_term(node):
+    """
+    Folds access of time info and then negation, as far as they evaluate
+    """
+    value = node.term.get_value()
+    for part in ['access', 'negation']:
+        operator = getattr(node, part)
+        if operator is None:
+            continue
+        try:
+            value = operator.unary_evaluate(value, None)
+        except Exception:
+            return node
+        node.term = Constant(value)
+        setattr(node, part, None)
+    return node.term
+
+
+class _Occurrence:
+    """
+    Subexpression without calls applying an operator, which could be replaced by a hidden variable
+    """
+
+    __slots__ = ('node', 'key', 'size', 'variables', 'first_identifier', 'hoistable')
+
+    def __init__(self, node, key, size, variables, first_identifier, hoistable):
+        self.node = node
+        self.key = key  # equal for structurally equal expressions
+        self.size = size  # number of nodes
+        self.variables = variables  # names of read variables
+        self.first_identifier = first_identifier
+        self.hoistable = hoistable  # nothing that can fail is evaluated before it by its statement
+
+
+class _StatementEffects:
+    """
+    Occurrences of subexpressions in statement and what the statement changes
+    """
+
+    __slots__ = ('occurrences', 'assigned', 'calls', 'returns', '_key_ids')
+
+    def __init__(self, statement, key_ids):
+        """
+        Args:
+            statement: statement to collect occurrences of
+            key_ids: ids of keys of subexpressions, shared by statements of the block and extended with new keys
+        """
+        self.occurrences = []
+        self._key_ids = key_ids
+        self.assigned = set()  # names of variables assigned or declared
+        self.calls = False
+        self.returns = isinstance(statement, ReturnStatement)
+
+        excluded = set()  # read variables that are declared by the statement itself
+        if isinstance(statement, VariableDefinitionStatement):
+            excluded.add(statement.identifier.get_value())
+            statement = statement.assignment or statement
+        if isinstance(statement, (VariableDefinitionStatement, VariableAssignmentStatement)):
+            self.assigned.add(statement.identifier.get_value())
+        if isinstance(statement, FunctionCall):
+            self.calls = True  # arguments are evaluated in frame of the function, they are never shared
+
+        fallible = False
+        for name in _expression_attributes.get(type(statement), ()):
+            expression = getattr(statement, name)
+            if expression is not None and not self.calls:
+                fallible = self._collect(expression, excluded, fallible)
+                if isinstance(statement, FromStatement) and self.occurrences and \
+                        self.occurrences[-1].node is statement.start:
+                    self.occurrences.pop()  # errors of the loop are reported at its start, if it's a token
+
+        for nested in _nested_statements(statement):
+            if isinstance(nested, (VariableDefinitionStatement, VariableAssignmentStatement)):
+                self.assigned.add(nested.identifier.get_value())
+            if any(isinstance(node, FunctionCall) for node in _expression_nodes(nested)):
+                self.calls = True
+
+    def invalidates(self, occurrence):
+        return self.calls or not self.assigned.isdisjoint(occurrence.variables)
+
+    def _collect(self, expression, excluded, fallible):
+        """
+        Collects occurrences in expression evaluated before the first call, given whether something that can fail was
+        evaluated before it
+
+        Returns:
+            whether something that can fail was evaluated before the end of expression
+        """
+        results = []  # key, size, variables and first identifier of evaluated nodes
+        pending = [(expression, False, False)]
+        while pending:
+            node, visited, hoistable = pending.pop()
+            if node is None:
+                fallible = True  # operator applied between operands
+                continue
+            operands = get_operands(node)
+            if isinstance(node, FunctionCall):
+                self.calls = True
+                return True
+            if not visited:
+                if operands is not None:
+                    pending.append((node, True, not fallible))
+                    pending += [(operand, False, False) for operand in reversed(_with_operators(node, operands))]
+                    continue
+                if isinstance(node, Identifier):
+                    results.append((self._key_id(('Identifier', node.get_value())), 1, {node.get_value()}, node))
+                    fallible = True
+                else:
+                    value = node.get_value()
+                    results.append((self._key_id((type(value).__name__, str(value))), 1, set(), None))
+                continue
+
+            operand_results = results[len(results) - len(operands):]
+            del results[len(results) - len(operands):]
+            keys = [key for key, _, _, _ in operand_results]
+            size = 1 + sum(operand_size for _, operand_size, _, _ in operand_results)
+            variables = set().union(*(operand_variables for _, _, operand_variables, _ in operand_results))
+            first_identifier = next((identifier for _, _, _, identifier in operand_results if identifier), None)
+            key = _key(node, keys)
+            if key != keys[0]:  # node applies operator
+                key = self._key_id(key)
+                fallible = True
+                if first_identifier is not None and excluded.isdisjoint(variables):
+                    self.occurrences.append(_Occurrence(node, key, size, variables, first_identifier, hoistable))
+            results.append((key, size, variables, first_identifier))
+        return fallible
+
+    def _key_id(self, key):
+        """
+        Returns:
+            id of key, keys of operators are flat tuples of ids of keys of operands, so they are compared and hashed
+            without recursion however deep expressions are
+        """
+        return self._key_ids.setdefault(key, len(self._key_ids))
+
+
+def _with_operators(node, operands):
+    """
+    Returns:
+        operands in evaluation order, with None where operator is applied before the next operand
+    """
+    if not isinstance(node, _CHAINS):
+        return operands
+    steps = operands[:2]
+    for operand in operands[2:]:
+        steps += [None, operand]
+    return steps
+
+
+def _key(node, keys):
+    """
+    Returns:
+        key of expression node given keys of its operands, nodes that don't apply operators have keys of operands
+    """
+    if isinstance(node, _CHAINS):
+        if not node.operations:
+            return keys[0]
+        return (type(node).__name__, keys[0]) + tuple((type(operator).__name__, key)
+                                                      for (operator, _), key in zip(node.operations, keys[1:]))
+    if isinstance(node, _COMPARISONS):
+        if node.operator is None:
+            return keys[0]
+        return type(node.operator).__name__, keys[0], keys[1]
+    if isinstance(node, LogicTerm):
+        if node.negation is None:
+            return keys[0]
+        return type(node.negation).__name__, keys[0]
+    if isinstance(node, MathTerm):
+        if node.negation is None and node.access is None:
+            return keys[0]
+        return (type(node.negation).__name__, type(node.access.time_unit).__name__ if node.access else None,
+                keys[0])
+    return keys[0]  # parenthesised
+
+
+def _nested_statements(statement):
+    """
+    Yields:
+        statements of bodies of the statement, except bodies of functions, which aren't executed by it
+    """
+    if isinstance(statement, FunctionDefinitionStatement):
+        return
+    pending = [nested for body in _bodies(statement) for nested in body.get_children()]
+    while pending:
+        nested = pending.pop()
+        if not isinstance(nested, FunctionDefinitionStatement):
+            yield nested
+            pending += [inner for body in _bodies(nested) for inner in body.get_children()]
+
+
+def _expression_nodes(statement):
+    """
+    Yields:
+        nodes of expressions of the statement
+    """
+    if isinstance(statement, VariableDefinitionStatement):
+        statement = statement.assignment
+    pending = [statement] if isinstance(statement, FunctionCall) else \
+        [getattr(statement, name) for name in _expression_attributes.get(type(statement), ())]
+    while pending:
+        node = pending.pop()
+        if node is not None:
+            yield node
+            pending += get_operands(node) or []
+
+
+def _share_repeated(block, names):
+    """
+    Replaces occurrences of one or more repeated subexpressions of block with hidden variables
+
+    Returns:
+        whether anything was replaced
+    """
+    effects = []
+    key_ids = {}
+    for statement in block:
+        effects.append(_StatementEffects(statement, key_ids))
+        if effects[-1].returns:
+            break  # following statements are never executed
+
+    occurrences = {}  # by key, in order of evaluation, with index of their statement
+    for index, statement_effects in enumerate(effects):
+        for occurrence in statement_effects.occurrences:
+            occurrences.setdefault(occurrence.key, []).append((index, occurrence))
+
+    taken = set()  # ids of nodes of replaced occurrences
+    definitions = []  # index of statement and hidden definition
+    replacements = {}  # hidden variable by id of replaced node
+    for key in sorted(occurrences, key=lambda key: -occurrences[key][0][1].size):
+        if len(occurrences[key]) < 2 or any(id(occurrence.node) in taken for _, occurrence in occurrences[key]):
+            continue
+        for start, shared in _plan(occurrences[key], effects):
+            name = next(names)
+            definitions.append((start, _hidden_definition(name, shared[0])))
+            for occurrence in shared:
+                replacements[id(occurrence.node)] = (name, occurrence.first_identifier)
+                taken.update(id(node) for node in _subtree(occurrence.node))
+
+    if not definitions:
+        return False
+    for statement in block[:len(effects)]:
+        transform_statement_expressions(statement, lambda expression, _: transform_bottom_up(
+            expression, lambda node, operands: _replace(node, operands, replacements)))
+    for start, definition in sorted(definitions, key=lambda definition: -definition[0]):
+        block.insert(start, definition)
+    return True
+
+
+def _plan(keyed_occurrences, effects):
+    """
+    Returns:
+        index of statement the hidden variable is defined before and occurrences it replaces, for every part of block
+        where value of the subexpression doesn't change and it's evaluated at least twice
+    """
+    plans = []
+    start, shared, available = None, [], False
+    position = 0
+    for index, statement_effects in enumerate(effects):
+        statement_occurrences = []
+        while position < len(keyed_occurrences) and keyed_occurrences[position][0] == index:
+            statement_occurrences.append(keyed_occurrences[position][1])
+            position += 1
+        if start is None and statement_occurrences and (available or statement_occurrences[0].hoistable):
+            start = index
+        if start is not None:
+            shared += statement_occurrences
+        available = available or bool(statement_occurrences)
+        if statement_effects.invalidates(keyed_occurrences[0][1]):
+            if len(shared) > 1:
+                plans.append((start, shared))
+            start, shared, available = None, [], False
+    if len(shared) > 1:
+        plans.append((start, shared))
+    return plans
+
+
+def _hidden_definition(name, occurrence):
+    """
+    Returns:
+        definition of hidden variable initialized with the subexpression of occurrence
+    """
+    identifier = _hidden_identifier(name, occurrence.first_identifier)
+    return VariableDefinitionStatement.build(
+        identifier=identifier, assignment=VariableAssignmentStatement.build(identifier=identifier,
+                                                                            expression=occurrence.node))
+
+
+def _hidden_names(program):
+    """
+    Returns:
+        iterator of names of hidden variables that aren't used by the program yet
+    """
+    used = [int(statement.identifier.get_value()[1:]) for statement in iterate_statements(program)
+            if isinstance(statement, VariableDefinitionStatement) and statement.identifier.get_value()[0] == "$"]
+    return ("${}".format(number) for number in itertools.count(max(used, default=0) + 1))
+
+
+def _hidden_identifier(name, position):
+    """
+    Returns:
+        identifier of hidden variable, positioned at the position identifier, names of hidden variables can't be
+        written in scripts
+    """
+    return Identifier.from_token(tokens.Token.unchecked(tokens.TokenType.IDENTIFIER, position.token.get_file_pos(),
+                                                        name))
+
+
+def _replace(node, operands, replacements):
+    replacement = replacements.get(id(node))
+    if replacement is not None:
+        return _hidden_identifier(*replacement)
+    if operands is not None:
+        set_operands(node, operands)
+    return node
+
+
+def _subtree(node):
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        yield node
+        pending += get_operands(node) or []
+
+
+def _applies_operator(node):
+    if isinstance(node, _CHAINS):
+        return bool(node.operations)
+    if isinstance(node, _COMPARISONS):
+        return node.operator is not None
+    if isinstance(node, LogicTerm):
+        return node.negation is not None
+    if isinstance(node, MathTerm):
+        return node.negation is not None or node.access is not None
+    return False
+
+
+def _first_identifier(node):
+    """
+    Returns:
+        identifier (or name of called function) evaluated first in expression, None if there is none
+    """
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, FunctionCall):
+            return node.identifier
+        if isinstance(node, Identifier):
+            return node
+        pending += reversed(get_operands(node) or [])
+    return None
+
+
+def _pure_functions(program):
+    """
+    Returns:
+        definitions of pure functions by name
+    """
+    definitions = {}
+    for statement in program.statements:
+        if isinstance(statement, FunctionDefinitionStatement):
+            definitions.setdefault(statement.identifier.get_value(), []).append(statement)
+    pure = {name: found[0] for name, found in definitions.items()
+            if len(found) == 1 and (not isinstance(found[0].body, LazyBody) or found[0].body.is_parsed())}
+
+    changed = True
+    while changed:  # functions are assumed pure until they call an impure one
+        changed = False
+        for name, definition in list(pure.items()):
+            parameters = {parameter.get_value() for parameter in definition.parameters.parameters}
+            if not _uses_own_variables(definition.body.get_children(), parameters, pure):
+                del pure[name]
+                changed = True
+    return pure
+
+
+def _calls_pure(call, pure):
+    definition = pure.get(call.identifier.get_value())
+    return definition is not None and len(definition.parameters.parameters) == len(call.parameters)
+
+
+def _uses_own_variables(statements, declared, pure):
+    """
+    Returns:
+        whether statements of function don't print and only use variables declared before them in the function and
+        call pure functions, given names of declared variables
+    """
+    declared = set(declared)
+    for statement in statements:
+        if isinstance(statement, PrintStatement):
+            return False
+        if isinstance(statement, VariableDefinitionStatement):
+            declared.add(statement.identifier.get_value())
+        elif isinstance(statement, VariableAssignmentStatement) and statement.identifier.get_value() not in declared:
+            return False
+        for node in _expression_nodes(statement):
+            if isinstance(node, Identifier) and node.get_value() not in declared or \
+                    isinstance(node, FunctionCall) and not _calls_pure(node, pure):
+                return False
+        for body in _bodies(statement):
+            if isinstance(statement, FromStatement):
+                body_declared = declared | {statement.identifier.get_value()}
+            else:
+                body_declared = declared
+            if not _uses_own_variables(body.get_children(), body_declared, pure):
+                return False
+    return True
+
+
+class _Loop:
+    """
+    From loop subexpressions are moved from
+    """
+
+    __slots__ = ('changed', 'movable', 'definitions')
+
+    def __init__(self, statement, pure):
+        self.changed = {statement.identifier.get_value()}  # names of variables assigned or declared in the loop
+        self.movable = True  # whether the loop doesn't call functions that aren't pure
+        self.definitions = []  # of hidden variables, placed before the loop
+        for nested in _nested_statements(statement):
+            if isinstance(nested, (VariableDefinitionStatement, VariableAssignmentStatement, FromStatement)):
+                self.changed.add(nested.identifier.get_value())
+            if any(isinstance(node, FunctionCall) and not _calls_pure(node, pure) for node in _expression_nodes(nested)):
+                self.movable = False
+
+
+class _LoopInvariants:
+    def __init__(self, pure, names):
+        self._pure = pure
+        self._names = names
+
+    def move(self, statements, initialized, loops):
+        """
+        Moves invariants from statements of block and of nested blocks
+
+        Args:
+            statements: statements of the block
+            initialized: names of variables that are surely initialized at the start of the block
+            loops: loops the block is nested in, the outermost first
+        """
+        insertions = []  # index of statement and statements placed before it
+        for index, statement in enumerate(statements):
+            inserted = self._guards(statement, initialized, loops) if loops else []
+            if isinstance(statement, VariableDefinitionStatement):
+                if statement.assignment is None:
+                    initialized.discard(statement.identifier.get_value())
+                else:
+                    initialized.add(statement.identifier.get_value())
+            elif isinstance(statement, FunctionDefinitionStatement):
+                self.move(statement.body.get_children(),
+                          {parameter.get_value() for parameter in statement.parameters.parameters}, [])
+            elif isinstance(statement, IfStatement):
+                for body in _bodies(statement):
+                    self.move(body.get_children(), set(initialized), loops)
+            elif isinstance(statement, FromStatement):
+                loop = _Loop(statement, self._pure)
+                self.move(statement.body.get_children(), initialized | {statement.identifier.get_value()},
+                          loops + [loop])
+                inserted += loop.definitions
+            if inserted:
+                insertions.append((index, inserted))
+
+        for index, inserted in reversed(insertions):
+            statements[index:index] = inserted
+
+    def _guards(self, statement, initialized, loops):
+        """
+        Replaces invariants of expressions of statement with hidden variables
+
+        Returns:
+            statements evaluating the invariants if they weren't evaluated yet, placed before the statement
+        """
+        if isinstance(statement, FunctionCall):
+            return []  # arguments are evaluated in frame of the function
+        expression_holder = statement.assignment if isinstance(statement, VariableDefinitionStatement) else statement
+
+        moved = []  # invariant nodes, in order of evaluation, with loops they are moved before
+        fallible = False
+        for name in _expression_attributes.get(type(expression_holder), ()):
+            expression = getattr(expression_holder, name)
+            if expression is None:
+                continue
+            facts = self._facts(expression)
+            pending = [(expression, False)]
+            while pending:
+                node, visited = pending.pop()
+                if node is None or visited:
+                    fallible = True  # operator is applied
+                    continue
+                loop = self._target(node, facts[id(node)], loops)
+                if loop is not None and not fallible and \
+                        not (node is getattr(statement, 'start', None) and isinstance(node, FunctionCall)):
+                    moved.append((node, loop))
+                    continue
+                operands = get_operands(node)
+                if isinstance(node, FunctionCall) or isinstance(node, Identifier) and node.get_value() not in initialized:
+                    fallible = True
+                elif operands is not None:
+                    if _applies_operator(node):
+                        pending.append((node, True))
+                    pending += [(operand, False) for operand in reversed(_with_operators(node, operands))]
+
+        if not moved:
+            return []
+        guards = []
+        replacements = {}  # hidden variable by id of replaced node
+        for loop, group in itertools.groupby(moved, key=lambda pair: pair[1]):
+            group = list(group)
+            flag = next(self._names)
+            position = _first_identifier(group[0][0])
+            loop.definitions.append(VariableDefinitionStatement.build(
+                identifier=_hidden_identifier(flag, position),
+                assignment=VariableAssignmentStatement.build(identifier=_hidden_identifier(flag, position),
+                                                             expression=Constant(1))))
+            evaluations = []
+            for node, _ in group:
+                name = next(self._names)
+                node_position = _first_identifier(node)
+                loop.definitions.append(VariableDefinitionStatement.build(
+                    identifier=_hidden_identifier(name, node_position), assignment=None))
+                evaluations.append(VariableAssignmentStatement.build(identifier=_hidden_identifier(name, node_position),
+                                                                     expression=node))
+                replacements[id(node)] = (name, node_position)
+            evaluations.append(VariableAssignmentStatement.build(identifier=_hidden_identifier(flag, position),
+                                                                 expression=Constant(0)))
+            guards.append(IfStatement.build(expression=_hidden_identifier(flag, position),
+                                            body=Body.build(statements=evaluations, layout=None), else_body=None))
+
+        start = getattr(statement, 'start', None)
+        start_replacement = replacements.pop(id(start), None) if isinstance(statement, FromStatement) else None
+        transform_statement_expressions(statement, lambda expression, _: transform_bottom_up(
+            expression, lambda node, operands: _replace(node, operands, replacements)))
+        if start_replacement is not None:  # errors of the loop are reported at its start, if it's a token
+            statement.start = _hold(type(start).build(), _hidden_identifier(*start_replacement))
+        return guards
+
+    def _facts(self, expression):
+        """
+        Returns:
+            names of read variables, whether only pure functions are called and weight of evaluation, by id of nodes of
+            the expression
+        """
+        facts = {}
+        pending = [(expression, False)]
+        while pending:
+            node, visited = pending.pop()
+            operands = get_operands(node)
+            if operands is not None and not visited:
+                pending.append((node, True))
+                pending += [(operand, False) for operand in operands]
+                continue
+            operand_facts = [facts[id(operand)] for operand in operands or []]
+            variables = set().union(*(operand_variables for operand_variables, _, _ in operand_facts))
+            pure = all(operand_pure for _, operand_pure, _ in operand_facts)
+            weight = sum(operand_weight for _, _, operand_weight in operand_facts)
+            if isinstance(node, Identifier):
+                variables.add(node.get_value())
+            elif isinstance(node, FunctionCall):
+                pure = pure and _calls_pure(node, self._pure)
+                weight += _CALL_WEIGHT
+            elif operands is None:
+                weight += 0 if isinstance(node.get_value(), (int, str)) else _CALENDAR_WEIGHT
+            elif _applies_operator(node):
+                weight += len(node.operations) if isinstance(node, _CHAINS) else 1
+                weight += _CALENDAR_WEIGHT if getattr(node, 'access', None) else 0
+            facts[id(node)] = variables, pure, weight
+        return facts
+
+    @staticmethod
+    def _target(node, facts, loops):
+        """
+        Returns:
+            the outermost loop node can be moved before, None if it can't be moved or it's not worth it
+        """
+        variables, pure, weight = facts
+        if not pure or weight < _MIN_MOVED_WEIGHT or not (_applies_operator(node) or isinstance(node, FunctionCall)):
+            return None
+        if not variables and not isinstance(node, FunctionCall):
+            return None  # literals only, left by folding because evaluation fails, no identifier to report it at
+        for loop in loops:
+            if loop.movable and loop.changed.isdisjoint(variables):
+                return loop
+        return None
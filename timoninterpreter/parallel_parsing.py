@@ -0,0 +1,128 @@
+"""
+
+Parallel parsing module
+
+Big scripts are split into chunks of whole top-level statements, which are lexed and parsed in separate processes
+
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from timoninterpreter import error_handling
+from timoninterpreter.lexical_analysis import TableLexer
+from timoninterpreter.lexical_analysis import TokenBuffer
+from timoninterpreter.lexical_analysis import tokenize
+from timoninterpreter.serialization import dumps
+from timoninterpreter.serialization import loads
+from timoninterpreter.source_readers import BufferReader
+from timoninterpreter.syntax_nodes import Program
+
+MIN_CHUNK_LENGTH = 262144  # smaller chunks cost more in process communication than they gain
+
+# Literals and comments (matched whole, atomically), their unclosed bounds, brackets and semicolons
+_SPLIT_SCAN_PATTERN = re.compile(r'"(?=((?:[^"\\]|\\"?)*))\1"|#[^#]*#|\'[^\']*\'|["#\']|[(){};]')
+
+
+def find_split_points(text, chunk_length=MIN_CHUNK_LENGTH):
+    """
+    Finds positions after top-level semicolons, where text can be split into chunks of whole statements
+
+    Top-level semicolon (outside of literals, comments and brackets) always ends a top-level statement.
+    Scanning stops at unclosed literal or comment and at unbalanced closing bracket, so such text always ends in the
+    last chunk, as does everything lexer may warn about.
+
+    Args:
+        text: whole text of the script
+        chunk_length: minimal length of a chunk
+
+    Returns:
+        list of split positions, in increasing order
+    """
+    split_points = []
+    chunk_start = 0
+    depth = 0
+
+    for match in _SPLIT_SCAN_PATTERN.finditer(text):
+        character = text[match.start()]
+        if character in '({':
+            depth += 1
+        elif character in ')}':
+            depth -= 1
+            if depth < 0:
+                break
+        elif character == ';':
+            if depth == 0 and match.end() - chunk_start >= chunk_length:
+                split_points.append(match.end())
+                chunk_start = match.end()
+        elif match.end() - match.start() == 1:  # unclosed bound
+            break
+
+    return split_points
+
+
+def parse_parallel(source_reader, lexer_class=None, max_workers=None, chunk_length=MIN_CHUNK_LENGTH, parser=Program):
+    """
+    Parses the whole script using multiple processes
+
+    All chunks but the last are parsed by worker processes, the last one is parsed here after all the others
+    succeeded, so errors and warnings are reported the same way as in sequential parsing.
+
+    Args:
+        source_reader: opened reader that exposes its text, like BufferReader
+        lexer_class: lexer to use in each chunk, TableLexer by default
+        max_workers: number of worker processes, number of processors by default, with one everything is parsed here
+        chunk_length: minimal length of a chunk
+        parser: function parsing Program from lexer, like Program itself
+
+    Returns:
+        Program with statements of all chunks
+
+    Raises:
+        InterpreterError that sequential parsing would raise first
+    """
+    lexer_class = lexer_class or TableLexer
+    text = source_reader.get_text()
+    start_pos = source_reader.get_pos()
+    max_workers = max_workers or os.cpu_count() or 1
+    source = source_reader.get_file_pos().get_source()
+
+    split_points = []
+    if max_workers > 1:
+        # a few chunks per worker evens out their different parsing times
+        split_points = [point for point in find_split_points(text, max(chunk_length, len(text) // (4 * max_workers)))
+                        if point > start_pos]
+    bounds = list(zip([start_pos] + split_points, split_points))
+
+    statements = []
+    if bounds:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(bounds))) as executor:
+            futures = [executor.submit(_parse_chunk, source.get_file_path(), text[start:end], start, lexer_class,
+                                       parser)
+                       for start, end in bounds]
+            for future in futures:
+                succeeded, value = loads(future.result(), source)
+                if not succeeded:
+                    for pending in futures:
+                        pending.cancel()  # chunks that didn't start yet
+                    raise value
+                statements.extend(value)
+
+    source_reader.seek(split_points[-1] if split_points else start_pos)
+    program = parser(tokenize(source_reader, lexer_class).view())
+    program.statements[:0] = statements
+    return program
+
+
+def _parse_chunk(file_path, chunk, chunk_start, lexer_class, parser):
+    with BufferReader(file_path, chunk) as reader:
+        chunk_tokens = tokenize(reader, lexer_class)
+
+    # positions are made absolute, their source is replaced when results are loaded
+    token_buffer = TokenBuffer(chunk_tokens.get_source())
+    token_buffer.extend_shifted(chunk_tokens, 0, chunk_start)
+
+    try:
+        return dumps((True, parser(token_buffer.view()).statements))
+    except error_handling.InterpreterError as e:
+        return dumps((False, e))
@@ -0,0 +1,285 @@
+"""
+
+LL(1) parse tables of Timon grammar
+
+Generated from docs/grammar.ebnf by timoninterpreter.parser_generator, do not edit
+
+"""
+
+START = 'program'
+
+# Rules of the grammar, other nonterminals are helpers of their repetitions, options and groups
+RULES = (
+    'program',
+    'functionDefStatement',
+    'identifierFirstStatement',
+    'variableDefinitionStatement',
+    'ifStatement',
+    'fromStatement',
+    'printStatement',
+    'returnStatement',
+    'parametersDeclaration',
+    'body',
+    'parametersCall',
+    'assignment',
+    'expr',
+    'fromRange',
+    'fromStep',
+    'fromIterator',
+    'assignmentOperator',
+    'logicAndExpr',
+    'orOperator',
+    'logicEqualExpr',
+    'andOperator',
+    'logicRelExpr',
+    'equalityOperator',
+    'logicTerm',
+    'relationalOperator',
+    'equalOperator',
+    'notEqualOperator',
+    'logicNegOperator',
+    'mathExpr',
+    'greaterOperator',
+    'greaterOrEqualOperator',
+    'lessOperator',
+    'lessOrEqualOperator',
+    'multMathExpr',
+    'additiveOperator',
+    'mathTerm',
+    'multiplicativeOperator',
+    'plusOperator',
+    'minusOperator',
+    'mathNegOperator',
+    'value',
+    'parenthesisedExpr',
+    'timeInfoAccess',
+    'multiplyOperator',
+    'divisionOperator',
+    'identifierFirstValue',
+)
+
+# Nonterminal and symbols of each production, terminals are token type names
+PRODUCTIONS = (
+    ('program.1', ('functionDefStatement', 'program.1')),
+    ('program.1', ('identifierFirstStatement', 'program.1')),
+    ('program.1', ('variableDefinitionStatement', 'program.1')),
+    ('program.1', ('ifStatement', 'program.1')),
+    ('program.1', ('fromStatement', 'program.1')),
+    ('program.1', ('printStatement', 'program.1')),
+    ('program.1', ('returnStatement', 'program.1')),
+    ('program.1', ()),
+    ('program', ('program.1',)),
+    ('functionDefStatement', ('FUN', 'IDENTIFIER', 'parametersDeclaration', 'body', 'SEMICOLON')),
+    ('identifierFirstStatement.1', ('parametersCall',)),
+    ('identifierFirstStatement.1', ('assignment',)),
+    ('identifierFirstStatement', ('IDENTIFIER', 'identifierFirstStatement.1', 'SEMICOLON')),
+    ('variableDefinitionStatement.1', ('assignment',)),
+    ('variableDefinitionStatement.1', ()),
+    ('variableDefinitionStatement', ('VAR', 'IDENTIFIER', 'variableDefinitionStatement.1', 'SEMICOLON')),
+    ('ifStatement.1', ('ELSE', 'body')),
+    ('ifStatement.1', ()),
+    ('ifStatement', ('IF', 'expr', 'body', 'ifStatement.1', 'SEMICOLON')),
+    ('fromStatement', ('FROM', 'fromRange', 'fromStep', 'fromIterator', 'body', 'SEMICOLON')),
+    ('printStatement', ('PRINT', 'expr', 'SEMICOLON')),
+    ('returnStatement.1', ('expr',)),
+    ('returnStatement.1', ()),
+    ('returnStatement', ('RETURN', 'returnStatement.1', 'SEMICOLON')),
+    ('parametersDeclaration.2', ('COMMA', 'IDENTIFIER', 'parametersDeclaration.2')),
+    ('parametersDeclaration.2', ()),
+    ('parametersDeclaration.1', ('IDENTIFIER', 'parametersDeclaration.2')),
+    ('parametersDeclaration.1', ()),
+    ('parametersDeclaration', ('LEFT_PARENTHESIS', 'parametersDeclaration.1', 'RIGHT_PARENTHESIS')),
+    ('body.1', ('identifierFirstStatement', 'body.1')),
+    ('body.1', ('variableDefinitionStatement', 'body.1')),
+    ('body.1', ('ifStatement', 'body.1')),
+    ('body.1', ('fromStatement', 'body.1')),
+    ('body.1', ('printStatement', 'body.1')),
+    ('body.1', ('returnStatement', 'body.1')),
+    ('body.1', ()),
+    ('body', ('LEFT_BRACKET', 'body.1', 'RIGHT_BRACKET')),
+    ('parametersCall.2', ('COMMA', 'expr', 'parametersCall.2')),
+    ('parametersCall.2', ()),
+    ('parametersCall.1', ('expr', 'parametersCall.2')),
+    ('parametersCall.1', ()),
+    ('parametersCall', ('LEFT_PARENTHESIS', 'parametersCall.1', 'RIGHT_PARENTHESIS')),
+    ('assignment', ('assignmentOperator', 'expr')),
+    ('expr.1', ('orOperator', 'logicAndExpr', 'expr.1')),
+    ('expr.1', ()),
+    ('expr', ('logicAndExpr', 'expr.1')),
+    ('fromRange', ('expr', 'TO', 'expr')),
+    ('fromStep.1', ('YEARS',)),
+    ('fromStep.1', ('MONTHS',)),
+    ('fromStep.1', ('WEEKS',)),
+    ('fromStep.1', ('DAYS',)),
+    ('fromStep.1', ('HOURS',)),
+    ('fromStep.1', ('MINUTES',)),
+    ('fromStep.1', ('SECONDS',)),
+    ('fromStep', ('BY', 'fromStep.1')),
+    ('fromIterator', ('AS', 'IDENTIFIER')),
+    ('assignmentOperator', ('ASSIGN',)),
+    ('logicAndExpr.1', ('andOperator', 'logicEqualExpr', 'logicAndExpr.1')),
+    ('logicAndExpr.1', ()),
+    ('logicAndExpr', ('logicEqualExpr', 'logicAndExpr.1')),
+    ('orOperator', ('LOGICAL_OR',)),
+    ('logicEqualExpr.1', ('equalityOperator', 'logicRelExpr')),
+    ('logicEqualExpr.1', ()),
+    ('logicEqualExpr', ('logicRelExpr', 'logicEqualExpr.1')),
+    ('andOperator', ('LOGICAL_AND',)),
+    ('logicRelExpr.1', ('relationalOperator', 'logicTerm')),
+    ('logicRelExpr.1', ()),
+    ('logicRelExpr', ('logicTerm', 'logicRelExpr.1')),
+    ('equalityOperator', ('equalOperator',)),
+    ('equalityOperator', ('notEqualOperator',)),
+    ('logicTerm.1', ('logicNegOperator',)),
+    ('logicTerm.1', ()),
+    ('logicTerm', ('logicTerm.1', 'mathExpr')),
+    ('relationalOperator', ('greaterOperator',)),
+    ('relationalOperator', ('greaterOrEqualOperator',)),
+    ('relationalOperator', ('lessOperator',)),
+    ('relationalOperator', ('lessOrEqualOperator',)),
+    ('equalOperator', ('EQUALS',)),
+    ('notEqualOperator', ('NOT_EQUALS',)),
+    ('logicNegOperator', ('NOT',)),
+    ('mathExpr.1', ('additiveOperator', 'multMathExpr', 'mathExpr.1')),
+    ('mathExpr.1', ()),
+    ('mathExpr', ('multMathExpr', 'mathExpr.1')),
+    ('greaterOperator', ('GREATER',)),
+    ('greaterOrEqualOperator', ('GREATER_OR_EQUAL',)),
+    ('lessOperator', ('LESS',)),
+    ('lessOrEqualOperator', ('LESS_OR_EQUAL',)),
+    ('multMathExpr.1', ('multiplicativeOperator', 'mathTerm', 'multMathExpr.1')),
+    ('multMathExpr.1', ()),
+    ('multMathExpr', ('mathTerm', 'multMathExpr.1')),
+    ('additiveOperator', ('plusOperator',)),
+    ('additiveOperator', ('minusOperator',)),
+    ('mathTerm.1', ('mathNegOperator',)),
+    ('mathTerm.1', ()),
+    ('mathTerm.2', ('value',)),
+    ('mathTerm.2', ('parenthesisedExpr',)),
+    ('mathTerm.3', ('timeInfoAccess',)),
+    ('mathTerm.3', ()),
+    ('mathTerm', ('mathTerm.1', 'mathTerm.2', 'mathTerm.3')),
+    ('multiplicativeOperator', ('multiplyOperator',)),
+    ('multiplicativeOperator', ('divisionOperator',)),
+    ('plusOperator', ('PLUS',)),
+    ('minusOperator', ('MINUS',)),
+    ('mathNegOperator', ('MINUS',)),
+    ('value', ('NUMBER_LITERAL',)),
+    ('value', ('STRING_LITERAL',)),
+    ('value', ('DATE_LITERAL',)),
+    ('value', ('TIME_LITERAL',)),
+    ('value', ('DATETIME_LITERAL',)),
+    ('value', ('TIMEDELTA_LITERAL',)),
+    ('value', ('identifierFirstValue',)),
+    ('parenthesisedExpr', ('LEFT_PARENTHESIS', 'expr', 'RIGHT_PARENTHESIS')),
+    ('timeInfoAccess.1', ('YEARS',)),
+    ('timeInfoAccess.1', ('MONTHS',)),
+    ('timeInfoAccess.1', ('WEEKS',)),
+    ('timeInfoAccess.1', ('DAYS',)),
+    ('timeInfoAccess.1', ('HOURS',)),
+    ('timeInfoAccess.1', ('MINUTES',)),
+    ('timeInfoAccess.1', ('SECONDS',)),
+    ('timeInfoAccess', ('ACCESS', 'timeInfoAccess.1')),
+    ('multiplyOperator', ('MULTIPLICATION',)),
+    ('divisionOperator', ('DIVISION',)),
+    ('identifierFirstValue.1', ('parametersCall',)),
+    ('identifierFirstValue.1', ()),
+    ('identifierFirstValue', ('IDENTIFIER', 'identifierFirstValue.1')),
+)
+
+# Production to choose by nonterminal and type of the next token
+TABLE = {
+    'program': {'IDENTIFIER': 8, 'FUN': 8, 'VAR': 8, 'IF': 8, 'FROM': 8, 'PRINT': 8, 'RETURN': 8},
+    'program.1': {'IDENTIFIER': 1, 'FUN': 0, 'VAR': 2, 'IF': 3, 'FROM': 4, 'PRINT': 5, 'RETURN': 6},
+    'functionDefStatement': {'FUN': 9},
+    'identifierFirstStatement': {'IDENTIFIER': 12},
+    'variableDefinitionStatement': {'VAR': 15},
+    'ifStatement': {'IF': 18},
+    'fromStatement': {'FROM': 19},
+    'printStatement': {'PRINT': 20},
+    'returnStatement': {'RETURN': 23},
+    'parametersDeclaration': {'LEFT_PARENTHESIS': 28},
+    'body': {'LEFT_BRACKET': 36},
+    'identifierFirstStatement.1': {'LEFT_PARENTHESIS': 10, 'ASSIGN': 11},
+    'parametersCall': {'LEFT_PARENTHESIS': 41},
+    'assignment': {'ASSIGN': 42},
+    'variableDefinitionStatement.1': {'ASSIGN': 13},
+    'expr': {'IDENTIFIER': 45, 'LEFT_PARENTHESIS': 45, 'NOT': 45, 'MINUS': 45, 'STRING_LITERAL': 45, 'NUMBER_LITERAL': 45, 'DATE_LITERAL': 45, 'DATETIME_LITERAL': 45, 'TIME_LITERAL': 45, 'TIMEDELTA_LITERAL': 45},
+    'ifStatement.1': {'ELSE': 16},
+    'fromRange': {'IDENTIFIER': 46, 'LEFT_PARENTHESIS': 46, 'NOT': 46, 'MINUS': 46, 'STRING_LITERAL': 46, 'NUMBER_LITERAL': 46, 'DATE_LITERAL': 46, 'DATETIME_LITERAL': 46, 'TIME_LITERAL': 46, 'TIMEDELTA_LITERAL': 46},
+    'fromStep': {'BY': 54},
+    'fromIterator': {'AS': 55},
+    'returnStatement.1': {'IDENTIFIER': 21, 'LEFT_PARENTHESIS': 21, 'NOT': 21, 'MINUS': 21, 'STRING_LITERAL': 21, 'NUMBER_LITERAL': 21, 'DATE_LITERAL': 21, 'DATETIME_LITERAL': 21, 'TIME_LITERAL': 21, 'TIMEDELTA_LITERAL': 21},
+    'parametersDeclaration.1': {'IDENTIFIER': 26},
+    'parametersDeclaration.2': {'COMMA': 24},
+    'body.1': {'IDENTIFIER': 29, 'VAR': 30, 'IF': 31, 'FROM': 32, 'PRINT': 33, 'RETURN': 34},
+    'parametersCall.1': {'IDENTIFIER': 39, 'LEFT_PARENTHESIS': 39, 'NOT': 39, 'MINUS': 39, 'STRING_LITERAL': 39, 'NUMBER_LITERAL': 39, 'DATE_LITERAL': 39, 'DATETIME_LITERAL': 39, 'TIME_LITERAL': 39, 'TIMEDELTA_LITERAL': 39},
+    'parametersCall.2': {'COMMA': 37},
+    'assignmentOperator': {'ASSIGN': 56},
+    'logicAndExpr': {'IDENTIFIER': 59, 'LEFT_PARENTHESIS': 59, 'NOT': 59, 'MINUS': 59, 'STRING_LITERAL': 59, 'NUMBER_LITERAL': 59, 'DATE_LITERAL': 59, 'DATETIME_LITERAL': 59, 'TIME_LITERAL': 59, 'TIMEDELTA_LITERAL': 59},
+    'expr.1': {'LOGICAL_OR': 43},
+    'orOperator': {'LOGICAL_OR': 60},
+    'fromStep.1': {'YEARS': 47, 'MONTHS': 48, 'WEEKS': 49, 'DAYS': 50, 'HOURS': 51, 'MINUTES': 52, 'SECONDS': 53},
+    'logicEqualExpr': {'IDENTIFIER': 63, 'LEFT_PARENTHESIS': 63, 'NOT': 63, 'MINUS': 63, 'STRING_LITERAL': 63, 'NUMBER_LITERAL': 63, 'DATE_LITERAL': 63, 'DATETIME_LITERAL': 63, 'TIME_LITERAL': 63, 'TIMEDELTA_LITERAL': 63},
+    'logicAndExpr.1': {'LOGICAL_AND': 57},
+    'andOperator': {'LOGICAL_AND': 64},
+    'logicRelExpr': {'IDENTIFIER': 67, 'LEFT_PARENTHESIS': 67, 'NOT': 67, 'MINUS': 67, 'STRING_LITERAL': 67, 'NUMBER_LITERAL': 67, 'DATE_LITERAL': 67, 'DATETIME_LITERAL': 67, 'TIME_LITERAL': 67, 'TIMEDELTA_LITERAL': 67},
+    'logicEqualExpr.1': {'EQUALS': 61, 'NOT_EQUALS': 61},
+    'equalityOperator': {'EQUALS': 68, 'NOT_EQUALS': 69},
+    'logicTerm': {'IDENTIFIER': 72, 'LEFT_PARENTHESIS': 72, 'NOT': 72, 'MINUS': 72, 'STRING_LITERAL': 72, 'NUMBER_LITERAL': 72, 'DATE_LITERAL': 72, 'DATETIME_LITERAL': 72, 'TIME_LITERAL': 72, 'TIMEDELTA_LITERAL': 72},
+    'logicRelExpr.1': {'GREATER': 65, 'GREATER_OR_EQUAL': 65, 'LESS': 65, 'LESS_OR_EQUAL': 65},
+    'relationalOperator': {'GREATER': 73, 'GREATER_OR_EQUAL': 74, 'LESS': 75, 'LESS_OR_EQUAL': 76},
+    'equalOperator': {'EQUALS': 77},
+    'notEqualOperator': {'NOT_EQUALS': 78},
+    'logicTerm.1': {'NOT': 70},
+    'logicNegOperator': {'NOT': 79},
+    'mathExpr': {'IDENTIFIER': 82, 'LEFT_PARENTHESIS': 82, 'MINUS': 82, 'STRING_LITERAL': 82, 'NUMBER_LITERAL': 82, 'DATE_LITERAL': 82, 'DATETIME_LITERAL': 82, 'TIME_LITERAL': 82, 'TIMEDELTA_LITERAL': 82},
+    'greaterOperator': {'GREATER': 83},
+    'greaterOrEqualOperator': {'GREATER_OR_EQUAL': 84},
+    'lessOperator': {'LESS': 85},
+    'lessOrEqualOperator': {'LESS_OR_EQUAL': 86},
+    'multMathExpr': {'IDENTIFIER': 89, 'LEFT_PARENTHESIS': 89, 'MINUS': 89, 'STRING_LITERAL': 89, 'NUMBER_LITERAL': 89, 'DATE_LITERAL': 89, 'DATETIME_LITERAL': 89, 'TIME_LITERAL': 89, 'TIMEDELTA_LITERAL': 89},
+    'mathExpr.1': {'PLUS': 80, 'MINUS': 80},
+    'additiveOperator': {'PLUS': 90, 'MINUS': 91},
+    'mathTerm': {'IDENTIFIER': 98, 'LEFT_PARENTHESIS': 98, 'MINUS': 98, 'STRING_LITERAL': 98, 'NUMBER_LITERAL': 98, 'DATE_LITERAL': 98, 'DATETIME_LITERAL': 98, 'TIME_LITERAL': 98, 'TIMEDELTA_LITERAL': 98},
+    'multMathExpr.1': {'MULTIPLICATION': 87, 'DIVISION': 87},
+    'multiplicativeOperator': {'MULTIPLICATION': 99, 'DIVISION': 100},
+    'plusOperator': {'PLUS': 101},
+    'minusOperator': {'MINUS': 102},
+    'mathTerm.1': {'MINUS': 92},
+    'mathNegOperator': {'MINUS': 103},
+    'mathTerm.2': {'IDENTIFIER': 94, 'LEFT_PARENTHESIS': 95, 'STRING_LITERAL': 94, 'NUMBER_LITERAL': 94, 'DATE_LITERAL': 94, 'DATETIME_LITERAL': 94, 'TIME_LITERAL': 94, 'TIMEDELTA_LITERAL': 94},
+    'value': {'IDENTIFIER': 110, 'STRING_LITERAL': 105, 'NUMBER_LITERAL': 104, 'DATE_LITERAL': 106, 'DATETIME_LITERAL': 108, 'TIME_LITERAL': 107, 'TIMEDELTA_LITERAL': 109},
+    'parenthesisedExpr': {'LEFT_PARENTHESIS': 111},
+    'mathTerm.3': {'ACCESS': 96},
+    'timeInfoAccess': {'ACCESS': 119},
+    'multiplyOperator': {'MULTIPLICATION': 120},
+    'divisionOperator': {'DIVISION': 121},
+    'identifierFirstValue': {'IDENTIFIER': 124},
+    'timeInfoAccess.1': {'YEARS': 112, 'MONTHS': 113, 'WEEKS': 114, 'DAYS': 115, 'HOURS': 116, 'MINUTES': 117, 'SECONDS': 118},
+    'identifierFirstValue.1': {'LEFT_PARENTHESIS': 122},
+}
+
+# Production deriving empty string, chosen when the next token has no entry in table
+DEFAULTS = {
+    'program': 8,
+    'program.1': 7,
+    'variableDefinitionStatement.1': 14,
+    'ifStatement.1': 17,
+    'returnStatement.1': 22,
+    'parametersDeclaration.1': 27,
+    'parametersDeclaration.2': 25,
+    'body.1': 35,
+    'parametersCall.1': 40,
+    'parametersCall.2': 38,
+    'expr.1': 44,
+    'logicAndExpr.1': 58,
+    'logicEqualExpr.1': 62,
+    'logicRelExpr.1': 66,
+    'logicTerm.1': 71,
+    'mathExpr.1': 81,
+    'multMathExpr.1': 88,
+    'mathTerm.1': 93,
+    'mathTerm.3': 97,
+    'identifierFirstValue.1': 123,
+}
@@ -0,0 +1,397 @@
+"""
+
+Parser generator module
+
+Reads EBNF grammar of the language and generates LL(1) parse tables used by table_parsing module.
+Tables have to be regenerated after changing the grammar, from top directory:
+
+    python3 -m timoninterpreter.parser_generator [-grammar PATH] [-output PATH]
+
+"""
+
+import argparse
+import re
+
+from timoninterpreter import tokens
+
+DEFAULT_GRAMMAR_PATH = "docs/grammar.ebnf"
+DEFAULT_OUTPUT_PATH = "timoninterpreter/parse_tables.py"
+START_RULE = "program"
+
+# Rules recognized by lexer as whole tokens, their definitions are not parsed
+token_rules = {
+    "identifier": tokens.TokenType.IDENTIFIER,
+    "numberLiteral": tokens.TokenType.NUMBER_LITERAL,
+    "stringLiteral": tokens.TokenType.STRING_LITERAL,
+    "dateLiteral": tokens.TokenType.DATE_LITERAL,
+    "timeLiteral": tokens.TokenType.TIME_LITERAL,
+    "datetimeLiteral": tokens.TokenType.DATETIME_LITERAL,
+    "timedeltaLiteral": tokens.TokenType.TIMEDELTA_LITERAL,
+}
+
+# Quoted terminals
+terminal_token_types = {}
+terminal_token_types.update(tokens.keyword_token_type_map)
+terminal_token_types.update(tokens.unambiguous_singular_token_type_map)
+for _character, _cases in tokens.ambiguous_binary_token_type_map.items():
+    terminal_token_types[_character] = _cases["first_case_token_type"]
+    terminal_token_types[_character + _cases["second_character"]] = _cases["second_case_token_type"]
+
+_EBNF_TOKEN_PATTERN = re.compile(r'\s*(?:("[^"]*"|\'[^\']*\')|(\?[^?]*\?)|([A-Za-z_]\w*)|(\d+)|([=,|\[\]{}()\-*;]))')
+
+
+class GrammarError(ValueError):
+    pass
+
+
+def read_grammar(text):
+    """
+    Reads rules from EBNF text
+
+    Expressions are nested tuples: ("terminal", text), ("rule", name), ("sequence", items), ("choice", alternatives),
+    ("option", expression), ("repetition", expression), ("special", text), ("exception", expression, exception) and
+    ("times", count, expression).
+
+    Args:
+        text: EBNF text
+
+    Returns:
+        dict of rule expressions by rule name, in order of definition
+    """
+    return _EbnfReader(text).read_rules()
+
+
+class _EbnfReader:
+    def __init__(self, text):
+        self._symbols = []
+        pos = 0
+        while text[pos:].strip():
+            match = _EBNF_TOKEN_PATTERN.match(text, pos)
+            if match is None:
+                raise GrammarError("Unexpected character at {}: {}".format(pos, text[pos:].strip()[:20]))
+            self._symbols.append(match.group(match.lastindex))
+            pos = match.end()
+        self._index = 0
+
+    def _peek(self):
+        return self._symbols[self._index] if self._index < len(self._symbols) else None
+
+    def _get(self, expected=None):
+        symbol = self._peek()
+        if symbol is None or (expected is not None and symbol != expected):
+            raise GrammarError("Expected {} but got {}".format(expected or "symbol", symbol))
+        self._index += 1
+        return symbol
+
+    def read_rules(self):
+        rules = {}
+        while self._peek() is not None:
+            name = self._get()
+            if not _is_name(name):
+                raise GrammarError("Expected rule name but got {}".format(name))
+            if name in rules:
+                raise GrammarError("Rule {} defined twice".format(name))
+            self._get("=")
+            rules[name] = self._read_choice()
+            self._get(";")
+        return rules
+
+    def _read_choice(self):
+        alternatives = [self._read_sequence()]
+        while self._peek() == "|":
+            self._get()
+            alternatives.append(self._read_sequence())
+        return alternatives[0] if len(alternatives) == 1 else ("choice", alternatives)
+
+    def _read_sequence(self):
+        items = [self._read_term()]
+        while self._peek() == ",":
+            self._get()
+            items.append(self._read_term())
+        return items[0] if len(items) == 1 else ("sequence", items)
+
+    def _read_term(self):
+        if self._peek().isdigit():
+            count = int(self._get())
+            self._get("*")
+            return "times", count, self._read_primary()
+
+        primary = self._read_primary()
+        if self._peek() == "-":
+            self._get()
+            return "exception", primary, self._read_primary()
+        return primary
+
+    def _read_primary(self):
+        symbol = self._get()
+        if symbol in ("(", "[", "{"):
+            expression = self._read_choice()
+            if symbol == "(":
+                self._get(")")
+                return expression
+            if symbol == "[":
+                self._get("]")
+                return "option", expression
+            self._get("}")
+            return "repetition", expression
+        if symbol[0] in "\"'":
+            return "terminal", symbol[1:-1]
+        if symbol[0] == "?":
+            return "special", symbol[1:-1].strip()
+        if _is_name(symbol):
+            return "rule", symbol
+        raise GrammarError("Unexpected symbol {}".format(symbol))
+
+
+def _is_name(symbol):
+    return symbol[0].isalpha() or symbol[0] == "_"
+
+
+class Grammar:
+    """
+    LL(1) grammar of rules reachable from the start rule
+
+    Options, repetitions and groups of alternatives are replaced with helper nonterminals named after their rule,
+    like program.1. Terminals are token type names.
+    """
+
+    def __init__(self, rules, start=START_RULE):
+        """
+        Args:
+            rules: rule expressions by name, as returned by read_grammar
+            start: name of the start rule
+
+        Raises:
+            GrammarError if grammar uses undefined rules, unsupported expressions or isn't LL(1)
+        """
+        if start not in rules:
+            raise GrammarError("Start rule {} is not defined".format(start))
+
+        self.start = start
+        self.rules = []
+        self.productions = []
+        self._nonterminals = []
+        self._rule_expressions = rules
+        self._helper_counts = {}
+
+        self._visit_rule(start)
+        pending = 0
+        while pending < len(self.rules):  # rules referenced by converted ones are appended to the list
+            rule = self.rules[pending]
+            for alternative in self._alternatives(rules[rule], rule):
+                self.productions.append((rule, alternative))
+            pending += 1
+
+        self._compute_nullable()
+        self._compute_first()
+        self._compute_follow()
+        self._build_table()
+
+    def _visit_rule(self, name):
+        if name not in self._nonterminals:
+            self._nonterminals.append(name)
+            self.rules.append(name)
+
+    def _new_helper(self, rule):
+        self._helper_counts[rule] = self._helper_counts.get(rule, 0) + 1
+        helper = "{}.{}".format(rule, self._helper_counts[rule])
+        self._nonterminals.append(helper)
+        return helper
+
+    def _alternatives(self, expression, rule):
+        if expression[0] == "choice":
+            return [tuple(self._symbols(alternative, rule)) for alternative in expression[1]]
+        return [tuple(self._symbols(expression, rule))]
+
+    def _symbols(self, expression, rule):
+        kind = expression[0]
+        if kind == "sequence":
+            return [symbol for item in expression[1] for symbol in self._symbols(item, rule)]
+        if kind == "terminal":
+            if expression[1] not in terminal_token_types:
+                raise GrammarError("Unknown terminal \"{}\" in rule {}".format(expression[1], rule))
+            return [terminal_token_types[expression[1]].name]
+        if kind == "rule":
+            name = expression[1]
+            if name in token_rules:
+                return [token_rules[name].name]
+            if name not in self._rule_expressions:
+                raise GrammarError("Undefined rule {} used in rule {}".format(name, rule))
+            self._visit_rule(name)
+            return [name]
+        if kind == "choice":
+            helper = self._new_helper(rule)
+            for alternative in self._alternatives(expression, rule):
+                self.productions.append((helper, alternative))
+            return [helper]
+        if kind == "option":
+            helper = self._new_helper(rule)
+            for alternative in self._alternatives(expression[1], rule):
+                self.productions.append((helper, alternative))
+            self.productions.append((helper, ()))
+            return [helper]
+        if kind == "repetition":
+            helper = self._new_helper(rule)
+            for alternative in self._alternatives(expression[1], rule):
+                self.productions.append((helper, alternative + (helper,)))
+            self.productions.append((helper, ()))
+            return [helper]
+        raise GrammarError("Unsupported {} expression in syntactic rule {}".format(kind, rule))
+
+    def nonterminals(self):
+        """
+        Returns:
+            rules and helper nonterminals, in order of creation
+        """
+        return list(self._nonterminals)
+
+    def _is_terminal(self, symbol):
+        return symbol not in self._nonterminals
+
+    def _compute_nullable(self):
+        nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for nonterminal, symbols in self.productions:
+                if nonterminal not in nullable and all(symbol in nullable for symbol in symbols):
+                    nullable.add(nonterminal)
+                    changed = True
+        self.nullable = {nonterminal: nonterminal in nullable for nonterminal in self._nonterminals}
+
+    def _sequence_first(self, symbols):
+        first = set()
+        for symbol in symbols:
+            if self._is_terminal(symbol):
+                first.add(symbol)
+                return first, False
+            first |= self.first[symbol]
+            if not self.nullable[symbol]:
+                return first, False
+        return first, True
+
+    def _compute_first(self):
+        self.first = {nonterminal: set() for nonterminal in self._nonterminals}
+        changed = True
+        while changed:
+            changed = False
+            for nonterminal, symbols in self.productions:
+                first, _ = self._sequence_first(symbols)
+                if not first <= self.first[nonterminal]:
+                    self.first[nonterminal] |= first
+                    changed = True
+
+    def _compute_follow(self):
+        self.follow = {nonterminal: set() for nonterminal in self._nonterminals}
+        self.follow[self.start].add(tokens.TokenType.END.name)
+        changed = True
+        while changed:
+            changed = False
+            for nonterminal, symbols in self.productions:
+                for i, symbol in enumerate(symbols):
+                    if self._is_terminal(symbol):
+                        continue
+                    follow, nullable = self._sequence_first(symbols[i + 1:])
+                    if nullable:
+                        follow |= self.follow[nonterminal]
+                    if not follow <= self.follow[symbol]:
+                        self.follow[symbol] |= follow
+                        changed = True
+
+    def _build_table(self):
+        self.table = {nonterminal: {} for nonterminal in self._nonterminals}
+        self.defaults = {}
+        for index, (nonterminal, symbols) in enumerate(self.productions):
+            first, nullable = self._sequence_first(symbols)
+            for terminal in first:
+                self._add_entry(nonterminal, terminal, index)
+            if nullable:
+                if nonterminal in self.defaults:
+                    self._conflict(nonterminal, "empty string", self.defaults[nonterminal], index)
+                self.defaults[nonterminal] = index
+
+        # empty production is chosen for any token other than the ones in table, but only when it follows
+        for nonterminal, default in self.defaults.items():
+            for terminal in self.follow[nonterminal]:
+                if terminal in self.table[nonterminal] and self.table[nonterminal][terminal] != default:
+                    self._conflict(nonterminal, terminal, self.table[nonterminal][terminal], default)
+
+    def _add_entry(self, nonterminal, terminal, index):
+        entries = self.table[nonterminal]
+        if terminal in entries and entries[terminal] != index:
+            self._conflict(nonterminal, terminal, entries[terminal], index)
+        entries[terminal] = index
+
+    def _conflict(self, nonterminal, lookahead, first_index, second_index):
+        raise GrammarError("Grammar is not LL(1): {} can start with {} in both {} and {}".format(
+            nonterminal, lookahead, self._describe(first_index), self._describe(second_index)))
+
+    def _describe(self, index):
+        nonterminal, symbols = self.productions[index]
+        return "{} = {}".format(nonterminal, ", ".join(symbols) or "empty")
+
+
+def generate_tables_module(grammar, grammar_path=DEFAULT_GRAMMAR_PATH):
+    """
+    Generates source of the module with parse tables
+
+    Args:
+        grammar: Grammar to generate tables of
+        grammar_path: path of the grammar file, mentioned in the module
+
+    Returns:
+        Python source
+    """
+    order = {token_type.name: token_type.value for token_type in tokens.TokenType}
+
+    lines = ['"""',
+             '',
+             'LL(1) parse tables of Timon grammar',
+             '',
+             'Generated from {} by timoninterpreter.parser_generator, do not edit'.format(grammar_path),
+             '',
+             '"""',
+             '',
+             'START = {!r}'.format(grammar.start),
+             '',
+             '# Rules of the grammar, other nonterminals are helpers of their repetitions, options and groups',
+             'RULES = (']
+    lines += ['    {!r},'.format(rule) for rule in grammar.rules]
+    lines += [')',
+              '',
+              '# Nonterminal and symbols of each production, terminals are token type names',
+              'PRODUCTIONS = (']
+    lines += ['    ({!r}, {!r}),'.format(nonterminal, symbols) for nonterminal, symbols in grammar.productions]
+    lines += [')',
+              '',
+              '# Production to choose by nonterminal and type of the next token',
+              'TABLE = {']
+    for nonterminal in grammar.nonterminals():
+        entries = sorted(grammar.table[nonterminal].items(), key=lambda entry: order[entry[0]])
+        lines.append('    {!r}: {{{}}},'.format(nonterminal,
+                                               ', '.join('{!r}: {}'.format(*entry) for entry in entries)))
+    lines += ['}',
+              '',
+              '# Production deriving empty string, chosen when the next token has no entry in table',
+              'DEFAULTS = {']
+    lines += ['    {!r}: {},'.format(nonterminal, grammar.defaults[nonterminal])
+              for nonterminal in grammar.nonterminals() if nonterminal in grammar.defaults]
+    lines += ['}', '']
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generator of LL(1) parse tables from EBNF grammar")
+    parser.add_argument('-grammar', default=DEFAULT_GRAMMAR_PATH)
+    parser.add_argument('-output', default=DEFAULT_OUTPUT_PATH)
+    args = parser.parse_args()
+
+    with open(args.grammar, encoding="utf-8") as f:
+        grammar = Grammar(read_grammar(f.read()))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(generate_tables_module(grammar, args.grammar))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+
+Program cache module
+
+Parsed programs are kept on disk between runs, keyed by hash of the source text and of the interpreter itself
+
+"""
+import hashlib
+import os
+import tempfile
+
+from timoninterpreter import serialization
+from timoninterpreter.syntax_nodes import Program
+
+FORMAT_VERSION = 1
+ENTRY_SUFFIX = ".ast"
+
+_MAGIC = b"TIMONAST"
+_DIGEST_SIZE = 32
+
+_interpreter_version = None
+
+
+def interpreter_version():
+    """
+    Hash of interpreter modules, so entries made by different version of the interpreter are never loaded
+
+    Returns:
+        hex digest
+    """
+    global _interpreter_version
+    if _interpreter_version is None:
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(package_dir)):
+            if name.endswith(".py"):
+                with open(os.path.join(package_dir, name), "rb") as file:
+                    digest.update(name.encode() + b"\0" + file.read())
+        _interpreter_version = digest.hexdigest()
+    return _interpreter_version
+
+
+class ProgramCache:
+    """
+    Directory of serialized parsed programs
+
+    Entry is a file named by the key, holding checksum of serialized program and the program itself. Entries are
+    touched when loaded, least recently used ones are evicted when total size of entries exceeds the limit. Stale,
+    corrupt and unwritable entries are misses, so parsing falls back to the source
+    """
+
+    MAX_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, directory, max_size=MAX_SIZE):
+        """
+        Args:
+            directory: path to cache directory, created when needed
+            max_size: maximal total size of entries in bytes
+        """
+        self._directory = directory
+        self._max_size = max_size
+
+    @staticmethod
+    def make_key(source_reader, parser):
+        """
+        Computes key of program parsed from the rest of source_reader, which has to hold the whole text
+
+        Args:
+            source_reader: reader before parsing
+            parser: function parsing Program from lexer, programs of different parsers are kept separately
+
+        Returns:
+            hex digest
+        """
+        digest = hashlib.sha256()
+        header = "{}\0{}\0{}.{}\0{}\0".format(FORMAT_VERSION, interpreter_version(), parser.__module__,
+                                               parser.__qualname__, source_reader.get_pos())
+        digest.update(header.encode())
+        digest.update(source_reader.get_text().encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def load(self, key, source):
+        """
+        Args:
+            key: key made by make_key
+            source: source of the script, attached to positions in the program
+
+        Returns:
+            cached Program or None if there is no valid entry
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+
+        try:
+            payload = data[len(_MAGIC) + _DIGEST_SIZE:]
+            if data[:len(_MAGIC)] != _MAGIC or data[len(_MAGIC):len(_MAGIC) + _DIGEST_SIZE] != _checksum(payload):
+                raise ValueError("Corrupt cache entry")
+            program = serialization.loads(payload, source)
+            if not isinstance(program, Program):
+                raise ValueError("Cache entry doesn't hold a program")
+        except Exception:  # anything that can't be loaded is dropped
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return program
+
+    def store(self, key, program):
+        """
+        Saves program under key and evicts least recently used entries over the size limit
+
+        Programs that can't be saved (too deeply nested or unwritable cache) are skipped
+        """
+        try:
+            payload = serialization.dumps(program)
+        except RecursionError:
+            return
+
+        if len(_MAGIC) + _DIGEST_SIZE + len(payload) > self._max_size:
+            return
+
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            # written next to the entry and renamed, so readers never see a partial entry
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+            try:
+                with os.fdopen(file_descriptor, "wb") as file:
+                    file.write(_MAGIC + _checksum(payload) + payload)
+                os.replace(temporary_path, self._entry_path(key))
+            except OSError:
+                self._remove(temporary_path)
+                raise
+            self._evict()
+        except OSError:
+            pass
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self._directory):
+            if entry.name.endswith(ENTRY_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:  # removed by another process
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self._max_size:
+                break
+            self._remove(path)
+            total_size -= size
+
+    def _entry_path(self, key):
+        return os.path.join(self._directory, key + ENTRY_SUFFIX)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _checksum(payload):
+    return hashlib.sha256(payload).digest()
@@ -0,0 +1,582 @@
+"""
+
+Python compilation module
+
+Translates resolved program into Python source, whose code object is kept in a file next to the script, so later runs
+neither parse nor walk the syntax tree. Expressions are flattened into statements over temporaries, so Python operators
+run inline. Nodes whose tokens errors are reported at are kept as a source map and rebuilt from positions in the script
+
+"""
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import tempfile
+
+from timoninterpreter import tokens
+from timoninterpreter.error_handling import ExecutionError
+from timoninterpreter.execution import FrameLayout
+from timoninterpreter.execution import UNINITIALIZED
+from timoninterpreter.program_cache import interpreter_version
+from timoninterpreter.source_readers import FilePosition
+from timoninterpreter.syntax_nodes import *
+from timoninterpreter.syntax_nodes import _ARGUMENT_STEP
+from timoninterpreter.syntax_nodes import _BINARY_STEP
+from timoninterpreter.syntax_nodes import _CALL_STEP
+from timoninterpreter.syntax_nodes import _UNARY_STEP
+
+FORMAT_VERSION = 1
+CACHE_SUFFIX = "c"  # script.tim is cached in script.timc
+
+_MAGIC = b"TIMONPYC"
+_DIGEST_SIZE = 32
+_INDENT = "    "
+
+# Python expressions of operators, formatted with operands
+_binary_templates = {
+    MinusOperator: "{} - {}",
+    MultiplyOperator: "{} * {}",
+    DivisionOperator: "{} // {}",
+    EqualOperator: "{} == {}",
+    NotEqualOperator: "{} != {}",
+    GreaterOperator: "{} > {}",
+    GreaterOrEqualOperator: "{} >= {}",
+    LessOperator: "{} < {}",
+    LessOrEqualOperator: "{} <= {}",
+    OrOperator: "bool({}) or bool({})",
+    AndOperator: "bool({}) and bool({})",
+    PlusOperator: "str({0}) + str({1}) if isinstance({0}, str) or isinstance({1}, str) else {0} + {1}",
+}
+
+_unary_templates = {
+    MathNegationOperator: "-{}",
+    LogicNegationOperator: "not bool({})",
+}
+
+# Site node classes by name, for the source map
+_site_classes = {node_class.__name__: node_class for node_class in
+                 list(_binary_templates) + list(_unary_templates) + [Identifier, Years, Months, Weeks, Days, Hours,
+                                                                     Minutes, Seconds, NumberLiteral, StringLiteral,
+                                                                     DateLiteral, TimeLiteral, DateTimeLiteral,
+                                                                     TimedeltaLiteral]}
+
+
+class CompiledProgram:
+    """
+    Program compiled to Python code object, with everything the code needs that can be marshalled
+    """
+
+    def __init__(self, code, constants, layouts, sites):
+        """
+        Args:
+            code: code object defining _program function
+            constants: descriptions of values of date and time literals
+            layouts: descriptions of frame layouts, names and whether they are declared on entry
+            sites: source map, class name, position and token value of nodes that errors are reported at
+        """
+        self.code = code
+        self.constants = constants
+        self.layouts = layouts
+        self.sites = sites
+
+    @classmethod
+    def from_program(cls, program, file_name="<timon>"):
+        """
+        Raises:
+            SyntaxError if Python can't compile the program, like when blocks are nested too deeply
+        """
+        translation = _Translator().translate(program)
+        return cls(compile(translation.source, file_name, "exec"), tuple(translation.constants),
+                   tuple(translation.layouts), tuple(translation.sites))
+
+    def dumps(self):
+        return marshal.dumps((self.code, self.constants, self.layouts, self.sites))
+
+    @classmethod
+    def loads(cls, data):
+        return cls(*marshal.loads(data))
+
+    def execute(self, environment, source):
+        """
+        Args:
+            environment: environment to execute in
+            source: source of the script, positions of errors point to it
+
+        Returns:
+            Value returned by the program, None if it didn't return
+        """
+        namespace = {
+            'ExecutionError': ExecutionError,
+            'K': tuple(_make_constant(*constant) for constant in self.constants),
+            'L': tuple(_make_layout(*layout) for layout in self.layouts),
+            'S': tuple(_make_site(source, *site) for site in self.sites),
+            '_ERRORS': (ValueError, TypeError, OverflowError),
+            '_output': print,
+            '_argument_error': _argument_error,
+            '_get_fun': _get_fun,
+            '_get_var': _get_var,
+            '_uninitialized': _uninitialized,
+        }
+        exec(self.code, namespace)
+        return namespace['_program'](environment)
+
+
+def execute(program, environment):
+    """
+    Compiles program and executes it, like Program.execute, without caching
+
+    Programs that Python can't compile are executed by closure compilation
+    """
+    try:
+        compiled = CompiledProgram.from_program(program)
+    except SyntaxError:
+        from timoninterpreter import closure_compilation
+        return closure_compilation.execute(program, environment)
+    return compiled.execute(environment, _program_source(program))
+
+
+def cache_path(script_path):
+    return script_path + CACHE_SUFFIX
+
+
+def make_key(source_reader):
+    """
+    Computes key of program parsed from the rest of source_reader, which has to hold the whole text
+
+    Returns:
+        digest of the text and of versions of the interpreter and of Python
+    """
+    digest = hashlib.sha256()
+    header = "{}\0{}\0{}\0".format(FORMAT_VERSION, interpreter_version(), source_reader.get_pos())
+    digest.update(header.encode() + importlib.util.MAGIC_NUMBER)
+    digest.update(source_reader.get_text().encode("utf-8", "surrogatepass"))
+    return digest.digest()
+
+
+def load(path, key):
+    """
+    Returns:
+        CompiledProgram saved in file at path under key, None if there is no valid one
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+
+    header_size = len(_MAGIC) + _DIGEST_SIZE
+    if data[:len(_MAGIC)] != _MAGIC or data[len(_MAGIC):header_size] != key:
+        return None
+    try:
+        return CompiledProgram.loads(data[header_size:])
+    except (ValueError, EOFError, TypeError):  # corrupt file
+        return None
+
+
+def store(path, key, compiled):
+    """
+    Saves compiled program in file at path, skipped if it can't be written
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        # written next to the file and renamed, so readers never see a partial file
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(_MAGIC + key + compiled.dumps())
+            os.replace(temporary_path, path)
+        except OSError:
+            os.remove(temporary_path)
+            raise
+    except OSError:
+        pass
+
+
+def _program_source(program):
+    pending = [program]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, LeafNode):
+            return node.token.get_file_pos().get_source()
+        pending += node.get_children()
+    return None
+
+
+# Runtime of generated code
+
+
+def _get_fun(environment, site):
+    try:
+        return environment.get_fun(site.get_value())
+    except ValueError as e:
+        raise ExecutionError(site.token, str(e))
+
+
+def _get_var(environment, site):
+    try:
+        return environment.get_var(site.get_value())
+    except ValueError as e:
+        raise ExecutionError(site.token, str(e))
+
+
+def _uninitialized(environment, depth, slot, site):
+    try:
+        environment.get_slot(depth, slot, site.get_value())
+    except ValueError as e:
+        raise ExecutionError(site.token, str(e))
+
+
+def _argument_error(calls, error):
+    """
+    Returns:
+        ExecutionError of ValueError raised while evaluating argument of the innermost call waiting for its arguments
+    """
+    function, index = calls[-1]
+    return ExecutionError(function[3][index].token, str(error))
+
+
+def _make_constant(kind, *arguments):
+    return getattr(tokens, kind)(*arguments)
+
+
+def _make_layout(names, on_entry):
+    layout = FrameLayout()
+    for name, declared in zip(names, on_entry):
+        layout.declare(name, declared)
+    return layout
+
+
+def _make_site(source, class_name, offset, value):
+    return _site_classes[class_name].from_token(
+        tokens.Token.unchecked(_site_classes[class_name].token_type(), FilePosition(source, offset), value))
+
+
+# Translation
+
+
+class _Translation:
+    def __init__(self, source, constants, layouts, sites):
+        self.source = source
+        self.constants = constants
+        self.layouts = layouts
+        self.sites = sites
+
+
+class _Context:
+    """
+    Python function being generated, program or Timon function
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.level = 0  # number of frames pushed in the function, local f<level> is the top frame
+
+
+class _Translator:
+    def __init__(self):
+        self._constants = []
+        self._layouts = []
+        self._layout_indices = {}
+        self._sites = []
+        self._site_indices = {}
+        self._functions = {}  # names of records of functions by definition node
+        self._definitions = []  # lines of generated Timon functions
+        self._temporary_count = 0
+        self._calls = []  # record, frame and argument index of calls being translated, and their entry in calls list
+
+    def translate(self, program):
+        if program.layout is None:
+            program.resolve()
+
+        lines = ["def _program(environment):",
+                 _INDENT + "environment.set_global_layout({})".format(self._layout(program.layout)),
+                 _INDENT + "f0 = environment.frames[0]",
+                 _INDENT + "calls = []"]
+        for statement in program.statements:
+            if isinstance(statement, FunctionDefinitionStatement):
+                self._function(statement)
+        self._block(program.statements, _Context(lines), 1)
+        lines.append(_INDENT + "return None")
+
+        source = "\n".join(self._definitions + lines) + "\n"
+        return _Translation(source, self._constants, self._layouts, self._sites)
+
+    def _function(self, node):
+        body = node.body.get_body() if isinstance(node.body, LazyBody) else node.body
+        layout = node.get_layout()
+        record = "R{}".format(len(self._functions))
+        self._functions[node] = record
+
+        lines = ["def _{}(environment, f0):".format(record), _INDENT + "calls = []"]
+        self._block(body.statements, _Context(lines), 1)
+        lines.append(_INDENT + "return 0")
+        parameters = node.parameters.parameters
+        lines.append("{} = ({}, {}, ({}), ({}), _{})".format(
+            record, len(parameters), self._layout(layout),
+            "".join("{}, ".format(parameter.binding[1]) for parameter in parameters),
+            "".join("{}, ".format(self._site(parameter)) for parameter in parameters), record))
+        self._definitions += lines
+
+    def _block(self, statements, context, indent):
+        for statement in statements:
+            self._statement_translators[type(statement)](self, statement, context, indent)
+        if not statements:
+            self._emit(context, indent, "pass")
+
+    def _emit(self, context, indent, line):
+        context.lines.append(_INDENT * indent + line)
+
+    def _temporary(self):
+        self._temporary_count += 1
+        return "t{}".format(self._temporary_count)
+
+    def _layout(self, layout):
+        index = self._layout_indices.get(id(layout))
+        if index is None:
+            index = self._layout_indices[id(layout)] = len(self._layouts)
+            self._layouts.append((tuple(layout.names), tuple(value is UNINITIALIZED for value in layout.blank)))
+        return "L[{}]".format(index)
+
+    def _site(self, node):
+        index = self._site_indices.get(id(node))
+        if index is None:
+            index = self._site_indices[id(node)] = len(self._sites)
+            position = node.token.get_file_pos().get_absolute_pos()
+            value = node.get_value()
+            self._sites.append((type(node).__name__, position, value if isinstance(value, (int, str)) else None))
+        return "S[{}]".format(index)
+
+    def _constant(self, node):
+        value = node.get_value()
+        if isinstance(value, (int, str)):
+            return repr(value)
+
+        if isinstance(value, tokens.DateValue):
+            description = "DateValue", value.get_day(), value.get_month(), value.get_year()
+        elif isinstance(value, tokens.TimeValue):
+            description = "TimeValue", value.get_hour(), value.get_minute(), value.get_second()
+        elif isinstance(value, tokens.DateTimeValue):
+            description = ("DateTimeValue", value.get_day(), value.get_month(), value.get_year(), value.get_hour(),
+                           value.get_minute(), value.get_second())
+        else:
+            description = ("TimedeltaValue", value.get_years(), value.get_months(), value.get_weeks(),
+                           value.get_days(), value.get_hours(), value.get_minutes(), value.get_seconds())
+        self._constants.append(description)
+        return "K[{}]".format(len(self._constants) - 1)
+
+    def _frame(self, context, binding):
+        return "f{}".format(context.level - binding[0])
+
+    def _evaluated(self, expression, context, indent, handler):
+        """
+        Emits evaluation of expression, ValueErrors raised while arguments of calls are evaluated are reported at
+        parameters, other ones are handled by the handler lines (reraised if there are none)
+
+        Returns:
+            Python expression of the value
+        """
+        if not _has_call(expression) and not handler:
+            return self._expression(expression, context, indent)
+
+        self._emit(context, indent, "try:")
+        value = self._expression(expression, context, indent + 1)
+        result = self._temporary()
+        self._emit(context, indent + 1, "{} = {}".format(result, value))
+        self._emit(context, indent, "except ValueError as e:")
+        self._emit(context, indent + 1, "if calls:")
+        self._emit(context, indent + 2, "raise _argument_error(calls, e)")
+        for line in handler or ["raise"]:
+            self._emit(context, indent + 1, line)
+        return result
+
+    def _expression(self, expression, context, indent):
+        values = []
+        pending = [expression]
+        while pending:
+            item = pending.pop()
+            if isinstance(item, tuple):
+                kind, node = item
+                if kind == _BINARY_STEP:
+                    rhs = values.pop()
+                    values[-1] = self._operation(_binary_templates[type(node)].format(values[-1], rhs), node,
+                                                 context, indent)
+                elif kind == _UNARY_STEP:
+                    if isinstance(node, TimeInfoAccess):
+                        result = self._temporary()
+                        self._emit(context, indent, "{} = {}.unary_evaluate({}, environment)".format(
+                            result, self._site(node.time_unit), values[-1]))
+                        values[-1] = result
+                    else:
+                        values[-1] = self._operation(_unary_templates[type(node)].format(values[-1]), node, context,
+                                                     indent)
+                elif kind == _CALL_STEP:
+                    self._call(node, context, indent)
+                elif kind == _ARGUMENT_STEP:
+                    call = self._calls[-1]
+                    self._emit(context, indent, "{}[{}[2][{}]] = {}".format(call[1], call[0], call[2], values.pop()))
+                    call[2] += 1
+                    self._emit(context, indent, "{}[1] = {}".format(call[3], call[2]))
+                else:
+                    record, frame, _, pending_call = self._calls.pop()
+                    result = self._temporary()
+                    self._emit(context, indent, "calls.pop()")
+                    self._emit(context, indent, "{} = {}[4](environment, {})".format(result, record, frame))
+                    self._emit(context, indent, "environment.pop_frame()")
+                    values.append(result)
+            elif isinstance(item, StackEvaluable):
+                pending.extend(reversed(item.evaluation_steps()))
+            elif isinstance(item, Identifier):
+                values.append(self._read(item, context, indent))
+            else:
+                values.append(self._constant(item))
+        return values[-1]
+
+    def _call(self, node, context, indent):
+        record, frame, pending_call = self._temporary(), self._temporary(), self._temporary()
+        self._emit(context, indent, "{} = _get_fun(environment, {})".format(record, self._site(node.identifier)))
+        self._emit(context, indent, "if {}[0] != {}:".format(record, len(node.parameters)))
+        self._emit(context, indent + 1, 'raise ValueError("TODO")')
+        self._emit(context, indent, "environment.push_frame({}[1])".format(record))
+        self._emit(context, indent, "{} = environment.frames[-1]".format(frame))
+        self._emit(context, indent, "{} = [{}, 0]".format(pending_call, record))
+        self._emit(context, indent, "calls.append({})".format(pending_call))
+        self._calls.append([record, frame, 0, pending_call])
+
+    def _operation(self, operation, node, context, indent):
+        result = self._temporary()
+        self._emit(context, indent, "try:")
+        self._emit(context, indent + 1, "{} = {}".format(result, operation))
+        self._emit(context, indent, "except _ERRORS as e:")
+        self._emit(context, indent + 1, "raise ExecutionError({}.token, str(e))".format(self._site(node)))
+        return result
+
+    def _read(self, identifier, context, indent):
+        result = self._temporary()
+        if identifier.binding is None:
+            self._emit(context, indent, "{} = _get_var(environment, {})".format(result, self._site(identifier)))
+            return result
+
+        depth, slot = identifier.binding
+        self._emit(context, indent, "{} = {}[{}]".format(result, self._frame(context, identifier.binding), slot))
+        self._emit(context, indent, "if {} is None:".format(result))
+        self._emit(context, indent + 1, "_uninitialized(environment, {}, {}, {})".format(depth, slot,
+                                                                                      self._site(identifier)))
+        return result
+
+    def _push(self, layout, context, indent):
+        context.level += 1
+        self._emit(context, indent, "environment.push_frame({})".format(self._layout(layout)))
+        self._emit(context, indent, "f{} = environment.frames[-1]".format(context.level))
+
+    def _function_definition(self, node, context, indent):
+        self._emit(context, indent, "environment.set_fun({!r}, {})".format(node.identifier.get_value(),
+                                                                           self._functions[node]))
+
+    def _variable_definition(self, node, context, indent):
+        self._emit(context, indent, "{}[{}] = None".format(self._frame(context, node.identifier.binding),
+                                                           node.identifier.binding[1]))
+        if node.assignment:
+            self._assignment(node.assignment, context, indent)
+
+    def _assignment(self, node, context, indent):
+        identifier = node.identifier
+        error = "raise ExecutionError({}.token, str(e))".format(self._site(identifier))
+        if identifier.binding is None:
+            self._emit(context, indent, "try:")
+            value = self._expression(node.expression, context, indent + 1)
+            self._emit(context, indent + 1, "environment.set_var({!r}, {})".format(identifier.get_value(), value))
+            self._emit(context, indent, "except ValueError as e:")
+            self._emit(context, indent + 1, "if calls:")
+            self._emit(context, indent + 2, "raise _argument_error(calls, e)")
+            self._emit(context, indent + 1, error)
+            return
+
+        value = self._evaluated(node.expression, context, indent, [error] if _has_call(node.expression) else None)
+        self._emit(context, indent, "{}[{}] = {}".format(self._frame(context, identifier.binding),
+                                                         identifier.binding[1], value))
+
+    def _if(self, node, context, indent):
+        condition = self._evaluated(node.expression, context, indent, None)
+        self._emit(context, indent, "if {}:".format(condition))
+        self._scope(node.body, context, indent + 1)
+        if node.else_body:
+            self._emit(context, indent, "else:")
+            self._scope(node.else_body, context, indent + 1)
+
+    def _scope(self, body, context, indent):
+        if body.layout is None:
+            self._block(body.statements, context, indent)
+            return
+
+        self._push(body.layout, context, indent)
+        self._block(body.statements, context, indent)
+        self._emit(context, indent, "environment.pop_frame()")
+        context.level -= 1
+
+    def _from(self, node, context, indent):
+        start = self._temporary()
+        self._emit(context, indent, "{} = {}".format(start, self._evaluated(node.start, context, indent, None)))
+        end = self._evaluated(node.end, context, indent, None)
+        step = self._constant_of(node.time_unit.self_evaluate(None))
+        try:
+            error = "raise ExecutionError({}.token, str(e))".format(self._site(node.start))
+        except AttributeError as e:  # start isn't a token, reported as it is by execution of the node
+            error = "raise AttributeError({!r})".format(str(e))
+
+        self._push(node.body.layout, context, indent)
+        frame = "f{}".format(context.level)
+        self._emit(context, indent, "try:")
+        self._emit(context, indent + 1, "while {} <= {}:".format(start, end))
+        self._emit(context, indent + 2, "{}[{}] = {}".format(frame, node.identifier.binding[1], start))
+        self._block(node.body.statements, context, indent + 2)
+        self._emit(context, indent + 2, "{}[:] = {}.blank".format(frame, self._layout(node.body.layout)))
+        self._emit(context, indent + 2, "try:")
+        self._emit(context, indent + 3, "{} += {}".format(start, step))
+        self._emit(context, indent + 2, "except _ERRORS as e:")
+        self._emit(context, indent + 3, error)
+        self._emit(context, indent + 1, "environment.pop_frame()")
+        self._emit(context, indent, "except _ERRORS as e:")
+        self._emit(context, indent + 1, error)
+        context.level -= 1
+
+    def _constant_of(self, value):
+        self._constants.append(("TimedeltaValue", value.get_years(), value.get_months(), value.get_weeks(),
+                                value.get_days(), value.get_hours(), value.get_minutes(), value.get_seconds()))
+        return "K[{}]".format(len(self._constants) - 1)
+
+    def _print(self, node, context, indent):
+        value = self._evaluated(node.expression, context, indent, None)
+        self._emit(context, indent, "_output(str({}))".format(value))
+
+    def _return(self, node, context, indent):
+        value = self._evaluated(node.expression, context, indent, None) if node.expression else "0"
+        for _ in range(context.level):
+            self._emit(context, indent, "environment.pop_frame()")
+        self._emit(context, indent, "return {}".format(value))
+
+    def _call_statement(self, node, context, indent):
+        self._evaluated(node, context, indent, None)
+
+    _statement_translators = {
+        FunctionDefinitionStatement: _function_definition,
+        LazyFunctionDefinitionStatement: _function_definition,
+        StrictLazyFunctionDefinitionStatement: _function_definition,
+        VariableDefinitionStatement: _variable_definition,
+        VariableAssignmentStatement: _assignment,
+        IfStatement: _if,
+        FromStatement: _from,
+        PrintStatement: _print,
+        ReturnStatement: _return,
+        FunctionCall: _call_statement,
+    }
+
+
+def _has_call(expression):
+    pending = [expression]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, FunctionCall):
+            return True
+        pending += node.get_children()
+    return False
@@ -0,0 +1,53 @@
+"""
+
+Serialization module
+
+Pickles parsed nodes without their sources, which are attached back when loading
+
+"""
+import io
+import pickle
+
+from timoninterpreter.source_readers import Source
+
+
+class _SourcePickler(pickle.Pickler):
+    """Pickles all sources as references, they are replaced with the given source when loading"""
+
+    def persistent_id(self, obj):
+        return "source" if isinstance(obj, Source) else None
+
+
+class _SourceUnpickler(pickle.Unpickler):
+    def __init__(self, file, source):
+        super().__init__(file)
+        self._source = source
+
+    def persistent_load(self, pid):
+        return self._source
+
+
+def dumps(obj):
+    """
+    Serializes obj, leaving out sources of positions in it
+
+    Returns:
+        bytes
+    """
+    file = io.BytesIO()
+    _SourcePickler(file, pickle.HIGHEST_PROTOCOL).dump(obj)
+    return file.getvalue()
+
+
+def loads(data, source):
+    """
+    Deserializes obj serialized with dumps
+
+    Args:
+        data: bytes
+        source: source of all positions in obj
+
+    Returns:
+        obj
+    """
+    return _SourceUnpickler(io.BytesIO(data), source).load()
@@ -4,45 +4,186 @@ Source stream readers
 
 """
 
-import copy
+import bisect
 import os
+import sys
+from array import array
+from collections import OrderedDict
+
+
+class Source:
+    """
+    Interned descriptor of a single read of a source, shared by all positions in it
+
+    Maps absolute positions to lines with a table of line start positions. The table is built once on the first
+    lookup if the whole text is known, otherwise readers feed it with characters as they are read. Readers of streams
+    make it forget lines they can't go back to, so the table only covers their buffer
+    """
+
+    __slots__ = ('_file_path', '_text', '_line_starts', '_forgotten_lines')
+
+    def __init__(self, file_path, text=None):
+        """
+        Args:
+            file_path: path to the source file
+            text: whole source text if it is known upfront
+        """
+        self._file_path = sys.intern(file_path)
+        self._text = text
+        self._line_starts = None if text is not None else array('Q', [0])
+        self._forgotten_lines = 0  # number of lines before the first line in the table
+
+    def _build_line_starts(self):
+        self._line_starts = array('Q', [0])
+        self.feed(self._text, 0)
+        self._text = None
+
+    def feed(self, characters, start_pos):
+        """
+        Records line starts in characters read from start_pos, already recorded ones are skipped
+        """
+        index = characters.find('\n', max(0, self._line_starts[-1] - start_pos))
+        while index != -1:
+            self._line_starts.append(start_pos + index + 1)
+            index = characters.find('\n', index + 1)
+
+    def forget(self, absolute_pos):
+        """
+        Drops line starts before the line of absolute_pos, positions before that line can't be located afterwards
+        """
+        line_index = bisect.bisect_right(self._line_starts, absolute_pos) - 1
+        if line_index > 0:
+            del self._line_starts[:line_index]
+            self._forgotten_lines += line_index
+
+    def locate(self, absolute_pos):
+        """
+        Returns:
+            line number (starting from 1) and position in line (starting from 0) of absolute position
+        """
+        if self._line_starts is None:
+            self._build_line_starts()
+
+        line_index = bisect.bisect_right(self._line_starts, absolute_pos) - 1
+        return self._forgotten_lines + line_index + 1, absolute_pos - self._line_starts[line_index]
+
+    def get_file_path(self):
+        return self._file_path
 
 
 class FilePosition:
-    def __init__(self, file_path):
-        self._file_path = file_path
-        self._line_num = 1
-        self._line_pos = 0
-        self._absolute_pos = 0
-
-    def advance(self, characters):
-        for character in characters:
-            self._absolute_pos += 1
-            self._line_pos += 1
-            if character == '\n':
-                self._line_num += 1
-                self._line_pos = 0
+    """
+    Position in a source, line and position in line are computed only when asked for, unless they are given
+    """
+
+    __slots__ = ('_source', '_absolute_pos', '_location')
+
+    def __init__(self, source, absolute_pos=0, location=None):
+        """
+        Args:
+            source: Source the position is in
+            absolute_pos: offset from the start of the source
+            location: line number and position in line, if they are known already
+        """
+        self._source = source
+        self._absolute_pos = absolute_pos
+        self._location = location
 
     def get_line_num(self):
-        return self._line_num
+        return (self._location or self._source.locate(self._absolute_pos))[0]
 
     def get_line_pos(self):
-        return self._line_pos
+        return (self._location or self._source.locate(self._absolute_pos))[1]
 
     def get_absolute_pos(self):
         return self._absolute_pos
 
     def get_file_path(self):
-        return self._file_path
+        return self._source.get_file_path()
+
+    def get_source(self):
+        return self._source
 
     def __eq__(self, other):
         if not isinstance(other, FilePosition):
             return NotImplemented
 
-        return (self._line_num == other._line_num and
-                self._line_pos == other._line_pos and
-                self._absolute_pos == other._absolute_pos and
-                self._file_path == other._file_path)
+        return (self._absolute_pos == other._absolute_pos and
+                self._source.get_file_path() == other._source.get_file_path())
+
+
+class SourceCache:
+    """
+    Process-wide cache of source texts keyed by path, shared by readers and diagnostics
+
+    Readers put what they've read, so diagnostics slice it instead of reopening the file. Entry can hold only a window
+    of the source (starting at some absolute position) for streams. Least recently used entries are evicted
+    """
+
+    MAX_ENTRIES = 64
+    MAX_CHARACTERS = 64 * 1024 * 1024
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_characters=MAX_CHARACTERS):
+        self._max_entries = max_entries
+        self._max_characters = max_characters
+        self._entries = OrderedDict()  # path -> (absolute position of first character, text)
+        self._characters = 0
+
+    def put(self, file_path, text, start_pos=0):
+        """
+        Caches text of file_path (or its window starting at start_pos), replacing previous entry
+        """
+        self.discard(file_path)
+        self._entries[file_path] = (start_pos, text)
+        self._characters += len(text)
+
+        while len(self._entries) > 1 and (len(self._entries) > self._max_entries or
+                                          self._characters > self._max_characters):
+            _, (_, evicted_text) = self._entries.popitem(last=False)
+            self._characters -= len(evicted_text)
+
+    def discard(self, file_path):
+        """
+        Removes entry of file_path if it exists
+        """
+        entry = self._entries.pop(file_path, None)
+        if entry is not None:
+            self._characters -= len(entry[1])
+
+    def get(self, file_path):
+        """
+        Returns:
+            absolute position of first cached character and cached text, file is read if it isn't cached
+        """
+        if file_path in self._entries:
+            self._entries.move_to_end(file_path)
+            return self._entries[file_path]
+
+        with open(file_path, "rt") as file:
+            self.put(file_path, file.read())
+        return self._entries[file_path]
+
+    def peek(self, file_path, n, start_pos):
+        """
+        Get n next (if n positive) or previous (if n negative) characters of file_path from start_pos
+
+        Returns:
+            characters (can be less than n if source ended or characters are outside of cached window)
+        """
+        text_start_pos, text = self.get(file_path)
+        start_index = start_pos - text_start_pos
+
+        if start_index < 0 or start_index > len(text):
+            raise ValueError("Start position outside of range. Only possible range is [{}, {}]".format(
+                text_start_pos, text_start_pos + len(text)))
+
+        if n < 0:
+            return text[max(0, start_index + n):start_index]
+
+        return text[start_index:start_index + n]
+
+
+source_cache = SourceCache()
 
 
 class FileReader:
@@ -53,7 +194,8 @@ class FileReader:
     def __init__(self, file_path):
         self._file_path = file_path
         self._file = None
-        self._file_pos = FilePosition(self._file_path)
+        self._source = Source(self._file_path)
+        self._pos = 0
         self._backward_checkpoint = None
         self._forward_checkpoint = None
 
@@ -63,6 +205,9 @@ class FileReader:
         """
 
         self._file = open(self._file_path, "rt")
+        source_cache.discard(self._file_path)  # diagnostics will read the current version of the file
+        self._source = Source(self._file_path)
+        self._pos = 0
 
     def close(self):
         """
@@ -116,7 +261,8 @@ class FileReader:
 
         characters = self._file.read(n)
         if characters:
-            self._file_pos.advance(characters)
+            self._source.feed(characters, self._pos)
+            self._pos += len(characters)
         return characters
 
     def ended(self):
@@ -139,29 +285,354 @@ class FileReader:
         """
         Creates position checkpoint that reader can be rewinded to
         """
-        self._backward_checkpoint = copy.deepcopy(self._file_pos)
+        self._backward_checkpoint = self._pos
+
+    def rewind_backward(self):
+        """
+        Rewinds to previous backward checkpoint (if exists) and sets forward checkpoint (as current position)
+        """
+        if self._backward_checkpoint is not None:
+            self._forward_checkpoint = self._pos
+            self._pos = self._backward_checkpoint
+
+    def rewind_forward(self):
+        """
+        Rewinds to previous forward checkpoint (if exists) and resets forward checkpoint to None
+        """
+        if self._forward_checkpoint is not None:
+            self._pos = self._forward_checkpoint
+            self._forward_checkpoint = None
+
+    def get_file_path(self):
+        return self._file_path
+
+    def get_file_pos(self):
+        return FilePosition(self._source, self._pos)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class BufferReader:
+    """
+    Class for reading sources held entirely in memory
+
+    Source is decoded once into a string and read with an integer cursor, so peeks and lookbacks are plain slices
+    """
+
+    def __init__(self, file_path, source=None):
+        """
+        Args:
+            file_path: path to the source file, used as a name if source is given
+            source: source text, if None it is read from file_path on open
+        """
+        self._file_path = file_path
+        self._source_text = source
+        self._text = None
+        self._opened = False
+        self._source = None
+        self._pos = 0
+        self._backward_checkpoint = None
+        self._forward_checkpoint = None
+
+    def open(self):
+        """
+        Reads the whole source into memory
+        """
+
+        if self._source_text is not None:
+            self._text = self._source_text
+        else:
+            with open(self._file_path, "rt") as file:
+                self._text = file.read()
+        source_cache.put(self._file_path, self._text)
+        self._opened = True
+        self._source = Source(self._file_path, self._text)
+        self._pos = 0
+
+    def close(self):
+        """
+        Releases the source
+        """
+
+        self._opened = False
+        self._text = None
+
+    def peek(self, n=1, start_pos=None):
+        """
+        Get n next (if n positive) or previous (if n negative) characters without consuming them
+
+        Returns:
+            characters (can be less than n if source ended)
+        """
+
+        if start_pos is None:
+            start_pos = self._pos
+
+        if start_pos < 0 or start_pos > len(self._text):
+            raise ValueError("Start position outside of range. Only possible range is [0, {}]".format(len(self._text)))
+
+        if n < 0:
+            return self._text[max(0, start_pos + n):start_pos]
+
+        return self._text[start_pos:start_pos + n]
+
+    def get(self, n=1):
+        """
+        Get next n characters and consume them
+
+        Returns:
+            next characters (can be less than n if source ended)
+        """
+
+        if n < 0:
+            raise ValueError("Get size can't be negative")
+
+        characters = self._text[self._pos:self._pos + n]
+        self._pos += len(characters)
+        return characters
+
+    def ended(self):
+        """
+        Returns:
+            True if there are no more characters to read
+        """
+
+        return self._pos >= len(self._text)
+
+    def opened(self):
+        """
+        Returns:
+            True if source is opened
+        """
+
+        return self._opened
+
+    def checkpoint(self):
+        """
+        Creates position checkpoint that reader can be rewinded to
+        """
+        self._backward_checkpoint = self._pos
 
     def rewind_backward(self):
         """
         Rewinds to previous backward checkpoint (if exists) and sets forward checkpoint (as current position)
         """
         if self._backward_checkpoint is not None:
-            self._forward_checkpoint = copy.deepcopy(self._file_pos)
-            self._file_pos = copy.deepcopy(self._backward_checkpoint)
+            self._forward_checkpoint = self._pos
+            self._pos = self._backward_checkpoint
 
     def rewind_forward(self):
         """
         Rewinds to previous forward checkpoint (if exists) and resets forward checkpoint to None
         """
         if self._forward_checkpoint is not None:
-            self._file_pos = copy.deepcopy(self._forward_checkpoint)
+            self._pos = self._forward_checkpoint
             self._forward_checkpoint = None
 
     def get_file_path(self):
-        return copy.deepcopy(self._file_path)
+        return self._file_path
+
+    def get_file_pos(self):
+        return FilePosition(self._source, self._pos)
+
+    def get_text(self):
+        """
+        Returns:
+            whole source text
+        """
+        return self._text
+
+    def get_pos(self):
+        """
+        Returns:
+            absolute position of the cursor
+        """
+        return self._pos
+
+    def seek(self, absolute_pos):
+        """
+        Moves the cursor to absolute position
+        """
+        if absolute_pos < 0 or absolute_pos > len(self._text):
+            raise ValueError("Position outside of range. Only possible range is [0, {}]".format(len(self._text)))
+        self._pos = absolute_pos
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class StreamReader:
+    """
+    Class for reading non-seekable streams (stdin, pipes, sockets)
+
+    Stream is pulled in fixed-size chunks into a bounded buffer. Only characters from the backward checkpoint (or a
+    small window behind the cursor, kept for error snippets) onwards are retained, as are only starts of their lines,
+    so memory doesn't depend on the stream size. Positions are located when they are made, as their lines can be
+    forgotten later. Reader can be rewinded to a checkpoint only once, checkpoint is released on forward rewind
+    """
+
+    CHUNK_SIZE = 8192
+    SNIPPET_WINDOW = 256
+
+    def __init__(self, stream, file_path="<stdin>", chunk_size=CHUNK_SIZE):
+        """
+        Args:
+            stream: text stream to read from, it is not closed by the reader
+            file_path: name of the stream used in positions
+            chunk_size: number of characters read from the stream at once
+        """
+        self._stream = stream
+        self._file_path = file_path
+        self._chunk_size = chunk_size
+        self._opened = False
+        self._stream_ended = False
+        self._buffer = ''
+        self._buffer_start = 0  # absolute position of the first buffered character
+        self._source = Source(self._file_path)
+        self._pos = 0
+        self._backward_checkpoint = None
+        self._forward_checkpoint = None
+
+    def open(self):
+        """
+        Starts reading the stream
+        """
+
+        self._opened = True
+        source_cache.put(self._file_path, self._buffer, self._buffer_start)
+
+    def close(self):
+        """
+        Stops reading the stream, already buffered characters are still available for peeking
+        """
+
+        self._opened = False
+
+    def _buffer_end(self):
+        return self._buffer_start + len(self._buffer)
+
+    def _fill(self, end_pos):
+        """
+        Reads chunks from the stream until end_pos is buffered or stream ends
+        """
+        while self._buffer_end() < end_pos and self._opened and not self._stream_ended:
+            chunk = self._stream.read(self._chunk_size)
+            if not chunk:
+                self._stream_ended = True
+                return
+            self._source.feed(chunk, self._buffer_end())
+            self._trim()
+            self._buffer += chunk
+            source_cache.put(self._file_path, self._buffer, self._buffer_start)
+
+    def _trim(self):
+        """
+        Drops characters that can't be rewinded to, if there are at least a chunk of them
+        """
+        keep_from = self._pos - self.SNIPPET_WINDOW
+        if self._backward_checkpoint is not None:
+            keep_from = min(keep_from, self._backward_checkpoint)
+
+        if keep_from - self._buffer_start >= self._chunk_size:
+            self._buffer = self._buffer[keep_from - self._buffer_start:]
+            self._buffer_start = keep_from
+            self._source.forget(keep_from)
+
+    def peek(self, n=1, start_pos=None):
+        """
+        Get n next (if n positive) or previous (if n negative) characters without consuming them
+
+        Returns:
+            characters (can be less than n if stream ended or characters are no longer buffered)
+        """
+
+        if start_pos is None:
+            start_pos = self._pos
+
+        self._fill(start_pos + max(n, 0))
+
+        if start_pos < self._buffer_start or start_pos > self._buffer_end():
+            raise ValueError("Start position outside of range. Only possible range is [{}, {}]".format(
+                self._buffer_start, self._buffer_end()))
+
+        start_index = start_pos - self._buffer_start
+
+        if n < 0:
+            return self._buffer[max(0, start_index + n):start_index]
+
+        return self._buffer[start_index:start_index + n]
+
+    def get(self, n=1):
+        """
+        Get next n characters and consume them
+
+        Returns:
+            next characters (can be less than n if stream ended)
+        """
+
+        if n < 0:
+            raise ValueError("Get size can't be negative")
+
+        self._fill(self._pos + n)
+
+        start = self._pos - self._buffer_start
+        characters = self._buffer[start:start + n]
+        self._pos += len(characters)
+        return characters
+
+    def ended(self):
+        """
+        Returns:
+            True if there are no more characters to read
+        """
+
+        return self.peek() == ''
+
+    def opened(self):
+        """
+        Returns:
+            True if stream is being read
+        """
+
+        return self._opened
+
+    def checkpoint(self):
+        """
+        Creates position checkpoint that reader can be rewinded to
+        """
+        self._backward_checkpoint = self._pos
+
+    def rewind_backward(self):
+        """
+        Rewinds to previous backward checkpoint (if exists) and sets forward checkpoint (as current position)
+        """
+        if self._backward_checkpoint is not None:
+            self._forward_checkpoint = self._pos
+            self._pos = self._backward_checkpoint
+
+    def rewind_forward(self):
+        """
+        Rewinds to previous forward checkpoint (if exists) and resets both checkpoints to None
+        """
+        if self._forward_checkpoint is not None:
+            self._pos = self._forward_checkpoint
+            self._forward_checkpoint = None
+            self._backward_checkpoint = None
+
+    def get_file_path(self):
+        return self._file_path
 
     def get_file_pos(self):
-        return copy.deepcopy(self._file_pos)
+        return FilePosition(self._source, self._pos, self._source.locate(self._pos))
 
     def __enter__(self):
         self.open()
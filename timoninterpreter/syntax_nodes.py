@@ -4,11 +4,17 @@ Syntax analysis module
 
 """
 
+import inspect
 from abc import ABC, abstractmethod
 
 from timoninterpreter import tokens
 from timoninterpreter.error_handling import SyntacticError
 from timoninterpreter.error_handling import ExecutionError
+from timoninterpreter.execution import FrameLayout
+from timoninterpreter.lexical_analysis import TokenBuffer
+from timoninterpreter.lexical_analysis import TokenBufferView
+from timoninterpreter.lexical_analysis import TokenRecorder
+from timoninterpreter.source_readers import FilePosition
 
 
 class BaseNode(ABC):
@@ -16,17 +22,45 @@ class BaseNode(ABC):
     Node base class
     """
 
+    __slots__ = ()
+
     def reduce(self):
         return self
 
+    @classmethod
+    def build(cls, **attributes):
+        """
+        Creates node from already parsed parts, without parsing
+
+        Args:
+            attributes: node attributes by name
+
+        Returns:
+            Node
+        """
+        node = cls.__new__(cls)
+        for name, value in attributes.items():
+            setattr(node, name, value)
+        return node
+
     @classmethod
     def starting_token_types(cls):
         """
         Get token types that this rule can start with
 
+        Computed once per class (all classes are compiled at import)
+
         Returns:
-            Set of token types
+            Frozen set of token types
         """
+        first_set = cls.__dict__.get('_first_set')
+        if first_set is None:
+            first_set = frozenset(cls._compute_starting_token_types())
+            cls._first_set = first_set
+        return first_set
+
+    @classmethod
+    def _compute_starting_token_types(cls):
         return {t for n in cls._starting_nodes() for t in n.starting_token_types()}
 
     @classmethod
@@ -52,35 +86,129 @@ class BaseNode(ABC):
 
     @staticmethod
     def choose_and_build_node(lexer, possible_nodes, required=True):
-        token = lexer.peek()
+        """
+        Builds node that can start with next token
+
+        Args:
+            lexer: lexer to build node from
+            possible_nodes: NodeDispatchTable or set of node classes (compiled into table on first use)
+            required: if not set, None is returned when no node can be built
+
+        Returns:
+            Built and reduced node
+        """
+        if not isinstance(possible_nodes, NodeDispatchTable):
+            possible_nodes = NodeDispatchTable.of(possible_nodes)
 
-        for node in possible_nodes:
-            if token.get_type() in node.starting_token_types():
-                return node(lexer).reduce()
+        token = lexer.peek()
+        node = possible_nodes.get(token.get_type())
+        if node is not None:
+            return node(lexer).reduce()
 
         if not required:
             return None
 
-        BaseNode.make_error(token, {t for n in possible_nodes for t in n.starting_token_types()}, lexer)
+        BaseNode.make_error(token, possible_nodes.token_types, lexer)
 
     @staticmethod
     def make_error(token, expected_tokens, lexer):
         raise SyntacticError(token,
-                             "Expected one of {} but got {}".format(expected_tokens, token.get_type()))
+                             "Expected one of {} but got {}".format(set(expected_tokens), token.get_type()))
+
+
+class NodeDispatchTable:
+    """
+    Frozen mapping from token types to node classes that can start with them
+    """
+
+    __slots__ = ('_node_by_token_type', 'token_types')
+
+    _tables = {}
+
+    def __init__(self, possible_nodes):
+        """
+        Args:
+            possible_nodes: node classes to choose from, with disjoint starting token types
+        """
+        self._node_by_token_type = {t: n for n in possible_nodes for t in n.starting_token_types()}
+        self.token_types = frozenset(self._node_by_token_type)
+
+    @classmethod
+    def of(cls, possible_nodes):
+        """
+        Returns:
+            table for given node classes, built once
+        """
+        key = frozenset(possible_nodes)
+        table = cls._tables.get(key)
+        if table is None:
+            table = cls._tables[key] = cls(key)
+        return table
+
+    def get(self, token_type):
+        """
+        Returns:
+            node class starting with given token type or None
+        """
+        return self._node_by_token_type.get(token_type)
 
 
 class LeafNode(BaseNode, ABC):
     """
     Node that doesn't have children, therefore must contain token
+
+    Token isn't kept, only its value and position, type is given by the class
     """
 
+    __slots__ = ('_value', '_source', '_offset')
+
     def __init__(self, lexer):
         super().__init__()
-        self.token = lexer.peek()
-        if self.token.get_type() != self.token_type():
-            self.make_error(self.token, {self.token_type()}, lexer)
+        token = lexer.peek()
+        if token.get_type() != self.token_type():
+            self.make_error(token, {self.token_type()}, lexer)
+        lexer.get()
+        file_pos = token.get_file_pos()
+        self._value = token.get_value()
+        self._source = file_pos.get_source()
+        self._offset = file_pos.get_absolute_pos()
+
+    @classmethod
+    def from_token(cls, token):
+        """
+        Creates node from already read token of its type
+        """
+        file_pos = token.get_file_pos()
+        node = cls.__new__(cls)
+        node._value = token.get_value()
+        node._source = file_pos.get_source()
+        node._offset = file_pos.get_absolute_pos()
+        return node
+
+    @classmethod
+    def skip(cls, lexer):
+        """
+        Consumes token of this node without creating the node, for tokens that don't have to be kept, like keywords
+        """
+        token = lexer.peek()
+        if token.get_type() != cls.token_type():
+            cls.make_error(token, {cls.token_type()}, lexer)
         lexer.get()
 
+    @property
+    def token(self):
+        """
+        Token of this node, created when asked for
+        """
+        return tokens.Token.unchecked(self.token_type(), FilePosition(self._source, self._offset), self._value)
+
+    def get_value(self):
+        """
+        Returns:
+            value of the token
+        """
+        return self._value
+
     @classmethod
     @abstractmethod
     def token_type(cls):
@@ -90,7 +218,7 @@ class LeafNode(BaseNode, ABC):
         pass
 
     @classmethod
-    def starting_token_types(cls):
+    def _compute_starting_token_types(cls):
         return {cls.token_type()}
 
     @classmethod
@@ -102,6 +230,8 @@ class LeafNode(BaseNode, ABC):
 
 
 class ReducibleNode(BaseNode, ABC):
+    __slots__ = ()
+
     def reduce(self):
         if len(self.get_children()) == 1:
             return self.get_children()[0]
@@ -110,159 +240,456 @@ class ReducibleNode(BaseNode, ABC):
 
 
 class BinaryEvaluable(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def binary_evaluate(self, lhs, rhs, environment):
         pass
 
 
 class UnaryEvaluable(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def unary_evaluate(self, rhs, environment):
         pass
 
 
 class SelfEvaluable(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def self_evaluate(self, environment):
         pass
 
 
 class Executable(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def execute(self, environment):
         pass
 
 
+# Kinds of evaluation steps
+_VALUE_STEP = 0
+_UNARY_STEP = 1
+_BINARY_STEP = 2
+_CALL_STEP = 3
+_ARGUMENT_STEP = 4
+_RETURN_STEP = 5
+
+_step_methods = {
+    _UNARY_STEP: 'unary_evaluate',
+    _BINARY_STEP: 'binary_evaluate',
+    _CALL_STEP: 'call',
+    _ARGUMENT_STEP: 'set_argument',
+    _RETURN_STEP: 'finish',
+}
+
+
+class StackEvaluable(SelfEvaluable, ABC):
+    """
+    Expression evaluated with explicit value stack, without recursion through its subexpressions
+    """
+
+    __slots__ = ()
+
+    @abstractmethod
+    def evaluation_steps(self):
+        """
+        Get what has to be evaluated to evaluate this node
+
+        Returns:
+            List of nodes (evaluated onto value stack) and (step kind, node) pairs, in evaluation order
+        """
+        pass
+
+    def self_evaluate(self, environment):
+        return evaluate(self, environment)
+
+
+def evaluate(node, environment):
+    """
+    Evaluates expression without recursion
+
+    Expression is flattened into postfix sequence of steps once, the sequence is kept in the node.
+
+    Args:
+        node: expression node
+        environment: environment to evaluate in
+
+    Returns:
+        Value of the expression
+    """
+    steps = getattr(node, '_steps', None)
+    if steps is None:
+        steps = node._steps = _flatten(node)
+
+    values = []
+    calls = []  # called function and index of the argument being evaluated for calls waiting for their arguments
+    try:
+        for kind, function in steps:
+            if kind == _VALUE_STEP:
+                values.append(function(environment))
+            elif kind == _BINARY_STEP:
+                rhs = values.pop()
+                values[-1] = function(values[-1], rhs, environment)
+            elif kind == _UNARY_STEP:
+                values[-1] = function(values[-1], environment)
+            elif kind == _CALL_STEP:
+                calls.append([function(environment), 0])
+            elif kind == _ARGUMENT_STEP:
+                call = calls[-1]
+                function(call[0], call[1], values.pop(), environment)
+                call[1] += 1
+            else:
+                values.append(function(calls.pop()[0], environment))
+    except ValueError as e:
+        if not calls:
+            raise
+        fun_node, index = calls[-1]
+        raise ExecutionError(fun_node.parameters.parameters[index].token, str(e))
+    return values[-1]
+
+
+def _flatten(node):
+    """
+    Returns:
+        List of (step kind, function) pairs, functions are bound methods of nodes performing the steps
+    """
+    steps = []
+    pending = [node]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, tuple):
+            kind, step_node = item
+            steps.append((kind, getattr(step_node, _step_methods[kind])))
+        elif isinstance(item, StackEvaluable):
+            pending.extend(reversed(item.evaluation_steps()))
+        else:
+            steps.append((_VALUE_STEP, item.self_evaluate))
+    return steps
+
+
+class Resolver:
+    """
+    Binds identifiers to slots of frames, before execution
+
+    Scopes are resolved in the order of their statements, so variable is bound to the innermost declaration executed
+    before it. Functions see variables of their callers (scoping is dynamic), so their free variables are left to be
+    looked up by name, as are variables in arguments of calls, which are evaluated in frame of the called function
+    """
+
+    def __init__(self, layout, functions=None, report_undeclared=False):
+        """
+        Args:
+            layout: layout of the outermost frame
+            functions: numbers of parameters of defined functions by name, None if not all of them are known
+            report_undeclared: whether variables that can't be bound are errors
+        """
+        self._layouts = [layout]
+        self._functions = functions
+        self._report_undeclared = report_undeclared
+        self.errors = []  # ExecutionErrors raised if execution gets to their positions
+
+    def for_function(self, layout):
+        """
+        Returns:
+            Resolver of function with frame of given layout, sharing errors with this one
+        """
+        resolver = Resolver(layout, self._functions)
+        resolver.errors = self.errors
+        return resolver
+
+    def get_layout(self):
+        return self._layouts[0]
+
+    def enter(self, layout):
+        """
+        Enters scope with frame of given layout, None for scope without frame
+        """
+        if layout is not None:
+            self._layouts.append(layout)
+
+    def leave(self, layout):
+        if layout is not None:
+            self._layouts.pop()
+
+    def declare(self, identifier, on_entry=False):
+        identifier.binding = 0, self._layouts[-1].declare(identifier.get_value(), on_entry)
+
+    def bind(self, identifier):
+        name = identifier.get_value()
+        for depth, layout in enumerate(reversed(self._layouts)):
+            slot = layout.names.get(name)
+            if slot is not None:
+                identifier.binding = depth, slot
+                return
+
+        identifier.binding = None
+        if self._report_undeclared:
+            self.errors.append(ExecutionError(identifier.token, "Variable {} undeclared".format(name)))
+
+    def resolve_expression(self, expression):
+        pending = [(expression, False)]
+        while pending:
+            node, in_arguments = pending.pop()
+            if isinstance(node, Identifier):
+                if in_arguments:
+                    node.binding = None
+                else:
+                    self.bind(node)
+            elif isinstance(node, FunctionCall):
+                self._check_call(node)
+                pending.extend((parameter, True) for parameter in reversed(node.parameters))
+            elif not isinstance(node, LeafNode):
+                pending.extend((child, in_arguments) for child in reversed(node.get_children()))
+
+    def _check_call(self, call):
+        if self._functions is None:
+            return
+
+        name = call.identifier.get_value()
+        if name not in self._functions:
+            self.errors.append(ExecutionError(call.identifier.token, "Function {} undeclared".format(name)))
+        elif len(call.parameters) not in self._functions[name]:
+            self.errors.append(ExecutionError(call.identifier.token,
+                                              "Function {} called with {} arguments".format(name,
+                                                                                            len(call.parameters))))
+
+
 class Semicolon(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.SEMICOLON
 
 
 class FunKeyword(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.FUN
 
 
 class VarKeyword(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.VAR
 
 
 class IfKeyword(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.IF
 
 
 class ElseKeyword(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.ELSE
 
 
 class FromKeyword(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.FROM
 
 
 class PrintKeyword(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.PRINT
 
 
 class ReturnKeyword(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.RETURN
 
 
 class ToKeyword(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.TO
 
 
 class ByKeyword(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.BY
 
 
 class AsKeyword(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.AS
 
 
 class LeftParenthesis(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.LEFT_PARENTHESIS
 
 
 class RightParenthesis(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.RIGHT_PARENTHESIS
 
 
 class Comma(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.COMMA
 
 
 class LeftBracket(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.LEFT_BRACKET
 
 
 class RightBracket(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.RIGHT_BRACKET
 
 
 class Assign(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.ASSIGN
 
 
 class Access(LeafNode):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.ACCESS
 
 
 class Identifier(LeafNode, SelfEvaluable):
+    __slots__ = ('binding',)  # (frame depth, slot) of variable, None if it has to be looked up by name
+
+    def __init__(self, lexer):
+        super().__init__(lexer)
+        self.binding = None
+
+    @classmethod
+    def from_token(cls, token):
+        node = super().from_token(token)
+        node.binding = None
+        return node
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.IDENTIFIER
 
     def self_evaluate(self, environment):
         try:
-            return environment.get_var(self.token.get_value())
+            if self.binding is None:
+                return environment.get_var(self._value)
+            return environment.get_slot(self.binding[0], self.binding[1], self._value)
         except ValueError as e:
             raise ExecutionError(self.token, str(e))
 
+    def assign(self, value, environment):
+        """
+        Sets value of variable named by this identifier
+        """
+        if self.binding is None:
+            environment.set_var(self._value, value)
+        else:
+            environment.set_slot(self.binding[0], self.binding[1], value)
+
 
 class Program(BaseNode, Executable):
+    __slots__ = ('statements', 'layout')
+
     def __init__(self, lexer):
         self.statements = []
+        self.layout = None
         token = lexer.peek()
         while token.get_type() != tokens.TokenType.END:
             self.statements.append(self._get_node(lexer))
             token = lexer.peek()
 
-    def _get_node(self, lexer):
-        node = self.choose_and_build_node(lexer, self._starting_nodes())
+    @classmethod
+    def parse_statements(cls, lexer):
+        """
+        Parses top-level statements one at a time, only when the next one is asked for
+
+        Yields:
+            Statement nodes
+        """
+        token = lexer.peek()
+        while token.get_type() != tokens.TokenType.END:
+            yield cls._get_node(lexer)
+            token = lexer.peek()
+
+    @classmethod
+    def execute_streamed(cls, lexer, environment):
+        """
+        Executes every top-level statement right after it is parsed, without building the whole program
+
+        Executed statements are released (defined functions are kept by environment), so memory doesn't depend on the
+        size of the script. Syntactic error is raised when parsing reaches it, after executing preceding statements
+
+        Returns:
+            Same as execute
+        """
+        resolver = Resolver(FrameLayout())
+        for statement in cls.parse_statements(lexer):
+            statement.resolve(resolver)
+            environment.set_global_layout(resolver.get_layout())
+            jumping, value = statement.execute(environment)
+            if jumping:
+                return value
+
+        return None
+
+    @classmethod
+    def _statement_nodes(cls):
+        return _PROGRAM_STATEMENT_NODES
+
+    @classmethod
+    def _get_node(cls, lexer):
+        node = cls.choose_and_build_node(lexer, cls._statement_nodes())
         if isinstance(node, Identifier):
             token = lexer.peek()
             if token.get_type() in FunctionCall.starting_token_types():
@@ -270,10 +697,10 @@ class Program(BaseNode, Executable):
             elif token.get_type() in VariableAssignmentStatement.starting_token_types():
                 node = VariableAssignmentStatement(lexer, node)
             else:
-                self.make_error(token,
-                                FunctionCall.starting_token_types() | VariableAssignmentStatement.starting_token_types(),
-                                lexer)
-            Semicolon(lexer)
+                cls.make_error(token,
+                               FunctionCall.starting_token_types() | VariableAssignmentStatement.starting_token_types(),
+                               lexer)
+            Semicolon.skip(lexer)
         return node
 
     @classmethod
@@ -288,7 +715,29 @@ class Program(BaseNode, Executable):
     def get_children(self):
         return self.statements
 
+    def resolve(self):
+        """
+        Resolves variables of the whole program, done before its first execution
+
+        Returns:
+            ExecutionErrors that the program surely raises if it gets to their positions
+        """
+        functions = {}
+        for statement in self.statements:
+            if isinstance(statement, FunctionDefinitionStatement):
+                functions.setdefault(statement.identifier.get_value(), set()).add(
+                    len(statement.parameters.parameters))
+
+        resolver = Resolver(FrameLayout(), functions, report_undeclared=True)
+        for statement in self.statements:
+            statement.resolve(resolver)
+        self.layout = resolver.get_layout()
+        return resolver.errors
+
     def execute(self, environment):
+        if self.layout is None:
+            self.resolve()
+        environment.set_global_layout(self.layout)
         for statement in self.statements:
             jumping, value = statement.execute(environment)
             if jumping:
@@ -297,12 +746,39 @@ class Program(BaseNode, Executable):
         return None
 
 
+class LazyProgram(Program):
+    """
+    Program with function bodies parsed on the first call of the function, syntactic errors in functions that are
+    never called are not reported
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def _statement_nodes(cls):
+        return _LAZY_PROGRAM_STATEMENT_NODES
+
+
+class StrictLazyProgram(LazyProgram):
+    """
+    LazyProgram that still reports syntactic errors in all function bodies while parsing
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def _statement_nodes(cls):
+        return _STRICT_LAZY_PROGRAM_STATEMENT_NODES
+
+
 class VariableAssignmentStatement(BaseNode, Executable):
+    __slots__ = ('identifier', 'expression')
+
     def __init__(self, lexer,
                  identifier):  # have to pass identifier as it was already parsed above (because of ambiguity)
         self.identifier = identifier
-        Assign(lexer)
-        self.expression = Expression(lexer).reduce()
+        Assign.skip(lexer)
+        self.expression = parse_expression(lexer)
 
     @classmethod
     def _starting_nodes(cls):
@@ -311,21 +787,31 @@ class VariableAssignmentStatement(BaseNode, Executable):
     def get_children(self):
         return [self.identifier, self.expression]
 
+    def resolve(self, resolver):
+        resolver.resolve_expression(self.expression)
+        resolver.bind(self.identifier)
+
     def execute(self, environment):
         try:
-            environment.set_var(self.identifier.token.get_value(), self.expression.self_evaluate(environment))
+            self.identifier.assign(self.expression.self_evaluate(environment), environment)
         except ValueError as e:
             raise ExecutionError(self.identifier.token, str(e))
         return False, None
 
 
 class FunctionDefinitionStatement(BaseNode, Executable):
+    __slots__ = ('identifier', 'parameters', 'body', 'layout')
+
     def __init__(self, lexer):
-        FunKeyword(lexer)
+        FunKeyword.skip(lexer)
         self.identifier = Identifier(lexer)
         self.parameters = ParametersDeclaration(lexer)
-        self.body = Body(lexer)
-        Semicolon(lexer)
+        self.body = self._parse_body(lexer)
+        Semicolon.skip(lexer)
+
+    @staticmethod
+    def _parse_body(lexer):
+        return Body(lexer)
 
     @classmethod
     def _starting_nodes(cls):
@@ -334,23 +820,59 @@ class FunctionDefinitionStatement(BaseNode, Executable):
     def get_children(self):
         return [self.identifier, self.parameters, self.body]
 
+    def resolve(self, resolver):
+        """
+        Resolves the function on its own, variables of callers are visible in the function only by name
+        """
+        self.layout = FrameLayout()
+        function_resolver = resolver.for_function(self.layout)
+        self.parameters.resolve(function_resolver)
+        self.body.resolve(function_resolver)
+
+    def get_layout(self):
+        """
+        Returns:
+            layout of frames of calls, lazily parsed body is parsed (and resolved) when it is asked for
+        """
+        if isinstance(self.body, LazyBody):
+            self.body.get_body()
+        return self.layout
+
     def execute(self, environment):
         try:
-            environment.set_fun(self.identifier.token.get_value(), self)
+            environment.set_fun(self.identifier.get_value(), self)
         except ValueError as e:
             raise ExecutionError(self.identifier.token, str(e))
         return False, None
 
 
+class LazyFunctionDefinitionStatement(FunctionDefinitionStatement):
+    __slots__ = ()
+
+    @staticmethod
+    def _parse_body(lexer):
+        return LazyBody(lexer)
+
+
+class StrictLazyFunctionDefinitionStatement(LazyFunctionDefinitionStatement):
+    __slots__ = ()
+
+    @staticmethod
+    def _parse_body(lexer):
+        return LazyBody(lexer, strict=True)
+
+
 class VariableDefinitionStatement(BaseNode, Executable):
+    __slots__ = ('identifier', 'assignment')
+
     def __init__(self, lexer):
-        VarKeyword(lexer)
+        VarKeyword.skip(lexer)
         self.identifier = Identifier(lexer)
         self.assignment = None
         token = lexer.peek()
         if token.get_type() in VariableAssignmentStatement.starting_token_types():
             self.assignment = VariableAssignmentStatement(lexer, self.identifier)
-        Semicolon(lexer)
+        Semicolon.skip(lexer)
 
     @classmethod
     def _starting_nodes(cls):
@@ -362,27 +884,31 @@ class VariableDefinitionStatement(BaseNode, Executable):
 
         return [self.identifier, self.assignment]
 
+    def resolve(self, resolver):
+        resolver.declare(self.identifier)
+        if self.assignment:
+            self.assignment.resolve(resolver)
+
     def execute(self, environment):
-        try:
-            environment.add_var(self.identifier.token.get_value())
-        except ValueError as e:
-            raise ExecutionError(self.identifier.token, str(e))
+        environment.declare(self.identifier.binding[1])
         if self.assignment:
             self.assignment.execute(environment)
         return False, None
 
 
 class IfStatement(BaseNode, Executable):
+    __slots__ = ('expression', 'body', 'else_body')
+
     def __init__(self, lexer):
-        IfKeyword(lexer)
-        self.expression = Expression(lexer).reduce()
+        IfKeyword.skip(lexer)
+        self.expression = parse_expression(lexer)
         self.body = Body(lexer)
         self.else_body = None
         token = lexer.peek()
         if token.get_type() in ElseKeyword.starting_token_types():
-            ElseKeyword(lexer)
+            ElseKeyword.skip(lexer)
             self.else_body = Body(lexer)
-        Semicolon(lexer)
+        Semicolon.skip(lexer)
 
     @classmethod
     def _starting_nodes(cls):
@@ -394,40 +920,43 @@ class IfStatement(BaseNode, Executable):
 
         return [self.expression, self.body, self.else_body]
 
+    def resolve(self, resolver):
+        resolver.resolve_expression(self.expression)
+        for body in [self.body, self.else_body] if self.else_body else [self.body]:
+            body.layout = FrameLayout() if body.declares_variables() else None  # scope without variables is elided
+            resolver.enter(body.layout)
+            body.resolve(resolver)
+            resolver.leave(body.layout)
+
     def execute(self, environment):
-        if self.expression.self_evaluate(environment):
-            environment.push_scope()
-            jumping, value = self.body.execute(environment)
-            environment.pop_scope()
-            if jumping:
-                return True, value
-        elif self.else_body:
-            environment.push_scope()
-            jumping, value = self.else_body.execute(environment)
-            environment.pop_scope()
-            if jumping:
-                return True, value
+        body = self.body if self.expression.self_evaluate(environment) else self.else_body
+        if body is None:
+            return False, None
+
+        if body.layout is None:
+            return body.execute(environment)
+        environment.push_frame(body.layout)
+        jumping, value = body.execute(environment)
+        environment.pop_frame()
+        if jumping:
+            return True, value
         return False, None
 
 
 class FromStatement(BaseNode, Executable):
+    __slots__ = ('start', 'end', 'time_unit', 'identifier', 'body')
+
     def __init__(self, lexer):
-        FromKeyword(lexer)
-        self.start = Expression(lexer).reduce()
-        ToKeyword(lexer)
-        self.end = Expression(lexer).reduce()
-        ByKeyword(lexer)
-        self.time_unit = self.choose_and_build_node(lexer, {Years,
-                                                            Months,
-                                                            Weeks,
-                                                            Days,
-                                                            Hours,
-                                                            Minutes,
-                                                            Seconds})
-        AsKeyword(lexer)
+        FromKeyword.skip(lexer)
+        self.start = parse_expression(lexer)
+        ToKeyword.skip(lexer)
+        self.end = parse_expression(lexer)
+        ByKeyword.skip(lexer)
+        self.time_unit = self.choose_and_build_node(lexer, _TIME_UNIT_NODES)
+        AsKeyword.skip(lexer)
         self.identifier = Identifier(lexer)
         self.body = Body(lexer)
-        Semicolon(lexer)
+        Semicolon.skip(lexer)
 
     @classmethod
     def _starting_nodes(cls):
@@ -436,38 +965,47 @@ class FromStatement(BaseNode, Executable):
     def get_children(self):
         return [self.start, self.end, self.time_unit, self.identifier, self.body]
 
+    def resolve(self, resolver):
+        resolver.resolve_expression(self.start)
+        resolver.resolve_expression(self.end)
+        self.body.layout = FrameLayout()  # frame of each iteration, with the iterator
+        resolver.enter(self.body.layout)
+        resolver.declare(self.identifier, on_entry=True)
+        self.body.resolve(resolver)
+        resolver.leave(self.body.layout)
+
     def execute(self, environment):
-        environment.push_scope()
         start = self.start.self_evaluate(environment)
         end = self.end.self_evaluate(environment)
         step = self.time_unit.self_evaluate(environment)
+        iterator_slot = self.identifier.binding[1]
 
+        environment.push_frame(self.body.layout)  # one frame for all iterations, reset after each of them
         try:
             while start <= end:
-                environment.push_scope()
-                try:
-                    environment.add_var(self.identifier.token.get_value())
-                    environment.set_var(self.identifier.token.get_value(), start)
-                except ValueError as e:
-                    raise ExecutionError(self.identifier.token, str(e))
+                environment.set_slot(0, iterator_slot, start)
                 jumping, value = self.body.execute(environment)
-                environment.pop_scope()
                 if jumping:
+                    environment.pop_frame()
                     return True, value
+                environment.reset_frame()
                 try:
                     start += step
                 except (ValueError, TypeError, OverflowError) as e:
                     raise ExecutionError(self.start.token, str(e))
+            environment.pop_frame()
             return False, None
         except (ValueError, TypeError, OverflowError) as e:
             raise ExecutionError(self.start.token, str(e))
 
 
 class PrintStatement(BaseNode, Executable):
+    __slots__ = ('expression',)
+
     def __init__(self, lexer):
-        PrintKeyword(lexer)
-        self.expression = Expression(lexer).reduce()
-        Semicolon(lexer)
+        PrintKeyword.skip(lexer)
+        self.expression = parse_expression(lexer)
+        Semicolon.skip(lexer)
 
     @classmethod
     def _starting_nodes(cls):
@@ -476,18 +1014,23 @@ class PrintStatement(BaseNode, Executable):
     def get_children(self):
         return [self.expression]
 
+    def resolve(self, resolver):
+        resolver.resolve_expression(self.expression)
+
     def execute(self, environment):
         print(str(self.expression.self_evaluate(environment)))
         return False, None
 
 
 class ReturnStatement(BaseNode, Executable):
+    __slots__ = ('expression',)
+
     def __init__(self, lexer):
-        ReturnKeyword(lexer)
-        self.expression = self.choose_and_build_node(lexer, {Expression}, required=False)
-        if self.expression:
-            self.expression = self.expression.reduce()
-        Semicolon(lexer)
+        ReturnKeyword.skip(lexer)
+        self.expression = None
+        if lexer.peek().get_type() in Expression.starting_token_types():
+            self.expression = parse_expression(lexer)
+        Semicolon.skip(lexer)
 
     @classmethod
     def _starting_nodes(cls):
@@ -499,6 +1042,10 @@ class ReturnStatement(BaseNode, Executable):
 
         return [self.expression]
 
+    def resolve(self, resolver):
+        if self.expression:
+            resolver.resolve_expression(self.expression)
+
     def execute(self, environment):
         if self.expression:
             return True, self.expression.self_evaluate(environment)
@@ -506,18 +1053,20 @@ class ReturnStatement(BaseNode, Executable):
 
 
 class ParametersDeclaration(BaseNode, Executable):
+    __slots__ = ('parameters',)
+
     def __init__(self, lexer):
-        LeftParenthesis(lexer)
+        LeftParenthesis.skip(lexer)
         self.parameters = []
         token = lexer.peek()
         if token.get_type() in Identifier.starting_token_types():
             self.parameters.append(Identifier(lexer))
             token = lexer.peek()
             while token.get_type() in Comma.starting_token_types():
-                Comma(lexer)
+                Comma.skip(lexer)
                 self.parameters.append(Identifier(lexer))
                 token = lexer.peek()
-        RightParenthesis(lexer)
+        RightParenthesis.skip(lexer)
 
     @classmethod
     def _starting_nodes(cls):
@@ -526,38 +1075,40 @@ class ParametersDeclaration(BaseNode, Executable):
     def get_children(self):
         return self.parameters
 
+    def resolve(self, resolver):
+        for parameter in self.parameters:
+            resolver.declare(parameter, on_entry=True)
+
     def execute(self, environment):
         for parameter in self.parameters:
-            try:
-                environment.add_var(parameter.token.get_value())
-            except ValueError as e:
-                raise ExecutionError(parameter.token, str(e))
+            environment.declare(parameter.binding[1])
 
 
 class Body(BaseNode, Executable):
+    __slots__ = ('statements', 'layout')  # layout of frame the body is executed in, set by resolution of its parent
+
     def __init__(self, lexer):
-        LeftBracket(lexer)
+        LeftBracket.skip(lexer)
         self.statements = []
         node = self._get_node(lexer)
         while node:
             self.statements.append(node)
             node = self._get_node(lexer)
-        RightBracket(lexer)
+        RightBracket.skip(lexer)
 
     @staticmethod
     def _get_node(lexer):
-        node = BaseNode.choose_and_build_node(lexer, {Identifier,
-                                                      VariableDefinitionStatement,
-                                                      IfStatement, FromStatement,
-                                                      PrintStatement,
-                                                      ReturnStatement}, required=False)
+        node = BaseNode.choose_and_build_node(lexer, _BODY_STATEMENT_NODES, required=False)
         if isinstance(node, Identifier):
             token = lexer.peek()
             if token.get_type() in FunctionCall.starting_token_types():
                 node = FunctionCall(lexer, node)
             elif token.get_type() in VariableAssignmentStatement.starting_token_types():
                 node = VariableAssignmentStatement(lexer, node)
-            Semicolon(lexer)
+            else:
+                BaseNode.make_error(token, FunctionCall.starting_token_types() |
+                                    VariableAssignmentStatement.starting_token_types(), lexer)
+            Semicolon.skip(lexer)
         return node
 
     @classmethod
@@ -567,6 +1118,13 @@ class Body(BaseNode, Executable):
     def get_children(self):
         return self.statements
 
+    def declares_variables(self):
+        return any(isinstance(statement, VariableDefinitionStatement) for statement in self.statements)
+
+    def resolve(self, resolver):
+        for statement in self.statements:
+            statement.resolve(resolver)
+
     def execute(self, environment):
         for statement in self.statements:
             jumping, value = statement.execute(environment)
@@ -575,13 +1133,103 @@ class Body(BaseNode, Executable):
         return False, 0
 
 
-class Expression(ReducibleNode, SelfEvaluable):
+class LazyBody(BaseNode, Executable):
+    """
+    Body parsed on its first execution
+
+    While parsing only brackets are matched, tokens of the body are kept in compact TokenBuffer until the Body is built
+    """
+
+    __slots__ = ('_tokens', '_body', '_resolver')
+
+    def __init__(self, lexer, strict=False):
+        """
+        Args:
+            lexer: lexer to read body tokens from
+            strict: if set, tokens are parsed right away (and the result dropped) instead of matching brackets, to
+                report the same syntactic errors as Body
+        """
+        self._body = None
+        self._resolver = None
+        if strict:
+            recorder = TokenRecorder(lexer, TokenBuffer(lexer.peek().get_file_pos().get_source()))
+            Body(recorder)
+            self._tokens = recorder.finish()
+            return
+
+        self._tokens = lexer.take_bracketed() if isinstance(lexer, TokenBufferView) else None
+        if self._tokens is None:
+            self._tokens = self._take_bracketed(lexer)
+
+    @classmethod
+    def _take_bracketed(cls, lexer):
+        token = lexer.peek()
+        if token.get_type() != tokens.TokenType.LEFT_BRACKET:
+            cls.make_error(token, cls.starting_token_types(), lexer)
+
+        body_tokens = TokenBuffer(token.get_file_pos().get_source())
+        depth = 0
+        while True:
+            token = lexer.get()
+            token_type = token.get_type()
+            if token_type == tokens.TokenType.END:
+                cls.make_error(token, {tokens.TokenType.RIGHT_BRACKET}, lexer)
+            body_tokens.append(token_type, token.get_file_pos().get_absolute_pos(), token.get_value())
+            if token_type == tokens.TokenType.LEFT_BRACKET:
+                depth += 1
+            elif token_type == tokens.TokenType.RIGHT_BRACKET:
+                depth -= 1
+                if depth == 0:
+                    break
+        body_tokens.append(tokens.TokenType.END, token.get_file_pos().get_absolute_pos() + 1)
+        return body_tokens
+
+    def get_body(self):
+        """
+        Returns:
+            Body, parsed on the first call
+        """
+        if self._body is None:
+            body = Body(self._tokens.view())
+            if self._resolver is not None:
+                body.resolve(self._resolver)
+                self._resolver = None
+            self._body = body
+            self._tokens = None
+        return self._body
+
+    def is_parsed(self):
+        return self._body is not None
+
+    def resolve(self, resolver):
+        """
+        Resolution of the body is postponed until it is parsed
+        """
+        if self._body is not None:
+            self._body.resolve(resolver)
+        else:
+            self._resolver = resolver
+
+    @classmethod
+    def _starting_nodes(cls):
+        return {LeftBracket}
+
+    def get_children(self):
+        return self._body.get_children() if self._body is not None else []
+
+    def execute(self, environment):
+        return self.get_body().execute(environment)
+
+
+class Expression(ReducibleNode, StackEvaluable):
+    __slots__ = ('first_expression', 'operations', '_steps')
+
     def __init__(self, lexer):
-        self.first_expression = LogicAndExpression(lexer).reduce()
+        self.first_expression = parse_expression(lexer, AND_LEVEL)
         self.operations = []
         token = lexer.peek()
         while token.get_type() in OrOperator.starting_token_types():
-            self.operations.append((OrOperator(lexer), LogicAndExpression(lexer).reduce()))
+            self.operations.append((OrOperator(lexer), parse_expression(lexer, AND_LEVEL)))
             token = lexer.peek()
 
     @classmethod
@@ -591,20 +1239,20 @@ class Expression(ReducibleNode, SelfEvaluable):
     def get_children(self):
         return [self.first_expression] + [x for operation in self.operations for x in operation]
 
-    def self_evaluate(self, environment):
-        value = self.first_expression.self_evaluate(environment)
-        for operator, expression in self.operations:
-            value = operator.binary_evaluate(value, expression.self_evaluate(environment), environment)
-        return value
+    def evaluation_steps(self):
+        return [self.first_expression] + [x for operator, expression in self.operations
+                                          for x in (expression, (_BINARY_STEP, operator))]
+
 
+class LogicAndExpression(ReducibleNode, StackEvaluable):
+    __slots__ = ('first_expression', 'operations', '_steps')
 
-class LogicAndExpression(ReducibleNode, SelfEvaluable):
     def __init__(self, lexer):
-        self.first_expression = LogicEqualityExpression(lexer).reduce()
+        self.first_expression = parse_expression(lexer, EQUALITY_LEVEL)
         self.operations = []
         token = lexer.peek()
         while token.get_type() in AndOperator.starting_token_types():
-            self.operations.append((AndOperator(lexer), LogicEqualityExpression(lexer).reduce()))
+            self.operations.append((AndOperator(lexer), parse_expression(lexer, EQUALITY_LEVEL)))
             token = lexer.peek()
 
     @classmethod
@@ -614,19 +1262,19 @@ class LogicAndExpression(ReducibleNode, SelfEvaluable):
     def get_children(self):
         return [self.first_expression] + [x for operation in self.operations for x in operation]
 
-    def self_evaluate(self, environment):
-        value = self.first_expression.self_evaluate(environment)
-        for operator, expression in self.operations:
-            value = operator.binary_evaluate(value, expression.self_evaluate(environment), environment)
-        return value
+    def evaluation_steps(self):
+        return [self.first_expression] + [x for operator, expression in self.operations
+                                          for x in (expression, (_BINARY_STEP, operator))]
+
 
+class LogicEqualityExpression(ReducibleNode, StackEvaluable):
+    __slots__ = ('first_expression', 'operator', 'second_expression', '_steps')
 
-class LogicEqualityExpression(ReducibleNode, SelfEvaluable):
     def __init__(self, lexer):
-        self.first_expression = LogicRelationalExpression(lexer).reduce()
-        self.operator = self.choose_and_build_node(lexer, {EqualOperator, NotEqualOperator}, required=False)
+        self.first_expression = parse_expression(lexer, RELATIONAL_LEVEL)
+        self.operator = self.choose_and_build_node(lexer, _EQUALITY_OPERATOR_NODES, required=False)
         if self.operator:
-            self.second_expression = LogicRelationalExpression(lexer).reduce()
+            self.second_expression = parse_expression(lexer, RELATIONAL_LEVEL)
 
     @classmethod
     def _starting_nodes(cls):
@@ -638,20 +1286,21 @@ class LogicEqualityExpression(ReducibleNode, SelfEvaluable):
 
         return [self.first_expression, self.operator, self.second_expression]
 
-    def self_evaluate(self, environment):
-        value = self.first_expression.self_evaluate(environment)
-        if self.operator:
-            value = self.operator.binary_evaluate(value, self.second_expression.self_evaluate(environment), environment)
-        return value
+    def evaluation_steps(self):
+        if self.operator is None:
+            return [self.first_expression]
+
+        return [self.first_expression, self.second_expression, (_BINARY_STEP, self.operator)]
+
 
+class LogicRelationalExpression(ReducibleNode, StackEvaluable):
+    __slots__ = ('first_expression', 'operator', 'second_expression', '_steps')
 
-class LogicRelationalExpression(ReducibleNode, SelfEvaluable):
     def __init__(self, lexer):
-        self.first_expression = LogicTerm(lexer).reduce()
-        self.operator = self.choose_and_build_node(lexer, {GreaterOperator, GreaterOrEqualOperator, LessOperator,
-                                                           LessOrEqualOperator}, required=False)
+        self.first_expression = parse_expression(lexer, LOGIC_TERM_LEVEL)
+        self.operator = self.choose_and_build_node(lexer, _RELATIONAL_OPERATOR_NODES, required=False)
         if self.operator:
-            self.second_expression = LogicTerm(lexer).reduce()
+            self.second_expression = parse_expression(lexer, LOGIC_TERM_LEVEL)
 
     @classmethod
     def _starting_nodes(cls):
@@ -663,17 +1312,19 @@ class LogicRelationalExpression(ReducibleNode, SelfEvaluable):
 
         return [self.first_expression, self.operator, self.second_expression]
 
-    def self_evaluate(self, environment):
-        value = self.first_expression.self_evaluate(environment)
-        if self.operator:
-            value = self.operator.binary_evaluate(value, self.second_expression.self_evaluate(environment), environment)
-        return value
+    def evaluation_steps(self):
+        if self.operator is None:
+            return [self.first_expression]
+
+        return [self.first_expression, self.second_expression, (_BINARY_STEP, self.operator)]
 
 
-class LogicTerm(ReducibleNode, SelfEvaluable):
+class LogicTerm(ReducibleNode, StackEvaluable):
+    __slots__ = ('negation', 'expression', '_steps')
+
     def __init__(self, lexer):
-        self.negation = self.choose_and_build_node(lexer, {LogicNegationOperator}, required=False)
-        self.expression = MathExpression(lexer).reduce()
+        self.negation = self.choose_and_build_node(lexer, _LOGIC_NEGATION_NODES, required=False)
+        self.expression = parse_expression(lexer, ADDITIVE_LEVEL)
 
     @classmethod
     def _starting_nodes(cls):
@@ -685,21 +1336,23 @@ class LogicTerm(ReducibleNode, SelfEvaluable):
 
         return [self.negation, self.expression]
 
-    def self_evaluate(self, environment):
-        value = self.expression.self_evaluate(environment)
-        if self.negation:
-            return self.negation.unary_evaluate(value, environment)
-        return value
+    def evaluation_steps(self):
+        if self.negation is None:
+            return [self.expression]
 
+        return [self.expression, (_UNARY_STEP, self.negation)]
+
+
+class MathExpression(ReducibleNode, StackEvaluable):
+    __slots__ = ('first_expression', 'operations', '_steps')
 
-class MathExpression(ReducibleNode, SelfEvaluable):
     def __init__(self, lexer):
-        self.first_expression = MultiplicativeMathExpression(lexer).reduce()
+        self.first_expression = parse_expression(lexer, MULTIPLICATIVE_LEVEL)
         self.operations = []
-        operator = self.choose_and_build_node(lexer, {PlusOperator, MinusOperator}, required=False)
+        operator = self.choose_and_build_node(lexer, _ADDITIVE_OPERATOR_NODES, required=False)
         while operator:
-            self.operations.append((operator, MultiplicativeMathExpression(lexer).reduce()))
-            operator = self.choose_and_build_node(lexer, {PlusOperator, MinusOperator}, required=False)
+            self.operations.append((operator, parse_expression(lexer, MULTIPLICATIVE_LEVEL)))
+            operator = self.choose_and_build_node(lexer, _ADDITIVE_OPERATOR_NODES, required=False)
 
     @classmethod
     def _starting_nodes(cls):
@@ -708,21 +1361,21 @@ class MathExpression(ReducibleNode, SelfEvaluable):
     def get_children(self):
         return [self.first_expression] + [x for operation in self.operations for x in operation]
 
-    def self_evaluate(self, environment):
-        value = self.first_expression.self_evaluate(environment)
-        for operator, expression in self.operations:
-            value = operator.binary_evaluate(value, expression.self_evaluate(environment), environment)
-        return value
+    def evaluation_steps(self):
+        return [self.first_expression] + [x for operator, expression in self.operations
+                                          for x in (expression, (_BINARY_STEP, operator))]
+
 
+class MultiplicativeMathExpression(ReducibleNode, StackEvaluable):
+    __slots__ = ('first_expression', 'operations', '_steps')
 
-class MultiplicativeMathExpression(ReducibleNode, SelfEvaluable):
     def __init__(self, lexer):
-        self.first_expression = MathTerm(lexer).reduce()
+        self.first_expression = parse_expression(lexer, MATH_TERM_LEVEL)
         self.operations = []
-        operator = self.choose_and_build_node(lexer, {MultiplyOperator, DivisionOperator}, required=False)
+        operator = self.choose_and_build_node(lexer, _MULTIPLICATIVE_OPERATOR_NODES, required=False)
         while operator:
-            self.operations.append((operator, MathTerm(lexer).reduce()))
-            operator = self.choose_and_build_node(lexer, {MultiplyOperator, DivisionOperator}, required=False)
+            self.operations.append((operator, parse_expression(lexer, MATH_TERM_LEVEL)))
+            operator = self.choose_and_build_node(lexer, _MULTIPLICATIVE_OPERATOR_NODES, required=False)
 
     @classmethod
     def _starting_nodes(cls):
@@ -731,27 +1384,29 @@ class MultiplicativeMathExpression(ReducibleNode, SelfEvaluable):
     def get_children(self):
         return [self.first_expression] + [x for operation in self.operations for x in operation]
 
-    def self_evaluate(self, environment):
-        value = self.first_expression.self_evaluate(environment)
-        for operator, expression in self.operations:
-            value = operator.binary_evaluate(value, expression.self_evaluate(environment), environment)
-        return value
+    def evaluation_steps(self):
+        return [self.first_expression] + [x for operator, expression in self.operations
+                                          for x in (expression, (_BINARY_STEP, operator))]
+
 
+class MathTerm(ReducibleNode, StackEvaluable):
+    __slots__ = ('negation', 'term', 'access', '_steps')
 
-class MathTerm(ReducibleNode, SelfEvaluable):
     def __init__(self, lexer):
-        self.negation = self.choose_and_build_node(lexer, {MathNegationOperator}, required=False)
-        self.term = self.choose_and_build_node(lexer, {NumberLiteral,
-                                                       StringLiteral,
-                                                       DateLiteral,
-                                                       TimeLiteral,
-                                                       DateTimeLiteral,
-                                                       TimedeltaLiteral,
-                                                       Identifier,
-                                                       ParenthesisedExpression})
-        if isinstance(self.term, Identifier) and lexer.peek().get_type() in FunctionCall.starting_token_types():
-            self.term = FunctionCall(lexer, self.term)
-        self.access = self.choose_and_build_node(lexer, {TimeInfoAccess}, required=False)
+        self.negation, self.term, self.access = self.parse_parts(lexer)
+
+    @staticmethod
+    def parse_parts(lexer):
+        """
+        Returns:
+            negation (or None), term and time info access (or None)
+        """
+        negation = BaseNode.choose_and_build_node(lexer, _MATH_NEGATION_NODES, required=False)
+        term = BaseNode.choose_and_build_node(lexer, _VALUE_NODES)
+        if isinstance(term, Identifier) and lexer.peek().get_type() in FunctionCall.starting_token_types():
+            term = FunctionCall(lexer, term)
+        access = BaseNode.choose_and_build_node(lexer, _TIME_INFO_ACCESS_NODES, required=False)
+        return negation, term, access
 
     @classmethod
     def _starting_nodes(cls):
@@ -774,20 +1429,22 @@ class MathTerm(ReducibleNode, SelfEvaluable):
             c += [self.access]
         return c
 
-    def self_evaluate(self, environment):
-        value = self.term.self_evaluate(environment)
+    def evaluation_steps(self):
+        steps = [self.term]
         if self.access:
-            value = self.access.unary_evaluate(value, environment)
+            steps.append((_UNARY_STEP, self.access))
         if self.negation:
-            return self.negation.unary_evaluate(value, environment)
-        return value
+            steps.append((_UNARY_STEP, self.negation))
+        return steps
 
 
-class ParenthesisedExpression(ReducibleNode, SelfEvaluable):
+class ParenthesisedExpression(ReducibleNode, StackEvaluable):
+    __slots__ = ('expression', '_steps')
+
     def __init__(self, lexer):
-        LeftParenthesis(lexer)
-        self.expression = Expression(lexer).reduce()
-        RightParenthesis(lexer)
+        LeftParenthesis.skip(lexer)
+        self.expression = parse_expression(lexer)
+        RightParenthesis.skip(lexer)
 
     @classmethod
     def _starting_nodes(cls):
@@ -796,11 +1453,161 @@ class ParenthesisedExpression(ReducibleNode, SelfEvaluable):
     def get_children(self):
         return [self.expression]
 
-    def self_evaluate(self, environment):
-        return self.expression.self_evaluate(environment)
+    def evaluation_steps(self):
+        return [self.expression]
+
+
+# Expression precedence levels, from the loosest binding
+OR_LEVEL = 0
+AND_LEVEL = 1
+EQUALITY_LEVEL = 2
+RELATIONAL_LEVEL = 3
+LOGIC_TERM_LEVEL = 4
+ADDITIVE_LEVEL = 5
+MULTIPLICATIVE_LEVEL = 6
+MATH_TERM_LEVEL = 7
+
+# Levels allowing only one operator, like a == b
+_SINGLE_OPERATOR_LEVELS = {EQUALITY_LEVEL, RELATIONAL_LEVEL}
+
+
+# Kinds of suspended expressions waiting for their operand while parsing
+_OPERATION_FRAME = 0
+_LOGIC_TERM_FRAME = 1
+_PARENTHESES_FRAME = 2
+_CALL_FRAME = 3
+
+
+def parse_expression(lexer, min_level=OR_LEVEL):
+    """
+    Parses expression by precedence climbing
+
+    Builds the same reduced nodes as parsing through the chain of expression nodes (Expression, LogicAndExpression and
+    so on), but only the nodes that stay after reduction are created. Expressions waiting for their operands (right
+    side of operator, negated expression, expression in parentheses or function call arguments) are kept on explicit
+    stack instead of recursion, so nesting is limited only by memory.
+
+    Args:
+        lexer: lexer to parse from
+        min_level: loosest binding level to parse, OR_LEVEL parses what Expression does, MATH_TERM_LEVEL what MathTerm
+
+    Returns:
+        Reduced expression node
+    """
+    frames = []
+
+    while True:
+        # beginning of expression binding at least as tight as min_level, up to its first term
+        token_type = lexer.peek().get_type()
+        if min_level <= LOGIC_TERM_LEVEL and token_type == tokens.TokenType.NOT:
+            frames.append((_LOGIC_TERM_FRAME, min_level, LogicNegationOperator(lexer)))
+            min_level = ADDITIVE_LEVEL
+            continue
+
+        negation = None
+        if token_type == tokens.TokenType.MINUS:
+            negation = MathNegationOperator(lexer)
+        token = lexer.peek()
+        term_class = _VALUE_NODES.get(token.get_type())
+        if term_class is None:
+            BaseNode.make_error(token, _VALUE_NODES.token_types, lexer)
+        if term_class is ParenthesisedExpression:
+            LeftParenthesis.skip(lexer)
+            frames.append((_PARENTHESES_FRAME, min_level, negation))
+            min_level = OR_LEVEL
+            continue
+        term = term_class(lexer)
+        if isinstance(term, Identifier) and lexer.peek().get_type() == tokens.TokenType.LEFT_PARENTHESIS:
+            term = _start_function_call(lexer, frames, min_level, negation, term)
+            if term is None:
+                min_level = OR_LEVEL
+                continue
+        node = _finish_math_term(lexer, negation, term)
+        max_level = MATH_TERM_LEVEL
+
+        # operators binding tighter than the last one were taken by operands
+        while True:
+            operator = _binary_operators.get(lexer.peek().get_type())
+            if operator is not None and min_level <= operator[0] < max_level:
+                level, operator_class, node_class = operator
+                operations = None if level in _SINGLE_OPERATOR_LEVELS else []
+                frames.append((_OPERATION_FRAME, min_level, level, node, operator_class(lexer), operations))
+                min_level = level + 1
+                break
+
+            if not frames:
+                return node
+
+            # expression is the operand the innermost suspended expression waited for
+            frame = frames.pop()
+            kind, min_level = frame[0], frame[1]
+            if kind == _OPERATION_FRAME:
+                _, _, level, first_expression, operator, operations = frame
+                node_class = _binary_operators[operator.token_type()][2]
+                if operations is None:
+                    node = node_class.build(first_expression=first_expression,
+                                            operator=operator,
+                                            second_expression=node)
+                else:
+                    operations.append((operator, node))
+                    operator = _binary_operators.get(lexer.peek().get_type())
+                    if operator is not None and operator[0] == level:
+                        frames.append((_OPERATION_FRAME, min_level, level, first_expression, operator[1](lexer),
+                                       operations))
+                        min_level = level + 1
+                        break
+                    node = node_class.build(first_expression=first_expression,
+                                            operations=operations)
+                max_level = level
+            elif kind == _LOGIC_TERM_FRAME:
+                node = LogicTerm.build(negation=frame[2], expression=node)
+                max_level = LOGIC_TERM_LEVEL
+            elif kind == _PARENTHESES_FRAME:
+                RightParenthesis.skip(lexer)
+                if isinstance(node, Identifier) and lexer.peek().get_type() == tokens.TokenType.LEFT_PARENTHESIS:
+                    node = _start_function_call(lexer, frames, min_level, frame[2], node)
+                    if node is None:
+                        min_level = OR_LEVEL
+                        break
+                node = _finish_math_term(lexer, frame[2], node)
+                max_level = MATH_TERM_LEVEL
+            else:
+                _, _, negation, identifier, parameters = frame
+                parameters.append(node)
+                if lexer.peek().get_type() == tokens.TokenType.COMMA:
+                    Comma.skip(lexer)
+                    frames.append(frame)
+                    min_level = OR_LEVEL
+                    break
+                RightParenthesis.skip(lexer)
+                node = _finish_math_term(lexer, negation, FunctionCall.build(identifier=identifier,
+                                                                             parameters=parameters))
+                max_level = MATH_TERM_LEVEL
+
+
+def _start_function_call(lexer, frames, min_level, negation, identifier):
+    """
+    Returns:
+        FunctionCall without arguments or None if parsing of its arguments was suspended on frames
+    """
+    LeftParenthesis.skip(lexer)
+    if lexer.peek().get_type() in Expression.starting_token_types():
+        frames.append((_CALL_FRAME, min_level, negation, identifier, []))
+        return None
+    RightParenthesis.skip(lexer)
+    return FunctionCall.build(identifier=identifier, parameters=[])
+
+
+def _finish_math_term(lexer, negation, term):
+    access = BaseNode.choose_and_build_node(lexer, _TIME_INFO_ACCESS_NODES, required=False)
+    if negation is None and access is None:
+        return term
+    return MathTerm.build(negation=negation, term=term, access=access)
 
 
 class PlusOperator(LeafNode, BinaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.PLUS
@@ -815,6 +1622,8 @@ class PlusOperator(LeafNode, BinaryEvaluable):
 
 
 class MinusOperator(LeafNode, BinaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.MINUS
@@ -827,6 +1636,8 @@ class MinusOperator(LeafNode, BinaryEvaluable):
 
 
 class MultiplyOperator(LeafNode, BinaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.MULTIPLICATION
@@ -839,6 +1650,8 @@ class MultiplyOperator(LeafNode, BinaryEvaluable):
 
 
 class DivisionOperator(LeafNode, BinaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.DIVISION
@@ -851,6 +1664,8 @@ class DivisionOperator(LeafNode, BinaryEvaluable):
 
 
 class OrOperator(LeafNode, BinaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.LOGICAL_OR
@@ -863,6 +1678,8 @@ class OrOperator(LeafNode, BinaryEvaluable):
 
 
 class AndOperator(LeafNode, BinaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.LOGICAL_AND
@@ -875,6 +1692,8 @@ class AndOperator(LeafNode, BinaryEvaluable):
 
 
 class EqualOperator(LeafNode, BinaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.EQUALS
@@ -887,6 +1706,8 @@ class EqualOperator(LeafNode, BinaryEvaluable):
 
 
 class NotEqualOperator(LeafNode, BinaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.NOT_EQUALS
@@ -899,6 +1720,8 @@ class NotEqualOperator(LeafNode, BinaryEvaluable):
 
 
 class GreaterOperator(LeafNode, BinaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.GREATER
@@ -911,6 +1734,8 @@ class GreaterOperator(LeafNode, BinaryEvaluable):
 
 
 class GreaterOrEqualOperator(LeafNode, BinaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.GREATER_OR_EQUAL
@@ -923,6 +1748,8 @@ class GreaterOrEqualOperator(LeafNode, BinaryEvaluable):
 
 
 class LessOperator(LeafNode, BinaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.LESS
@@ -935,6 +1762,8 @@ class LessOperator(LeafNode, BinaryEvaluable):
 
 
 class LessOrEqualOperator(LeafNode, BinaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.LESS_OR_EQUAL
@@ -947,6 +1776,8 @@ class LessOrEqualOperator(LeafNode, BinaryEvaluable):
 
 
 class MathNegationOperator(LeafNode, UnaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.MINUS
@@ -959,6 +1790,8 @@ class MathNegationOperator(LeafNode, UnaryEvaluable):
 
 
 class LogicNegationOperator(LeafNode, UnaryEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.NOT
@@ -971,6 +1804,8 @@ class LogicNegationOperator(LeafNode, UnaryEvaluable):
 
 
 class Years(LeafNode, UnaryEvaluable, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.YEARS
@@ -988,6 +1823,8 @@ class Years(LeafNode, UnaryEvaluable, SelfEvaluable):
 
 
 class Months(LeafNode, UnaryEvaluable, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.MONTHS
@@ -1005,6 +1842,8 @@ class Months(LeafNode, UnaryEvaluable, SelfEvaluable):
 
 
 class Weeks(LeafNode, UnaryEvaluable, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.WEEKS
@@ -1020,6 +1859,8 @@ class Weeks(LeafNode, UnaryEvaluable, SelfEvaluable):
 
 
 class Days(LeafNode, UnaryEvaluable, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.DAYS
@@ -1037,6 +1878,8 @@ class Days(LeafNode, UnaryEvaluable, SelfEvaluable):
 
 
 class Hours(LeafNode, UnaryEvaluable, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.HOURS
@@ -1054,6 +1897,8 @@ class Hours(LeafNode, UnaryEvaluable, SelfEvaluable):
 
 
 class Minutes(LeafNode, UnaryEvaluable, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.MINUTES
@@ -1071,6 +1916,8 @@ class Minutes(LeafNode, UnaryEvaluable, SelfEvaluable):
 
 
 class Seconds(LeafNode, UnaryEvaluable, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.SECONDS
@@ -1088,74 +1935,114 @@ class Seconds(LeafNode, UnaryEvaluable, SelfEvaluable):
 
 
 class NumberLiteral(LeafNode, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.NUMBER_LITERAL
 
     def self_evaluate(self, environment):
-        return self.token.get_value()
+        return self.get_value()
 
 
 class StringLiteral(LeafNode, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.STRING_LITERAL
 
     def self_evaluate(self, environment):
-        return self.token.get_value()
+        return self.get_value()
 
 
 class DateLiteral(LeafNode, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.DATE_LITERAL
 
     def self_evaluate(self, environment):
-        return self.token.get_value()
+        return self.get_value()
 
 
 class TimeLiteral(LeafNode, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.TIME_LITERAL
 
     def self_evaluate(self, environment):
-        return self.token.get_value()
+        return self.get_value()
 
 
 class DateTimeLiteral(LeafNode, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.DATETIME_LITERAL
 
     def self_evaluate(self, environment):
-        return self.token.get_value()
+        return self.get_value()
 
 
 class TimedeltaLiteral(LeafNode, SelfEvaluable):
+    __slots__ = ()
+
     @classmethod
     def token_type(cls):
         return tokens.TokenType.TIMEDELTA_LITERAL
 
     def self_evaluate(self, environment):
-        return self.token.get_value()
+        return self.get_value()
+
+
+class Constant(BaseNode, SelfEvaluable):
+    """
+    Value computed from literals before execution, replaces the expression it was computed from
+
+    Unlike literals it has no token, as the expression it replaces
+    """
 
+    __slots__ = ('_value',)
+
+    def __init__(self, value):
+        self._value = value
+
+    @classmethod
+    def _starting_nodes(cls):
+        return set()
+
+    def get_children(self):
+        return []
+
+    def get_value(self):
+        return self._value
+
+    def self_evaluate(self, environment):
+        return self._value
+
+
+class FunctionCall(BaseNode, Executable, StackEvaluable):
+    __slots__ = ('identifier', 'parameters', '_steps')
 
-class FunctionCall(BaseNode, Executable, SelfEvaluable):
     def __init__(self, lexer,
                  identifier):  # have to pass identifier as it was already parsed above (because of ambiguity)
         self.identifier = identifier
-        LeftParenthesis(lexer)
+        LeftParenthesis.skip(lexer)
         self.parameters = []
         token = lexer.peek()
         if token.get_type() in Expression.starting_token_types():
-            self.parameters.append(Expression(lexer).reduce())
+            self.parameters.append(parse_expression(lexer))
             token = lexer.peek()
             while token.get_type() in Comma.starting_token_types():
-                Comma(lexer)
-                self.parameters.append(Expression(lexer).reduce())
+                Comma.skip(lexer)
+                self.parameters.append(parse_expression(lexer))
                 token = lexer.peek()
-        RightParenthesis(lexer)
+        RightParenthesis.skip(lexer)
 
     @classmethod
     def _starting_nodes(cls):
@@ -1168,35 +2055,53 @@ class FunctionCall(BaseNode, Executable, SelfEvaluable):
         self.self_evaluate(environment)
         return False, None
 
-    def self_evaluate(self, environment):
+    def evaluation_steps(self):
+        steps = [(_CALL_STEP, self)]
+        for parameter in self.parameters:
+            steps += [parameter, (_ARGUMENT_STEP, self)]
+        steps.append((_RETURN_STEP, self))
+        return steps
+
+    def call(self, environment):
+        """
+        Enters called function, its arguments are evaluated afterwards
+
+        Returns:
+            Called function node
+        """
         try:
-            fun_node = environment.get_fun(self.identifier.token.get_value())
+            fun_node = environment.get_fun(self.identifier.get_value())
         except ValueError as e:
             raise ExecutionError(self.identifier.token, str(e))
         if len(fun_node.parameters.parameters) != len(self.parameters):
             raise ValueError("TODO")
-        environment.push_scope()
-        fun_node.parameters.execute(environment)
-        for param_id, param_val in zip(fun_node.parameters.parameters, self.parameters):
-            try:
-                environment.set_var(param_id.token.get_value(), param_val.self_evaluate(environment))
-            except ValueError as e:
-                raise ExecutionError(param_id.token, str(e))
+        environment.push_frame(fun_node.get_layout())  # parameters are declared on entry
+        return fun_node
+
+    def set_argument(self, fun_node, index, value, environment):
+        environment.set_slot(0, fun_node.parameters.parameters[index].binding[1], value)
+
+    def finish(self, fun_node, environment):
+        """
+        Executes body of called function after all arguments were set
+
+        Returns:
+            Returned value
+        """
         _, value = fun_node.body.execute(environment)
-        environment.pop_scope()
+        environment.pop_frame()
         return value
 
+    def resolve(self, resolver):
+        resolver.resolve_expression(self)
+
 
 class TimeInfoAccess(BaseNode, UnaryEvaluable):
+    __slots__ = ('time_unit',)
+
     def __init__(self, lexer):  # have to pass identifier as it was already parsed above (because of ambiguity)
-        Access(lexer)
-        self.time_unit = self.choose_and_build_node(lexer, {Years,
-                                                            Months,
-                                                            Weeks,
-                                                            Days,
-                                                            Hours,
-                                                            Minutes,
-                                                            Seconds})
+        Access.skip(lexer)
+        self.time_unit = self.choose_and_build_node(lexer, _TIME_UNIT_NODES)
 
     @classmethod
     def _starting_nodes(cls):
@@ -1207,3 +2112,64 @@ class TimeInfoAccess(BaseNode, UnaryEvaluable):
 
     def unary_evaluate(self, rhs, environment):
         return self.time_unit.unary_evaluate(rhs, environment)
+
+
+def _compile_starting_token_types(node_class):
+    for subclass in node_class.__subclasses__():
+        if not inspect.isabstract(subclass):
+            subclass.starting_token_types()
+        _compile_starting_token_types(subclass)
+
+
+_compile_starting_token_types(BaseNode)
+
+# Dispatch tables of node choices made while parsing
+_PROGRAM_STATEMENT_NODES = NodeDispatchTable(Program._starting_nodes())
+_LAZY_PROGRAM_STATEMENT_NODES = NodeDispatchTable(Program._starting_nodes() - {FunctionDefinitionStatement} |
+                                                  {LazyFunctionDefinitionStatement})
+_STRICT_LAZY_PROGRAM_STATEMENT_NODES = NodeDispatchTable(Program._starting_nodes() - {FunctionDefinitionStatement} |
+                                                         {StrictLazyFunctionDefinitionStatement})
+_BODY_STATEMENT_NODES = NodeDispatchTable({Identifier,
+                                           VariableDefinitionStatement,
+                                           IfStatement, FromStatement,
+                                           PrintStatement,
+                                           ReturnStatement})
+_EQUALITY_OPERATOR_NODES = NodeDispatchTable({EqualOperator, NotEqualOperator})
+_RELATIONAL_OPERATOR_NODES = NodeDispatchTable({GreaterOperator, GreaterOrEqualOperator, LessOperator,
+                                                LessOrEqualOperator})
+_LOGIC_NEGATION_NODES = NodeDispatchTable({LogicNegationOperator})
+_ADDITIVE_OPERATOR_NODES = NodeDispatchTable({PlusOperator, MinusOperator})
+_MULTIPLICATIVE_OPERATOR_NODES = NodeDispatchTable({MultiplyOperator, DivisionOperator})
+_MATH_NEGATION_NODES = NodeDispatchTable({MathNegationOperator})
+_VALUE_NODES = NodeDispatchTable({NumberLiteral,
+                                  StringLiteral,
+                                  DateLiteral,
+                                  TimeLiteral,
+                                  DateTimeLiteral,
+                                  TimedeltaLiteral,
+                                  Identifier,
+                                  ParenthesisedExpression})
+_TIME_INFO_ACCESS_NODES = NodeDispatchTable({TimeInfoAccess})
+_TIME_UNIT_NODES = NodeDispatchTable({Years,
+                                      Months,
+                                      Weeks,
+                                      Days,
+                                      Hours,
+                                      Minutes,
+                                      Seconds})
+
+# Binary operators by token type: precedence level, operator node and expression node
+_binary_operators = {
+    tokens.TokenType.LOGICAL_OR: (OR_LEVEL, OrOperator, Expression),
+    tokens.TokenType.LOGICAL_AND: (AND_LEVEL, AndOperator, LogicAndExpression),
+    tokens.TokenType.EQUALS: (EQUALITY_LEVEL, EqualOperator, LogicEqualityExpression),
+    tokens.TokenType.NOT_EQUALS: (EQUALITY_LEVEL, NotEqualOperator, LogicEqualityExpression),
+    tokens.TokenType.GREATER: (RELATIONAL_LEVEL, GreaterOperator, LogicRelationalExpression),
+    tokens.TokenType.GREATER_OR_EQUAL: (RELATIONAL_LEVEL, GreaterOrEqualOperator, LogicRelationalExpression),
+    tokens.TokenType.LESS: (RELATIONAL_LEVEL, LessOperator, LogicRelationalExpression),
+    tokens.TokenType.LESS_OR_EQUAL: (RELATIONAL_LEVEL, LessOrEqualOperator, LogicRelationalExpression),
+    tokens.TokenType.PLUS: (ADDITIVE_LEVEL, PlusOperator, MathExpression),
+    tokens.TokenType.MINUS: (ADDITIVE_LEVEL, MinusOperator, MathExpression),
+    tokens.TokenType.MULTIPLICATION: (MULTIPLICATIVE_LEVEL, MultiplyOperator, MultiplicativeMathExpression),
+    tokens.TokenType.DIVISION: (MULTIPLICATIVE_LEVEL, DivisionOperator, MultiplicativeMathExpression),
+}
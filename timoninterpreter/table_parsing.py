@@ -0,0 +1,284 @@
+"""
+
+Table-driven syntax analysis module
+
+Parses with LL(1) tables generated from the grammar (parse_tables module) in a loop over explicit stack, building the
+same nodes as parsing with syntax_nodes classes
+
+"""
+
+from timoninterpreter import parse_tables
+from timoninterpreter import tokens
+from timoninterpreter.syntax_nodes import *
+
+
+def parse(lexer):
+    """
+    Parses the whole program
+
+    Args:
+        lexer: lexer to parse from
+
+    Returns:
+        Program
+    """
+    stack = [_START_SYMBOL]
+    values = []  # tokens and built nodes, children of rules on the stack
+    marks = []  # positions in values where children of rules on the stack begin
+    defaulted = []  # nonterminals that derived empty string at the current token, to report what was expected
+
+    pop = stack.pop
+    push = stack.extend
+    token = lexer.peek()
+    code = token.get_type().value
+
+    while stack:
+        symbol = pop()
+        if symbol < _TERMINAL_COUNT:
+            if symbol != code:
+                _raise_unexpected(token, {symbol}, defaulted, lexer)
+            values.append(token)
+            lexer.get()
+            token = lexer.peek()
+            code = token.get_type().value
+            defaulted.clear()
+        elif symbol < _ACTION_BASE:
+            nonterminal = symbol - _TERMINAL_COUNT
+            expansion = _expansions[nonterminal].get(code)
+            if expansion is None:
+                expansion = _default_expansions[nonterminal]
+                if expansion is None:
+                    _raise_unexpected(token, _expansions[nonterminal], defaulted, lexer)
+            production, mark_count, defaulted_nonterminals = expansion
+            if mark_count:
+                marks += [len(values)] * mark_count
+            if defaulted_nonterminals:
+                defaulted += defaulted_nonterminals
+            push(production)
+        else:
+            start = marks.pop()
+            if start == len(values) - 1 and symbol in _REDUCED_ACTIONS:  # node is its only child
+                continue
+            node = _builders[symbol - _ACTION_BASE](values[start:])
+            del values[start:]
+            values.append(node)
+
+    if code != tokens.TokenType.END.value:
+        _raise_unexpected(token, {tokens.TokenType.END.value}, defaulted, lexer)
+    return values[0]
+
+
+def _raise_unexpected(token, expected_codes, defaulted, lexer):
+    expected_codes = set(expected_codes)
+    for nonterminal in defaulted:
+        expected_codes |= _expansions[nonterminal].keys()
+    BaseNode.make_error(token, {tokens.token_types_by_code[code] for code in expected_codes}, lexer)
+
+
+_literal_nodes = {node.token_type(): node for node in (NumberLiteral,
+                                                       StringLiteral,
+                                                       DateLiteral,
+                                                       TimeLiteral,
+                                                       DateTimeLiteral,
+                                                       TimedeltaLiteral)}
+_time_unit_nodes = {node.token_type(): node for node in (Years, Months, Weeks, Days, Hours, Minutes, Seconds)}
+
+
+def _identifier(token):
+    return Identifier.from_token(token)
+
+
+def _time_unit(token):
+    return _time_unit_nodes[token.get_type()].from_token(token)
+
+
+def _build_leaf(node_class):
+    def build(children):
+        return node_class.from_token(children[0])
+    return build
+
+
+def _build_operations(node_class):
+    def build(children):
+        if len(children) == 1:
+            return children[0]
+        return node_class.build(first_expression=children[0],
+                                operations=list(zip(children[1::2], children[2::2])))
+    return build
+
+
+def _build_single_operation(node_class):
+    def build(children):
+        if len(children) == 1:
+            return children[0]
+        return node_class.build(first_expression=children[0],
+                                operator=children[1],
+                                second_expression=children[2])
+    return build
+
+
+def _build_identifier_first_statement(children):
+    identifier, part = _identifier(children[0]), children[1]
+    if isinstance(part, list):
+        return FunctionCall.build(identifier=identifier, parameters=part)
+    return VariableAssignmentStatement.build(identifier=identifier, expression=part)
+
+
+def _build_variable_definition_statement(children):
+    identifier = _identifier(children[1])
+    assignment = None
+    if len(children) == 4:
+        assignment = VariableAssignmentStatement.build(identifier=identifier, expression=children[2])
+    return VariableDefinitionStatement.build(identifier=identifier, assignment=assignment)
+
+
+def _build_logic_term(children):
+    if len(children) == 1:
+        return children[0]
+    return LogicTerm.build(negation=children[0], expression=children[1])
+
+
+def _build_math_term(children):
+    negation = children[0] if isinstance(children[0], MathNegationOperator) else None
+    access = children[-1] if isinstance(children[-1], TimeInfoAccess) else None
+    term = children[1] if negation else children[0]
+    if negation is None and access is None:
+        return term
+    return MathTerm.build(negation=negation, term=term, access=access)
+
+
+def _build_value(children):
+    value = children[0]
+    if isinstance(value, tokens.Token):
+        return _literal_nodes[value.get_type()].from_token(value)
+    return value
+
+
+def _build_identifier_first_value(children):
+    identifier = _identifier(children[0])
+    if len(children) == 1:
+        return identifier
+    return FunctionCall.build(identifier=identifier, parameters=children[1])
+
+
+# Builders of nodes from children of rules, rules without builder pass their children to the enclosing rule
+_rule_builders = {
+    'program': lambda c: Program.build(statements=c, layout=None),
+    'functionDefStatement': lambda c: FunctionDefinitionStatement.build(identifier=_identifier(c[1]),
+                                                                        parameters=c[2],
+                                                                        body=c[3]),
+    'identifierFirstStatement': _build_identifier_first_statement,
+    'variableDefinitionStatement': _build_variable_definition_statement,
+    'ifStatement': lambda c: IfStatement.build(expression=c[1], body=c[2], else_body=c[4] if len(c) == 6 else None),
+    'fromStatement': lambda c: FromStatement.build(start=c[1][0], end=c[1][1], time_unit=c[2], identifier=c[3],
+                                                   body=c[4]),
+    'printStatement': lambda c: PrintStatement.build(expression=c[1]),
+    'returnStatement': lambda c: ReturnStatement.build(expression=c[1] if len(c) == 3 else None),
+    'parametersDeclaration': lambda c: ParametersDeclaration.build(parameters=[_identifier(t) for t in c[1:-1:2]]),
+    'body': lambda c: Body.build(statements=c[1:-1]),
+    'parametersCall': lambda c: c[1:-1:2],
+    'assignment': lambda c: c[1],
+    'fromRange': lambda c: (c[0], c[2]),
+    'fromStep': lambda c: _time_unit(c[1]),
+    'fromIterator': lambda c: _identifier(c[1]),
+    'expr': _build_operations(Expression),
+    'logicAndExpr': _build_operations(LogicAndExpression),
+    'logicEqualExpr': _build_single_operation(LogicEqualityExpression),
+    'logicRelExpr': _build_single_operation(LogicRelationalExpression),
+    'logicTerm': _build_logic_term,
+    'mathExpr': _build_operations(MathExpression),
+    'multMathExpr': _build_operations(MultiplicativeMathExpression),
+    'mathTerm': _build_math_term,
+    'value': _build_value,
+    'identifierFirstValue': _build_identifier_first_value,
+    'parenthesisedExpr': lambda c: c[1],
+    'timeInfoAccess': lambda c: TimeInfoAccess.build(time_unit=_time_unit(c[1])),
+    'orOperator': _build_leaf(OrOperator),
+    'andOperator': _build_leaf(AndOperator),
+    'equalOperator': _build_leaf(EqualOperator),
+    'notEqualOperator': _build_leaf(NotEqualOperator),
+    'greaterOperator': _build_leaf(GreaterOperator),
+    'greaterOrEqualOperator': _build_leaf(GreaterOrEqualOperator),
+    'lessOperator': _build_leaf(LessOperator),
+    'lessOrEqualOperator': _build_leaf(LessOrEqualOperator),
+    'logicNegOperator': _build_leaf(LogicNegationOperator),
+    'plusOperator': _build_leaf(PlusOperator),
+    'minusOperator': _build_leaf(MinusOperator),
+    'multiplyOperator': _build_leaf(MultiplyOperator),
+    'divisionOperator': _build_leaf(DivisionOperator),
+    'mathNegOperator': _build_leaf(MathNegationOperator),
+}
+_TRANSPARENT_RULES = {'assignmentOperator', 'equalityOperator', 'relationalOperator', 'additiveOperator',
+                      'multiplicativeOperator'}
+# Rules reduced to their only child, like ReducibleNode
+_REDUCED_RULES = {'expr', 'logicAndExpr', 'logicEqualExpr', 'logicRelExpr', 'logicTerm', 'mathExpr', 'multMathExpr',
+                  'mathTerm'}
+
+
+def _compile_tables():
+    """
+    Encodes symbols as integers: terminals by token type codes, then nonterminals, then actions building rules
+
+    Expansions of nonterminals are precomputed for each token: nonterminals that the chosen production starts with are
+    expanded right away too, until a terminal or an action is on top, so the loop does one lookup per token instead of
+    one per nonterminal (like expr, logicAndExpr and so on down to value).
+
+    Returns:
+        expansions by nonterminal and token code, default expansions by nonterminal, builders by action, actions of
+        reduced rules and code of the start symbol, expansion is a tuple of symbols to push, number of rules to mark
+        and nonterminals that derived empty string
+    """
+    missing = set(parse_tables.RULES) - set(_rule_builders) - _TRANSPARENT_RULES
+    if missing:
+        raise ValueError("No builders for grammar rules: {}".format(", ".join(sorted(missing))))
+
+    nonterminals = list(parse_tables.TABLE)
+    built_rules = [rule for rule in parse_tables.RULES if rule not in _TRANSPARENT_RULES]
+    codes = {token_type.name: token_type.value for token_type in tokens.TokenType}
+    codes.update({nonterminal: _TERMINAL_COUNT + i for i, nonterminal in enumerate(nonterminals)})
+    action_codes = {rule: _TERMINAL_COUNT + len(nonterminals) + i for i, rule in enumerate(built_rules)}
+
+    productions = []
+    for nonterminal, symbols in parse_tables.PRODUCTIONS:
+        production = tuple(codes[symbol] for symbol in reversed(symbols))  # pushed, so first symbol ends on top
+        if nonterminal in action_codes:
+            production = (action_codes[nonterminal],) + production
+        productions.append(production)
+
+    choices = [{codes[terminal]: productions[index] for terminal, index in parse_tables.TABLE[nonterminal].items()}
+               for nonterminal in nonterminals]
+    defaults = [productions[parse_tables.DEFAULTS[nonterminal]] if nonterminal in parse_tables.DEFAULTS else None
+                for nonterminal in nonterminals]
+    built = [int(nonterminal in action_codes) for nonterminal in nonterminals]
+
+    def expand(production, code):
+        stack = list(production)
+        mark_count = 0
+        defaulted = []
+        while stack and _TERMINAL_COUNT <= stack[-1] < _TERMINAL_COUNT + len(nonterminals):
+            nonterminal = stack[-1] - _TERMINAL_COUNT
+            production = choices[nonterminal].get(code)
+            if production is None:
+                production = defaults[nonterminal]
+                if production is None:  # left for the parsing loop to report
+                    break
+                defaulted.append(nonterminal)
+            stack.pop()
+            stack.extend(production)
+            mark_count += built[nonterminal]
+        return tuple(stack), mark_count, tuple(defaulted)
+
+    expansions = [{code: expand((_TERMINAL_COUNT + nonterminal,), code) for code in choices[nonterminal]}
+                  for nonterminal in range(len(nonterminals))]
+    default_expansions = [None if defaults[nonterminal] is None else (defaults[nonterminal],
+                                                                        built[nonterminal],
+                                                                        (nonterminal,))
+                          for nonterminal in range(len(nonterminals))]
+    builders = [_rule_builders[rule] for rule in built_rules]
+    reduced_actions = frozenset(action_codes[rule] for rule in _REDUCED_RULES if rule in action_codes)
+    return expansions, default_expansions, builders, reduced_actions, codes[parse_tables.START]
+
+
+_TERMINAL_COUNT = len(tokens.token_types_by_code)
+_expansions, _default_expansions, _builders, _REDUCED_ACTIONS, _START_SYMBOL = _compile_tables()
+_ACTION_BASE = _TERMINAL_COUNT + len(_expansions)
@@ -536,11 +536,19 @@ token_value_valid_types_map = {
 }
 
 
+# Token types by their one byte codes (TokenType.value), used by compact token storage
+token_types_by_code = [None] * (max(token_type.value for token_type in TokenType) + 1)
+for _token_type in TokenType:
+    token_types_by_code[_token_type.value] = _token_type
+
+
 class Token:
     """
     Token class
     """
 
+    __slots__ = ('_type', '_value', '_file_pos')
+
     def __init__(self, token_type, file_pos, value=None):
         value_type = token_value_valid_types_map.get(token_type, type(None))
         if type(value) is not value_type:
@@ -550,6 +558,19 @@ class Token:
         self._value = value
         self._file_pos = file_pos
 
+    @classmethod
+    def unchecked(cls, token_type, file_pos, value=None):
+        """
+        Creates token without validating value type
+
+        Only for producers that already guarantee the value type, like lexers and token buffers
+        """
+        token = cls.__new__(cls)
+        token._type = token_type
+        token._value = value
+        token._file_pos = file_pos
+        return token
+
     def __str__(self):
         if self._type == TokenType.END:
             return "END"
@@ -0,0 +1,224 @@
+"""
+
+Virtual machine module
+
+Executes bytecode in a single dispatch loop. Calls don't recurse, the caller is kept on a stack of activations and
+resumed by return, so no statement has to pass returned values up. Errors are reported at the same positions as by
+execution of the nodes
+
+"""
+
+import operator
+import sys
+
+from timoninterpreter import bytecode
+from timoninterpreter.bytecode import *
+from timoninterpreter.error_handling import ExecutionError
+
+_OPERATOR_ERRORS = (ValueError, TypeError, OverflowError)
+
+_binary_operations = (
+    operator.sub,
+    operator.mul,
+    operator.floordiv,
+    operator.eq,
+    operator.ne,
+    operator.gt,
+    operator.ge,
+    operator.lt,
+    operator.le,
+    lambda lhs, rhs: bool(lhs) or bool(rhs),
+    lambda lhs, rhs: bool(lhs) and bool(rhs),
+)
+
+_unary_operations = (
+    operator.neg,
+    lambda rhs: not bool(rhs),
+)
+
+# Errors of instructions reported at their sites, with position of the site operand
+_instruction_errors = {
+    BINARY: (_OPERATOR_ERRORS, 5),
+    ADD: (_OPERATOR_ERRORS, 4),
+    UNARY: (_OPERATOR_ERRORS, 4),
+    LOAD_NAME: (ValueError, 2),
+    STORE_NAME: (ValueError, 1),
+}
+
+_handler_errors = {
+    ARGUMENT_HANDLER: ValueError,
+    ASSIGNMENT_HANDLER: ValueError,
+    LOOP_HANDLER: _OPERATOR_ERRORS,
+}
+
+
+def execute(program, environment):
+    """
+    Compiles program to bytecode and executes it, like Program.execute
+
+    Returns:
+        Value returned by the program, None if it didn't return
+    """
+    code = bytecode.compile_program(program)
+    environment.set_global_layout(program.layout)
+    return run(code, environment)
+
+
+def run(code, environment):
+    """
+    Executes code of program
+
+    Returns:
+        Value returned by the program, None if it didn't return
+    """
+    max_depth = sys.getrecursionlimit()
+    functions = {}  # compiled functions by definition node, compiled on their first call
+    frames = environment.frames
+    activations = []  # code, instructions, registers and position of the call instruction of suspended callers
+    programs = {}  # instructions of codes as lists, faster to index than arrays
+    instructions = programs[code] = code.instructions.tolist()
+    sites = code.sites
+    registers = code.registers[:]
+    pc = 0
+    try:
+        while True:
+            opcode = instructions[pc]
+            if opcode == LOAD_SLOT:
+                value = frames[instructions[pc + 2]][instructions[pc + 3]]
+                if value is None:
+                    raise ExecutionError(sites[instructions[pc + 4]].token,
+                                         "Variable {} uninitialized".format(sites[instructions[pc + 4]].get_value()))
+                registers[instructions[pc + 1]] = value
+                pc += 5
+            elif opcode == STORE_SLOT:
+                frames[instructions[pc + 1]][instructions[pc + 2]] = registers[instructions[pc + 3]]
+                pc += 4
+            elif opcode == BINARY:
+                registers[instructions[pc + 1]] = _binary_operations[instructions[pc + 4]](
+                    registers[instructions[pc + 2]], registers[instructions[pc + 3]])
+                pc += 6
+            elif opcode == ADD:
+                lhs = registers[instructions[pc + 2]]
+                rhs = registers[instructions[pc + 3]]
+                if isinstance(lhs, str) or isinstance(rhs, str):
+                    lhs, rhs = str(lhs), str(rhs)
+                registers[instructions[pc + 1]] = lhs + rhs
+                pc += 5
+            elif opcode == JUMP_IF_FALSE:
+                pc = pc + 3 if registers[instructions[pc + 1]] else instructions[pc + 2]
+            elif opcode == JUMP:
+                pc = instructions[pc + 1]
+            elif opcode == LOOP_TEST:
+                if registers[instructions[pc + 1]] <= registers[instructions[pc + 2]]:
+                    pc += 4
+                else:
+                    pc = instructions[pc + 3]
+            elif opcode == LOOP_STEP:
+                registers[instructions[pc + 1]] += registers[instructions[pc + 2]]
+                pc = instructions[pc + 3]
+            elif opcode == RESET_FRAME:
+                frames[-1][:] = code.layouts[instructions[pc + 1]].blank
+                pc += 2
+            elif opcode == CALL_ENTER:
+                site = sites[instructions[pc + 2]]
+                try:
+                    fun_node = environment.get_fun(site.get_value())
+                except ValueError as e:
+                    raise ExecutionError(site.token, str(e))
+                if len(fun_node.parameters.parameters) != instructions[pc + 3]:
+                    raise ValueError("TODO")
+                function = functions.get(fun_node)
+                if function is None:
+                    function = functions[fun_node] = bytecode.compile_function(fun_node)
+                environment.push_frame(function.layout)  # arguments are evaluated in frame of the function
+                registers[instructions[pc + 1]] = function
+                pc += 4
+            elif opcode == ARGUMENT:
+                frames[-1][registers[instructions[pc + 1]].slots[instructions[pc + 2]]] = \
+                    registers[instructions[pc + 3]]
+                pc += 4
+            elif opcode == CALL:
+                if len(activations) >= max_depth:
+                    raise RecursionError("maximum depth of calls exceeded")
+                activations.append((code, instructions, registers, pc))
+                code = registers[instructions[pc + 1]].code
+                instructions = programs.get(code)
+                if instructions is None:
+                    instructions = programs[code] = code.instructions.tolist()
+                sites = code.sites
+                registers = code.registers[:]
+                pc = 0
+            elif opcode == RETURN:
+                value = registers[instructions[pc + 1]]
+                for _ in range(instructions[pc + 2]):
+                    environment.pop_frame()
+                if not activations:
+                    return value
+                code, instructions, registers, pc = activations.pop()
+                sites = code.sites
+                registers[instructions[pc + 1]] = value
+                pc += 2
+            elif opcode == UNARY:
+                registers[instructions[pc + 1]] = _unary_operations[instructions[pc + 3]](
+                    registers[instructions[pc + 2]])
+                pc += 5
+            elif opcode == ACCESS:
+                registers[instructions[pc + 1]] = sites[instructions[pc + 3]].unary_evaluate(
+                    registers[instructions[pc + 2]], environment)
+                pc += 4
+            elif opcode == LOAD_NAME:
+                registers[instructions[pc + 1]] = environment.get_var(sites[instructions[pc + 2]].get_value())
+                pc += 3
+            elif opcode == STORE_NAME:
+                environment.set_var(sites[instructions[pc + 1]].get_value(), registers[instructions[pc + 2]])
+                pc += 3
+            elif opcode == DECLARE:
+                frames[-1][instructions[pc + 1]] = None
+                pc += 2
+            elif opcode == PUSH_FRAME:
+                environment.push_frame(code.layouts[instructions[pc + 1]])
+                pc += 2
+            elif opcode == POP_FRAME:
+                environment.pop_frame()
+                pc += 1
+            elif opcode == MOVE:
+                registers[instructions[pc + 1]] = registers[instructions[pc + 2]]
+                pc += 3
+            elif opcode == PRINT:
+                print(str(registers[instructions[pc + 1]]))
+                pc += 2
+            elif opcode == DEFINE:
+                fun_node = sites[instructions[pc + 1]]
+                environment.set_fun(fun_node.identifier.get_value(), fun_node)
+                pc += 2
+            else:
+                return None
+    except Exception as e:
+        error = _handle(e, [(code, instructions, registers, pc)] + activations[::-1])
+        if error is None:
+            raise
+        raise error
+
+
+def _handle(error, activations):
+    """
+    Args:
+        error: exception raised by the instruction
+        activations: code, instructions, registers and position of the current instruction of activations, innermost
+            first
+
+    Returns:
+        ExecutionError that error is reported as, None if it isn't handled
+    """
+    code, instructions, _, pc = activations[0]
+    instruction_error = _instruction_errors.get(instructions[pc])
+    if instruction_error is not None and isinstance(error, instruction_error[0]):
+        return ExecutionError(code.sites[instructions[pc + instruction_error[1]]].token, str(error))
+
+    for code, _, registers, pc in activations:
+        for start, end, kind, first, second in code.handlers:
+            if start <= pc < end and isinstance(error, _handler_errors[kind]):
+                if kind == ARGUMENT_HANDLER:
+                    return ExecutionError(registers[first].node.parameters.parameters[second].token, str(error))
+                return ExecutionError(code.sites[first].token, str(error))
+    return None